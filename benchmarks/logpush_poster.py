@@ -0,0 +1,102 @@
+"""Post Logpush-style firewall_events batches to the integration's ingestion endpoint.
+
+A stand-in for a Cloudflare Logpush job with an HTTP destination: each batch
+is gzip-compressed NDJSON, posted with a Home Assistant access token. Enable
+"logpush_ingest" in the entry's options first:
+
+    python benchmarks/logpush_poster.py --url http://localhost:8123 --zone <zone_id> --token <token>
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import aiohttp
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from stub_servers import _ip  # noqa: E402
+
+LOGPUSH_PATH = "/api/cloudflare_abuse_monitor/logpush/{zone_id}"
+
+
+def build_batch(rng, ips, events, skip_ratio, timestamp_format, ray_offset):
+    """Return (gzip body, number of skip events) of one batch of firewall_events lines."""
+    lines = []
+    skips = 0
+    now = time.time()
+    for i in range(events):
+        action = "skip" if rng.random() < skip_ratio else "block"
+        skips += action == "skip"
+        when = now - rng.uniform(0, 30)
+        if timestamp_format == "unixnano":
+            stamp = int(when * 1e9)
+        elif timestamp_format == "unix":
+            stamp = int(when)
+        else:
+            stamp = datetime.fromtimestamp(when, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        lines.append(json.dumps({
+            "Action": action,
+            "ClientIP": rng.choice(ips),
+            "ClientCountry": "xx",
+            "ClientRequestUserAgent": "logpush-poster",
+            "Datetime": stamp,
+            "RayName": "%016x" % (ray_offset + i),
+            "Source": "firewallCustom",
+        }))
+    return gzip.compress(("\n".join(lines) + "\n").encode()), skips
+
+
+async def async_run(args):
+    rng = random.Random(args.seed)
+    ips = [_ip(rng, args.ipv6_ratio) for _ in range(args.ips)]
+    url = args.url.rstrip("/") + LOGPUSH_PATH.format(zone_id=args.zone)
+    headers = {"Authorization": f"Bearer {args.token}", "Content-Type": "application/x-ndjson"}
+    if args.content_encoding:
+        headers["Content-Encoding"] = "gzip"
+
+    async with aiohttp.ClientSession() as session:
+        for batch in range(args.batches):
+            body, skips = build_batch(
+                rng, ips, args.events, args.skip_ratio, args.timestamp_format, batch * args.events
+            )
+            start = time.perf_counter()
+            async with session.post(url, data=body, headers=headers) as response:
+                answer = await response.text()
+            print(json.dumps({
+                "batch": batch + 1,
+                "status": response.status,
+                "compressed_bytes": len(body),
+                "skip_events": skips,
+                "seconds": round(time.perf_counter() - start, 3),
+                "response": answer,
+            }))
+            if batch + 1 < args.batches:
+                await asyncio.sleep(args.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8123", help="Home Assistant base URL")
+    parser.add_argument("--zone", required=True, help="zone id of the entry to push to")
+    parser.add_argument("--token", required=True, help="Home Assistant long-lived access token")
+    parser.add_argument("--batches", type=int, default=3)
+    parser.add_argument("--events", type=int, default=5000, help="events per batch")
+    parser.add_argument("--ips", type=int, default=2000, help="distinct client IPs the events come from")
+    parser.add_argument("--ipv6-ratio", type=float, default=0.1)
+    parser.add_argument("--skip-ratio", type=float, default=0.8, help="share of events with action skip")
+    parser.add_argument("--timestamp-format", choices=["rfc3339", "unix", "unixnano"], default="rfc3339")
+    parser.add_argument("--content-encoding", action="store_true",
+                        help="send Content-Encoding: gzip instead of a bare gzip body")
+    parser.add_argument("--interval", type=float, default=30.0, help="seconds between batches")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(async_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
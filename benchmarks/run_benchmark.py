@@ -0,0 +1,265 @@
+"""Measure what poll cycles cost against the local stub servers.
+
+Sets up N config entries of the integration in a throwaway Home Assistant
+instance, pointed at stub_servers.py, then runs scan cycles of all entries
+together and reports wall time, API calls per endpoint, event loop lag and
+peak memory. Needs homeassistant and aiohttp installed:
+
+    python benchmarks/run_benchmark.py --entries 5 --events 50000 --latency-ms 80
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import MappingProxyType
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from homeassistant.config_entries import ConfigEntry  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.cloudflare_abuse_monitor import api  # noqa: E402
+from custom_components.cloudflare_abuse_monitor.blacklist import BlacklistSnapshot  # noqa: E402
+from custom_components.cloudflare_abuse_monitor.configuration import ConfigFileCache  # noqa: E402
+from custom_components.cloudflare_abuse_monitor.const import DOMAIN  # noqa: E402
+from custom_components.cloudflare_abuse_monitor.lookup import get_rate_limiter  # noqa: E402
+from custom_components.cloudflare_abuse_monitor.prefilter import CIDRPrefilter  # noqa: E402
+from custom_components.cloudflare_abuse_monitor.store import ReputationStore  # noqa: E402
+from stub_servers import StubCloudflare, async_start_stub  # noqa: E402
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """Sample how late a short sleep wakes up, as a measure of event loop blocking."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def take(self):
+        samples, self.samples = self.samples, []
+        return samples
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def _config_entry(**kwargs):
+    """Build a ConfigEntry with whichever arguments this Home Assistant version takes."""
+    params = inspect.signature(ConfigEntry).parameters
+    kwargs.setdefault("discovery_keys", MappingProxyType({}))
+    kwargs.setdefault("subentries_data", None)
+    return ConfigEntry(**{key: value for key, value in kwargs.items() if key in params})
+
+
+async def async_setup_hass(config_dir):
+    hass = HomeAssistant(config_dir) if "config_dir" in inspect.signature(HomeAssistant).parameters else HomeAssistant()
+    hass.config.config_dir = config_dir
+    hass.config.skip_pip = True
+    os.symlink(REPO_ROOT / "custom_components", Path(config_dir) / "custom_components")
+
+    from homeassistant import loader
+    from homeassistant.config_entries import ConfigEntries
+    from homeassistant.helpers import area_registry, device_registry, entity, entity_registry, translation
+
+    if hasattr(loader, "async_setup"):
+        loader.async_setup(hass)
+    if hasattr(entity, "async_setup"):
+        entity.async_setup(hass)
+    if hasattr(translation, "async_setup"):
+        translation.async_setup(hass)
+    for registry in (area_registry, device_registry, entity_registry):
+        await registry.async_load(hass)
+    hass.config_entries = ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    await hass.async_start()
+
+    # Keep every file the integration writes inside the throwaway config dir
+    data = hass.data.setdefault(DOMAIN, {})
+    store = ReputationStore(hass, Path(config_dir) / "cloudflare_abuse_monitor.db")
+    await store.async_setup()
+    data["store"] = store
+    config_file = Path(config_dir) / "cloudflare_abuse_monitor_configuration.json"
+    config_file.write_text(json.dumps({"scan_interval_minutes": 1}))
+    data["config_cache"] = ConfigFileCache(hass, config_file)
+    data["prefilter"] = CIDRPrefilter(hass, Path(config_dir) / "cloudflare_abuse_monitor_prefilter.json")
+    data["blacklist"] = BlacklistSnapshot(hass, Path(config_dir) / "cloudflare_abuse_monitor_blacklist.bin")
+    return hass
+
+
+def _calls_delta(after, before):
+    return {key: after[key] - before.get(key, 0) for key in sorted(after) if after[key] - before.get(key, 0)}
+
+
+async def async_run(args):
+    stub = StubCloudflare(
+        zones=args.zones or args.entries,
+        events=args.events,
+        event_rate=args.event_rate,
+        ip_pool=args.ips,
+        skip_ratio=args.skip_ratio,
+        list_items=args.list_items,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        high_risk_ratio=args.high_risk_ratio,
+        seed=args.seed,
+    )
+    runner, base_url = await async_start_stub(stub)
+    api.CLOUDFLARE_API_URL = f"{base_url}/client/v4"
+    api.ABUSEIPDB_API_URL = f"{base_url}/api/v2"
+
+    config_dir = tempfile.mkdtemp(prefix="cam-bench-")
+    hass = await async_setup_hass(config_dir)
+    lag = LoopLagMonitor()
+    lag.start()
+    report = {"settings": vars(args), "setup": None, "cycles": []}
+
+    limiter = get_rate_limiter(hass, "bench-abuseipdb")
+    limiter.rate = args.abuseipdb_rate
+    limiter.burst = limiter.tokens = max(10, args.abuseipdb_rate * 2)
+
+    options = {"mode": args.mode, "abuse_confidence_score": 90, "under_attack_mode": args.mode == "Active"}
+    if args.options:
+        options.update(json.loads(args.options))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    calls_before = dict(stub.calls)
+    for i in range(args.entries):
+        zone = stub.zones[i % len(stub.zones)]
+        entry = _config_entry(
+            version=1,
+            minor_version=1,
+            domain=DOMAIN,
+            title=f"Cloudflare: {zone}.example",
+            data={
+                "email": "bench@example.com",
+                "global_token": "bench-token",
+                "abuseipdb_token": "bench-abuseipdb",
+                "abuse_confidence_score": 90,
+                "recheck_days": 7,
+                "scan_interval_minutes": 1,
+                "zone_id": zone,
+                "zone_name": f"{zone}.example",
+                "account_id": stub.account_id,
+                "list_name": "bench_list",
+                "list_id": stub.list_id,
+                "mode": "Monitor",
+            },
+            options=options,
+            source="user",
+            unique_id=f"bench-{i}",
+        )
+        await hass.config_entries.async_add(entry)
+    await hass.async_block_till_done()
+    report["setup"] = {
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        "api_calls": _calls_delta(stub.calls, calls_before),
+        "peak_traced_mb": round(tracemalloc.get_traced_memory()[1] / 2**20, 1),
+    }
+
+    coordinators = [hass.data[DOMAIN][entry.entry_id] for entry in hass.config_entries.async_entries(DOMAIN)]
+    # The cycles below are driven by hand so they run back to back and together
+    for coordinator in coordinators:
+        coordinator.scheduler.async_cancel_all()
+
+    for cycle in range(args.cycles):
+        await asyncio.sleep(args.pause)
+        lag.take()
+        tracemalloc.reset_peak()
+        calls_before = dict(stub.calls)
+        start = time.perf_counter()
+        await asyncio.gather(*(coordinator._async_run_scan() for coordinator in coordinators))
+        wall = time.perf_counter() - start
+        samples = lag.take()
+        report["cycles"].append({
+            "cycle": cycle + 1,
+            "wall_seconds": round(wall, 3),
+            "api_calls": _calls_delta(stub.calls, calls_before),
+            "loop_lag_max_ms": round(max(samples, default=0) * 1000, 1),
+            "loop_lag_p95_ms": round(_percentile(samples, 0.95) * 1000, 1),
+            "peak_traced_mb": round(tracemalloc.get_traced_memory()[1] / 2**20, 1),
+            "deferred_lookups": sum(
+                (coordinator.data.get("high_risk") or {}).get("deferred_lookups", 0) for coordinator in coordinators
+            ),
+        })
+
+    walls = [cycle["wall_seconds"] for cycle in report["cycles"]]
+    report["summary"] = {
+        "entries": len(coordinators),
+        "cycle_wall_median_seconds": round(statistics.median(walls), 3) if walls else None,
+        "cycle_wall_max_seconds": max(walls, default=None),
+        "total_api_calls": dict(sorted(stub.calls.items())),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+    lag.stop()
+    tracemalloc.stop()
+    await hass.async_stop()
+    await runner.cleanup()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1, help="config entries to set up")
+    parser.add_argument("--zones", type=int, default=0, help="distinct zones, default one per entry")
+    parser.add_argument("--cycles", type=int, default=5, help="scan cycles to measure after setup")
+    parser.add_argument("--pause", type=float, default=1.0, help="seconds between cycles, new events arrive meanwhile")
+    parser.add_argument("--events", type=int, default=10000, help="firewall events per zone already logged today")
+    parser.add_argument("--event-rate", type=float, default=5.0, help="new firewall events per zone per second")
+    parser.add_argument("--ips", type=int, default=2000, help="distinct client IPs the events come from")
+    parser.add_argument("--skip-ratio", type=float, default=0.8, help="share of events with action skip")
+    parser.add_argument("--high-risk-ratio", type=float, default=0.1, help="share of IPs AbuseIPDB scores 100")
+    parser.add_argument("--list-items", type=int, default=1000, help="items already on the Cloudflare list")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every stub response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="random extra delay of up to this much")
+    parser.add_argument("--abuseipdb-rate", type=float, default=5.0, help="AbuseIPDB lookups per second the client allows itself")
+    parser.add_argument("--mode", choices=["Monitor", "Active"], default="Monitor")
+    parser.add_argument("--options", help="JSON object of extra entry options")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report to this file as well")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    report = asyncio.run(async_run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Local stand-ins for the Cloudflare and AbuseIPDB endpoints the integration calls.
+
+The server generates firewall events, traffic and list items from a seed, so
+runs with the same settings are comparable, and counts every request per
+endpoint. Responses can be delayed by a fixed latency plus jitter.
+"""
+import asyncio
+import random
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def _ip(rng, ipv6_ratio):
+    if rng.random() < ipv6_ratio:
+        return "2001:db8:%x:%x::%x" % (rng.randrange(65536), rng.randrange(65536), rng.randrange(1, 65536))
+    return "%d.%d.%d.%d" % (rng.randrange(1, 224), rng.randrange(256), rng.randrange(256), rng.randrange(1, 255))
+
+
+class StubCloudflare:
+    """State and handlers of the stand-in Cloudflare and AbuseIPDB APIs."""
+
+    def __init__(self, zones=1, events=10000, event_rate=5.0, ip_pool=2000, skip_ratio=0.8,
+                 list_items=1000, latency=0.0, jitter=0.0, high_risk_ratio=0.1, ipv6_ratio=0.1, seed=1):
+        self.rng = random.Random(seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.event_rate = event_rate
+        self.skip_ratio = skip_ratio
+        self.high_risk_ratio = high_risk_ratio
+        self.calls = Counter()
+        self.account_id = "bench-account"
+        self.list_id = "bench-list"
+        self.zones = [f"bench-zone-{i}" for i in range(zones)]
+        self.ip_pool = [_ip(self.rng, ipv6_ratio) for _ in range(ip_pool)]
+        self.scores = {}
+        self._next_ray = 0
+
+        # Events per zone, oldest first, as (datetime, event); a backlog spread over today so far
+        now = datetime.utcnow()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        span = max(1, int((now - midnight).total_seconds()))
+        self.events = {}
+        self.generated_until = {}
+        for zone in self.zones:
+            stamps = sorted(self.rng.randrange(span) for _ in range(events))
+            self.events[zone] = [self._event(zone, midnight + timedelta(seconds=s)) for s in stamps]
+            self.generated_until[zone] = now
+
+        self.list_items = {}
+        for i in range(list_items):
+            ip = _ip(self.rng, ipv6_ratio)
+            self.list_items[ip] = {"id": f"item-{i}", "ip": ip, "comment": ""}
+        self._next_item = list_items
+        self.security_level = {zone: "high" for zone in self.zones}
+
+    def _event(self, zone, when):
+        self._next_ray += 1
+        return (when.strftime(TIME_FORMAT), {
+            "clientIP": self.rng.choice(self.ip_pool),
+            "action": "skip" if self.rng.random() < self.skip_ratio else "block",
+            "clientCountryName": "XX",
+            "datetime": when.strftime(TIME_FORMAT),
+            "rayName": f"{zone}-{self._next_ray}",
+            "userAgent": "benchmark",
+        })
+
+    def _extend(self, zone):
+        """Generate the events that arrived at event_rate per second since the last call."""
+        now = datetime.utcnow()
+        since = self.generated_until[zone]
+        count = int((now - since).total_seconds() * self.event_rate)
+        if count <= 0:
+            return
+        span = (now - since).total_seconds()
+        stamps = sorted(self.rng.uniform(0, span) for _ in range(count))
+        self.events[zone].extend(self._event(zone, since + timedelta(seconds=s)) for s in stamps)
+        self.generated_until[zone] = now
+
+    async def _delay(self):
+        delay = self.latency + self.rng.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        self.calls[f"{request.method} {route}"] += 1
+        await self._delay()
+        return await handler(request)
+
+    # Cloudflare
+
+    async def zones_handler(self, request):
+        return web.json_response({"success": True, "result": [
+            {"id": zone, "name": f"{zone}.example", "account": {"id": self.account_id}} for zone in self.zones
+        ]})
+
+    async def graphql_handler(self, request):
+        body = await request.json()
+        variables = body.get("variables") or {}
+        viewer = {}
+        i = 0
+        while f"z{i}_zoneTag" in variables:
+            viewer[f"z{i}"] = [self._scan(variables[f"z{i}_zoneTag"], {
+                key[len(f"z{i}_"):]: value for key, value in variables.items() if key.startswith(f"z{i}_")
+            })]
+            i += 1
+        return web.json_response({"data": {"viewer": viewer}, "errors": None})
+
+    def _scan(self, zone, variables):
+        self._extend(zone)
+        until = variables["until"]
+        result = {}
+        events = self.events[zone]
+        if "trafficSince" in variables:
+            since = datetime.strptime(variables["trafficSince"], TIME_FORMAT)
+            end = datetime.strptime(until, TIME_FORMAT)
+            hours = []
+            hour = since.replace(minute=0, second=0)
+            while hour < end:
+                requests = self.rng.randrange(1000, 5000)
+                hours.append({"dimensions": {"datetime": hour.strftime(TIME_FORMAT)}, "sum": {
+                    "pageViews": requests // 4, "requests": requests, "bytes": requests * 2048,
+                    "cachedBytes": requests * 1024, "cachedRequests": requests // 2,
+                    "encryptedBytes": requests * 2048, "encryptedRequests": requests,
+                }})
+                hour += timedelta(hours=1)
+            result["traffic"] = hours
+        if "minutesSince" in variables:
+            since = datetime.strptime(variables["minutesSince"], TIME_FORMAT)
+            end = datetime.strptime(until, TIME_FORMAT)
+            minutes = []
+            minute = since.replace(second=0)
+            while minute < end and len(minutes) < int(variables["minutesLimit"]):
+                minutes.append({"dimensions": {"datetime": minute.strftime(TIME_FORMAT)},
+                                "sum": {"requests": self.rng.randrange(10, 100)}})
+                minute += timedelta(minutes=1)
+            result["minutes"] = minutes
+        if "eventsSince" in variables:
+            start = bisect_left(events, (variables["eventsSince"],))
+            end = bisect_left(events, (until,))
+            limit = int(variables["eventsLimit"])
+            result["events"] = [event for _, event in events[start:min(end, start + limit)]]
+        return result
+
+    async def lists_handler(self, request):
+        return web.json_response({"result": [{"name": "bench_list", "id": self.list_id}]})
+
+    async def list_items_get(self, request):
+        per_page = int(request.query.get("per_page", 500))
+        start = int(request.query.get("cursor", 0))
+        items = list(self.list_items.values())
+        page = items[start:start + per_page]
+        cursors = {"after": str(start + per_page)} if start + per_page < len(items) else {}
+        return web.json_response({"result": page, "result_info": {"cursors": cursors}})
+
+    async def list_items_post(self, request):
+        for item in await request.json():
+            if item["ip"] not in self.list_items:
+                self.list_items[item["ip"]] = {"id": f"item-{self._next_item}", **item}
+                self._next_item += 1
+        return web.json_response({"result": {"operation_id": "op-add"}})
+
+    async def list_items_delete(self, request):
+        ids = {item["id"] for item in (await request.json())["items"]}
+        self.list_items = {ip: item for ip, item in self.list_items.items() if item["id"] not in ids}
+        return web.json_response({"result": {"operation_id": "op-delete"}})
+
+    async def bulk_operation(self, request):
+        return web.json_response({"result": {"id": request.match_info["operation_id"], "status": "completed"}})
+
+    async def security_level_get(self, request):
+        return web.json_response({"result": {"value": self.security_level[request.match_info["zone_id"]]}})
+
+    async def security_level_patch(self, request):
+        self.security_level[request.match_info["zone_id"]] = (await request.json())["value"]
+        return web.json_response({"result": {"value": self.security_level[request.match_info["zone_id"]]}})
+
+    # AbuseIPDB
+
+    def _score(self, ip):
+        if ip not in self.scores:
+            self.scores[ip] = 100 if self.rng.random() < self.high_risk_ratio else self.rng.randrange(0, 50)
+        return self.scores[ip]
+
+    def _rate_limit_headers(self):
+        return {"X-RateLimit-Limit": "100000", "X-RateLimit-Remaining": "99999"}
+
+    async def abuse_check(self, request):
+        ip = request.query["ipAddress"]
+        return web.json_response({"data": {
+            "ipAddress": ip,
+            "abuseConfidenceScore": self._score(ip),
+            "countryCode": "XX",
+            "usageType": "Data Center/Web Hosting/Transit",
+            "domain": "example.net",
+            "totalReports": 1,
+            "lastReportedAt": datetime.utcnow().strftime(TIME_FORMAT),
+        }}, headers=self._rate_limit_headers())
+
+    async def abuse_check_block(self, request):
+        return web.json_response({"data": {"reportedAddress": []}}, headers=self._rate_limit_headers())
+
+    async def abuse_blacklist(self, request):
+        minimum = int(request.query.get("confidenceMinimum", 100))
+        listed = [ip for ip in self.ip_pool if self._score(ip) >= minimum]
+        return web.Response(text="\n".join(listed), headers=self._rate_limit_headers())
+
+    def build_app(self):
+        app = web.Application(middlewares=[self.middleware], client_max_size=64 * 1024 * 1024)
+        cf = "/client/v4"
+        lists = cf + "/accounts/{account_id}/rules/lists"
+        app.add_routes([
+            web.get(cf + "/zones", self.zones_handler),
+            web.post(cf + "/graphql", self.graphql_handler),
+            web.get(lists, self.lists_handler),
+            web.get(lists + "/bulk_operations/{operation_id}", self.bulk_operation),
+            web.get(lists + "/{list_id}/items", self.list_items_get),
+            web.post(lists + "/{list_id}/items", self.list_items_post),
+            web.delete(lists + "/{list_id}/items", self.list_items_delete),
+            web.get(cf + "/zones/{zone_id}/settings/security_level", self.security_level_get),
+            web.patch(cf + "/zones/{zone_id}/settings/security_level", self.security_level_patch),
+            web.get("/api/v2/check", self.abuse_check),
+            web.get("/api/v2/check-block", self.abuse_check_block),
+            web.get("/api/v2/blacklist", self.abuse_blacklist),
+        ])
+        return app
+
+
+async def async_start_stub(stub, host="127.0.0.1", port=0):
+    """Serve stub on host:port and return (runner, base_url)."""
+    runner = web.AppRunner(stub.build_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
@@ -2,18 +2,48 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.const import Platform
 from .const import DOMAIN
+from .coordinator import CloudflareAbuseMonitorCoordinator
+from .logpush import async_register_logpush_view
+from .services import async_setup_services, async_unload_services
+from .store import async_get_store
 
 PLATFORMS: list[Platform] = [Platform.SENSOR]
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Cloudflare Abuse Monitor from a config entry."""
-    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = entry
+    store = await async_get_store(hass)
+    coordinator = CloudflareAbuseMonitorCoordinator(hass, entry, store)
+    await coordinator.async_config_entry_first_refresh()
+    coordinator.async_start()
+    entry.async_on_unload(coordinator.scheduler.async_cancel_all)
+    entry.async_on_unload(lambda: coordinator.graphql_batcher.release(entry.entry_id))
+    entry.async_on_unload(entry.add_update_listener(async_options_updated))
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+    async_setup_services(hass)
+    if coordinator.logpush_enabled:
+        async_register_logpush_view(hass)
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
+async def async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options without reloading the entry."""
+    coordinator = hass.data[DOMAIN].get(entry.entry_id)
+    if coordinator is not None:
+        await coordinator.async_options_updated()
+        if coordinator.logpush_enabled:
+            async_register_logpush_view(hass)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload Cloudflare Abuse Monitor config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id, None)
+        if not any(e.entry_id in hass.data[DOMAIN] for e in hass.config_entries.async_entries(DOMAIN)):
+            async_unload_services(hass)
+            # Both hold the store that is about to be closed
+            hass.data[DOMAIN].pop("lookup_engines", None)
+            hass.data[DOMAIN].pop("list_mirrors", None)
+            store = hass.data[DOMAIN].pop("store", None)
+            if store is not None:
+                await store.async_close()
     return unload_ok
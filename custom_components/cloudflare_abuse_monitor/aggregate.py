@@ -0,0 +1,59 @@
+import ipaddress
+from collections import defaultdict
+
+from .prefilter import ALLOW, PrefixTrie
+
+# Prefix length offenders are collapsed into, per IP version.
+AGGREGATE_PREFIXES = {4: 24, 6: 64}
+
+
+def group_by_network(ips):
+    """Return {network: [ip, ...]}, grouping IPs by their /24 (IPv4) or /64 (IPv6)."""
+    groups = defaultdict(list)
+    for ip in ips:
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            continue
+        network = ipaddress.ip_network(f"{address}/{AGGREGATE_PREFIXES[address.version]}", strict=False)
+        groups[str(network)].append(ip)
+    return dict(groups)
+
+
+def aggregate_ips(scores, min_ips, prefilter_trie=None):
+    """Collapse IPs into their network where at least min_ips of them share it.
+
+    scores maps each IP to its abuse confidence score. Returns the entries to
+    write as {ip or network: score}, a network taking its highest member
+    score, and {network: [ip, ...]} of the networks that were collapsed.
+    A network overlapping an allow network of prefilter_trie is never
+    collapsed, since blocking it would block the allowed addresses.
+    """
+    entries = dict(scores)
+    collapsed = {}
+    if min_ips <= 0:
+        return entries, collapsed
+    for network, members in group_by_network(scores).items():
+        if len(members) < min_ips:
+            continue
+        if prefilter_trie is not None and prefilter_trie.overlaps(network, ALLOW):
+            continue
+        collapsed[network] = members
+        for ip in members:
+            del entries[ip]
+        entries[network] = max((scores[ip] or 0) for ip in members)
+    return entries, collapsed
+
+
+def drop_covered(ips, entries):
+    """Return the IPs not inside any network among entries, such as the items of a list."""
+    networks = [entry for entry in entries if "/" in entry]
+    if not networks:
+        return list(ips)
+    trie = PrefixTrie()
+    for network in networks:
+        try:
+            trie.insert(network, True)
+        except ValueError:
+            continue
+    return [ip for ip in ips if trie.lookup(ip) is None]
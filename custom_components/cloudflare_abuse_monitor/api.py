@@ -1,13 +1,21 @@
-import requests
+import aiohttp
 from datetime import datetime, timedelta
 import logging
 import json
+from functools import lru_cache
 
 
 _LOGGER = logging.getLogger(__name__)
 
-CLOUDFLARE_ZONES_URL = "https://api.cloudflare.com/client/v4/zones"
-CLOUDFLARE_GRAPHQL_URL = "https://api.cloudflare.com/client/v4/graphql"
+CLOUDFLARE_API_URL = "https://api.cloudflare.com/client/v4"
+ABUSEIPDB_API_URL = "https://api.abuseipdb.com/api/v2"
+
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30)
+FIREWALL_EVENTS_PAGE_SIZE = 1000
+# Largest limit firewallEventsAdaptive accepts
+FIREWALL_EVENTS_MAX_LIMIT = 10000
+LIST_ITEMS_PAGE_SIZE = 500
+
 
 def get_headers(email, api_key):
     return {
@@ -16,27 +24,32 @@ def get_headers(email, api_key):
         "Content-Type": "application/json"
     }
 
-def fetch_zones(email, api_key):
+async def fetch_zones(session: aiohttp.ClientSession, email, api_key):
     headers = get_headers(email, api_key)
-    response = requests.get(CLOUDFLARE_ZONES_URL, headers=headers)
-    response.raise_for_status()
-    return response.json()
-
-def fetch_today_traffic_summary(email, api_key, zone_id):
-    headers = get_headers(email, api_key)
-
-    now = datetime.utcnow()
-    today_midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
-    datetime_geq = today_midnight.strftime('%Y-%m-%dT%H:%M:%SZ')
-    datetime_lt = now.strftime('%Y-%m-%dT%H:%M:%SZ')
-
-    query = f"""
-    {{
-      viewer {{
-        zones(filter: {{zoneTag: "{zone_id}"}}) {{
-          httpRequests1hGroups(limit: 100, filter: {{datetime_geq: "{datetime_geq}", datetime_lt: "{datetime_lt}"}}) {{
-            sum {{
+    async with session.get(f"{CLOUDFLARE_API_URL}/zones", headers=headers, timeout=REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        return await response.json()
+
+TRAFFIC_FIELDS = {
+    "pageViews": "pageviews",
+    "requests": "requests",
+    "bytes": "bytes",
+    "cachedBytes": "cached_bytes",
+    "cachedRequests": "cached_requests",
+    "encryptedBytes": "encrypted_bytes",
+    "encryptedRequests": "encrypted_requests",
+}
+
+
+# Aliased selections a zone scan can combine in one zones(...) block, with the
+# variables each one uses besides $zoneTag and $until.
+ZONE_SCAN_PARTS = {
+    "traffic": ("""
+          traffic: httpRequests1hGroups(limit: 25, filter: {datetime_geq: $trafficSince, datetime_lt: $until}) {
+            dimensions {
+              datetime
+            }
+            sum {
               pageViews
               requests
               encryptedBytes
@@ -44,113 +57,226 @@ def fetch_today_traffic_summary(email, api_key, zone_id):
               bytes
               cachedBytes
               cachedRequests
-            }}
-          }}
-        }}
-      }}
-    }}
-    """
-
-    response = requests.post(
-        CLOUDFLARE_GRAPHQL_URL,
-        headers=headers,
-        json={'query': query}
-    )
-    response.raise_for_status()
-    data = response.json()
-
-    summary = data["data"]["viewer"]["zones"][0]["httpRequests1hGroups"][0]["sum"]
-
-    return {
-        "from": datetime_geq,
-        "to": datetime_lt,
-        "pageviews": summary.get("pageViews", 0),
-        "requests": summary.get("requests", 0),
-        "bytes": summary.get("bytes", 0),
-        "cached_bytes": summary.get("cachedBytes", 0),
-        "cached_requests": summary.get("cachedRequests", 0),
-        "encrypted_bytes": summary.get("encryptedBytes", 0),
-        "encrypted_requests": summary.get("encryptedRequests", 0),
-    }
-
-
-
-def get_skip_ips(zone_id, datetime_geq, datetime_lt, headers):
-    query = f"""
-    {{
-      viewer {{
-        zones(filter: {{zoneTag: "{zone_id}"}}) {{
-          firewallEventsAdaptive(
-            limit: 1000,
-            filter: {{
-              datetime_geq: "{datetime_geq}",
-              datetime_lt: "{datetime_lt}"
-            }}
-          ) {{
+            }
+          }""", ("trafficSince",)),
+    "minutes": ("""
+          minutes: httpRequests1mGroups(limit: $minutesLimit, orderBy: [datetime_ASC], filter: {datetime_geq: $minutesSince, datetime_lt: $until}) {
+            dimensions {
+              datetime
+            }
+            sum {
+              requests
+            }
+          }""", ("minutesSince", "minutesLimit")),
+    "events": ("""
+          events: firewallEventsAdaptive(limit: $eventsLimit, orderBy: [datetime_ASC], filter: {datetime_geq: $eventsSince, datetime_lt: $until}) {
             clientIP
             action
             clientCountryName
             datetime
+            rayName
             userAgent
-          }}
-        }}
+          }""", ("eventsSince", "eventsLimit")),
+}
+ZONE_SCAN_VARIABLE_TYPES = {
+    "zoneTag": "string",
+    "until": "Time",
+    "trafficSince": "Time",
+    "minutesSince": "Time",
+    "minutesLimit": "uint64!",
+    "eventsSince": "Time",
+    "eventsLimit": "uint64!",
+}
+
+
+@lru_cache(maxsize=32)
+def build_zone_scan_query(shape):
+    """Return the GraphQL text for zones scanning the given parts, shape being ((part, ...), ...).
+
+    Zone i is aliased z{i} and its variables are prefixed with z{i}_, so one
+    text serves every request of the same shape and only the variables change.
+    """
+    declarations = []
+    blocks = []
+    for i, parts in enumerate(shape):
+        prefix = f"z{i}_"
+        names = ["zoneTag", "until"] + [name for part in parts for name in ZONE_SCAN_PARTS[part][1]]
+        declarations += [f"${prefix}{name}: {ZONE_SCAN_VARIABLE_TYPES[name]}" for name in names]
+        selection = "".join(ZONE_SCAN_PARTS[part][0] for part in parts).replace("$", f"${prefix}")
+        blocks.append(f"""
+        z{i}: zones(filter: {{zoneTag: ${prefix}zoneTag}}) {{{selection}
+        }}""")
+    return f"""
+    query ZoneScan({", ".join(declarations)}) {{
+      viewer {{{"".join(blocks)}
       }}
     }}
     """
 
-    response = requests.post(
-        'https://api.cloudflare.com/client/v4/graphql',
-        headers=headers,
-        json={'query': query}
-    )
 
-    if response.status_code != 200:
-        print(f"Failed to fetch data: {response.status_code} - {response.text}")
-        return []
+async def fetch_zone_scans(session: aiohttp.ClientSession, headers, scans):
+    """Run (zone_id, parts, variables) scans in one GraphQL request.
 
-    try:
-        result = response.json()
-        events = result.get("data", {}).get("viewer", {}).get("zones", [])[0].get("firewallEventsAdaptive", [])
-        skip_ips = {event["clientIP"] for event in events if event.get("action") == "skip"}
-        return list(skip_ips)
-    except Exception as e:
-        print(f"Error parsing result: {e}")
-        return []
+    Returns each zone's result, keyed by part alias, or the exception for a
+    zone missing from the response, in the order of scans.
+    """
+    shape = tuple(tuple(part for part in ZONE_SCAN_PARTS if part in parts) for _, parts, _ in scans)
+    variables = {}
+    for i, (zone_id, _, zone_variables) in enumerate(scans):
+        variables[f"z{i}_zoneTag"] = zone_id
+        for name, value in zone_variables.items():
+            variables[f"z{i}_{name}"] = value
+
+    async with session.post(
+        f"{CLOUDFLARE_API_URL}/graphql",
+        headers=headers,
+        json={'query': build_zone_scan_query(shape), 'variables': variables},
+        timeout=REQUEST_TIMEOUT
+    ) as response:
+        response.raise_for_status()
+        data = await response.json()
+
+    viewer = (data.get("data") or {}).get("viewer") or {}
+    results = []
+    for i, (zone_id, _, _) in enumerate(scans):
+        zones = viewer.get(f"z{i}")
+        if zones:
+            results.append(zones[0])
+        else:
+            results.append(RuntimeError(f"GraphQL query for zone {zone_id} failed: {data.get('errors')}"))
+    return results
+
+
+async def fetch_zone_scan(session: aiohttp.ClientSession, headers, zone_id, parts, variables, batcher=None):
+    """Fetch the given parts of one zone, through batcher when given, and raise on failure."""
+    if batcher is not None:
+        return await batcher.async_query(zone_id, parts, variables)
+    result = (await fetch_zone_scans(session, headers, [(zone_id, parts, variables)]))[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def parse_traffic_hours(groups):
+    """Return {hour_start: sums} from the traffic part of a zone scan."""
+    return {
+        group["dimensions"]["datetime"]: {
+            key: group["sum"].get(field, 0) for field, key in TRAFFIC_FIELDS.items()
+        }
+        for group in groups or []
+    }
 
 
+def parse_traffic_minutes(groups):
+    """Return [(minute_start, requests)] from the minutes part of a zone scan, oldest first."""
+    return [(group["dimensions"]["datetime"], group["sum"].get("requests", 0)) for group in groups or []]
 
 
-def fetch_rules_lists(account_id, headers):
-    url = f"https://api.cloudflare.com/client/v4/accounts/{account_id}/rules/lists"
-    response = requests.get(url, headers=headers)
+def firewall_events_page_limit(max_events=None, yielded=0, seen_rays=()):
+    """Return the page size iter_firewall_events asks for, given its budget and boundary rays.
 
-    if response.status_code == 200:
-        data = response.json()
-        return {item["name"]: item["id"] for item in data.get("result", [])}
-    else:
-        return {}
+    The boundary rays come back at the start of the next page, so the limit
+    grows by their number; otherwise a second holding a page of events or
+    more could never be paged past.
+    """
+    limit = FIREWALL_EVENTS_PAGE_SIZE + len(seen_rays)
+    if max_events is not None:
+        limit = min(limit, max_events - yielded + len(seen_rays))
+    return min(limit, FIREWALL_EVENTS_MAX_LIMIT)
+
+
+async def iter_firewall_events(session: aiohttp.ClientSession, zone_id, datetime_geq, datetime_lt, headers, max_events=None, seen_rays=None, first_page=None):
+    """Yield firewallEventsAdaptive events oldest first, paging by datetime cursor.
+
+    Each page asks for events at or after the datetime of the last event seen;
+    events repeated at that boundary are dropped by rayName. seen_rays holds the
+    rayNames already processed at datetime_geq by a previous call. Paging stops
+    when the window is exhausted or max_events have been yielded. first_page
+    holds the events part of a zone scan already made for this window, fetched
+    with firewall_events_page_limit(max_events, 0, seen_rays). Follow-up
+    pages are fetched directly: they depend on the page before, so waiting
+    to batch them with other zones only adds latency.
+    """
+    cursor = datetime_geq
+    boundary_rays = set(seen_rays or ())
+    yielded = 0
+
+    while max_events is None or yielded < max_events:
+        limit = firewall_events_page_limit(max_events, yielded, boundary_rays)
+        if first_page is not None:
+            events, first_page = first_page, None
+        else:
+            zone = await fetch_zone_scan(
+                session, headers, zone_id, ("events",),
+                {"eventsSince": cursor, "eventsLimit": limit, "until": datetime_lt}
+            )
+            events = zone.get("events") or []
+
+        new_events = [event for event in events if event.get("rayName") not in boundary_rays]
+        for event in new_events:
+            yield event
+            yielded += 1
+            if max_events is not None and yielded >= max_events:
+                _LOGGER.info("Firewall event budget of %d reached for zone %s", max_events, zone_id)
+                return
+
+        if len(events) < limit:
+            return
+        if not new_events:
+            # More events in one second than the API returns in a page; step past it
+            _LOGGER.warning("⚠️ More than %d firewall events at %s, skipping the rest of that second", limit, cursor)
+            cursor = (datetime.strptime(cursor, '%Y-%m-%dT%H:%M:%SZ') + timedelta(seconds=1)).strftime('%Y-%m-%dT%H:%M:%SZ')
+            boundary_rays = set()
+            continue
+
+        last = events[-1]["datetime"]
+        if last != cursor:
+            boundary_rays = set()
+        cursor = last
+        boundary_rays.update(event.get("rayName") for event in events if event["datetime"] == cursor)
+
+
+async def fetch_rules_lists(session: aiohttp.ClientSession, account_id, headers):
+    url = f"{CLOUDFLARE_API_URL}/accounts/{account_id}/rules/lists"
+    async with session.get(url, headers=headers, timeout=REQUEST_TIMEOUT) as response:
+        if response.status == 200:
+            data = await response.json()
+            return {item["name"]: item["id"] for item in data.get("result", [])}
+        else:
+            return {}
+
+
+
+async def iter_list_items(session: aiohttp.ClientSession, account_id, list_id, headers):
+    """Yield every item of a Cloudflare list, following result_info.cursors.after."""
+    url = f"{CLOUDFLARE_API_URL}/accounts/{account_id}/rules/lists/{list_id}/items"
+    params = {"per_page": LIST_ITEMS_PAGE_SIZE}
+    while True:
+        async with session.get(url, headers=headers, params=params, timeout=REQUEST_TIMEOUT) as response:
+            if response.status != 200:
+                _LOGGER.error("❌ API Error while fetching list items: %s\n%s", response.status, await response.text())
+                response.raise_for_status()
+            data = await response.json()
 
+        for item in data.get("result", []):
+            yield item
 
+        after = (data.get("result_info") or {}).get("cursors", {}).get("after")
+        if not after:
+            return
+        params = {"per_page": LIST_ITEMS_PAGE_SIZE, "cursor": after}
 
-def get_current_list_ips(account_id, list_id, headers):
-    url = f"https://api.cloudflare.com/client/v4/accounts/{account_id}/rules/lists/{list_id}/items"
-    response = requests.get(url, headers=headers)
 
-    current_ips = set()
-    if response.status_code == 200:
-        data = response.json()
-        for item in data.get("result", []):
-            ip = item.get("ip")
-            if ip:
-                current_ips.add(ip)
-    else:
-        print(f"❌ API Error while fetching list items: {response.status_code}\n{response.text}")
+class AbuseIPDBRateLimitError(Exception):
+    """Raised when AbuseIPDB answers 429 Too Many Requests."""
 
-    return current_ips
+    def __init__(self, retry_after):
+        super().__init__(f"AbuseIPDB rate limit hit, retry after {retry_after}s")
+        self.retry_after = retry_after
 
 
-def check_abuse_ip(ip: str, api_key: str):
-  url = "https://api.abuseipdb.com/api/v2/check"
+async def check_abuse_ip(session: aiohttp.ClientSession, ip: str, api_key: str, rate_limiter=None):
+  url = f"{ABUSEIPDB_API_URL}/check"
   querystring = {
       'ipAddress': ip,
       'maxAgeInDays': '90'
@@ -160,57 +286,133 @@ def check_abuse_ip(ip: str, api_key: str):
       'Accept': 'application/json'
   }
 
-  response = requests.get(url, headers=headers, params=querystring)
-  if response.status_code == 200:
-      data = response.json()
-      return {
-          "ip": ip,
-          "abuse_confidence_score": data['data']['abuseConfidenceScore'],
-          "countryCode": data['data'].get('countryCode', 'Unknown'),
-          "usageType": data['data'].get('usageType', 'Unknown'),
-          "domain": data['data'].get('domain', 'Unknown'),
-          "totalReports": data['data'].get('totalReports', 0),
-          "lastReportedAt": data['data'].get('lastReportedAt', 'Never')
-      }
-  else:
-      return {"ip": ip, "error": response.text}
+  async with session.get(url, headers=headers, params=querystring, timeout=REQUEST_TIMEOUT) as response:
+      if rate_limiter is not None:
+          rate_limiter.update_from_headers(response.headers)
+      if response.status == 429:
+          raise AbuseIPDBRateLimitError(int(response.headers.get("Retry-After", 60)))
+      if response.status == 200:
+          data = await response.json()
+          return {
+              "ip": ip,
+              "abuse_confidence_score": data['data']['abuseConfidenceScore'],
+              "countryCode": data['data'].get('countryCode', 'Unknown'),
+              "usageType": data['data'].get('usageType', 'Unknown'),
+              "domain": data['data'].get('domain', 'Unknown'),
+              "totalReports": data['data'].get('totalReports', 0),
+              "lastReportedAt": data['data'].get('lastReportedAt', 'Never')
+          }
+      else:
+          return {"ip": ip, "error": await response.text()}
+
+
+
+async def check_abuse_block(session: aiohttp.ClientSession, network: str, api_key: str, max_age_days=30):
+    """Return [(ip, score)] of the addresses AbuseIPDB has reports for within network."""
+    url = f"{ABUSEIPDB_API_URL}/check-block"
+    querystring = {
+        'network': network,
+        'maxAgeInDays': str(max_age_days)
+    }
+    headers = {
+        'Key': api_key,
+        'Accept': 'application/json'
+    }
 
+    async with session.get(url, headers=headers, params=querystring, timeout=REQUEST_TIMEOUT) as response:
+        if response.status == 429:
+            raise AbuseIPDBRateLimitError(int(response.headers.get("Retry-After", 60)))
+        response.raise_for_status()
+        data = await response.json()
+    return [
+        (address["ipAddress"], address.get("abuseConfidenceScore", 0))
+        for address in data["data"].get("reportedAddress", [])
+    ]
 
 
-def add_ips_to_list(account_id, list_id, new_ips, headers):
-    url = f"https://api.cloudflare.com/client/v4/accounts/{account_id}/rules/lists/{list_id}/items"
-    payload = [{"ip": ip} for ip in new_ips]
 
-    response = requests.post(url, headers=headers, json=payload)
+async def fetch_abuse_blacklist(session: aiohttp.ClientSession, api_key: str, confidence_minimum=100, limit=10000):
+    """Return the IPs on the AbuseIPDB blacklist scoring at least confidence_minimum."""
+    url = f"{ABUSEIPDB_API_URL}/blacklist"
+    querystring = {
+        'confidenceMinimum': str(confidence_minimum),
+        'limit': str(limit)
+    }
+    headers = {
+        'Key': api_key,
+        'Accept': 'text/plain'
+    }
 
-    if response.status_code == 200:
-        _LOGGER.info("✅ Successfully added new IPs to the list.")
-        _LOGGER.debug(response.json())
-    else:
-        _LOGGER.error("❌ Failed to add IPs: %s\n%s", response.status_code, response.text)
+    async with session.get(url, headers=headers, params=querystring, timeout=REQUEST_TIMEOUT) as response:
+        if response.status == 429:
+            raise AbuseIPDBRateLimitError(int(response.headers.get("Retry-After", 60)))
+        response.raise_for_status()
+        return (await response.text()).split()
 
 
 
-def set_under_attack_mode(zone_id, headers, enable=True):
-    url = f"https://api.cloudflare.com/client/v4/zones/{zone_id}/settings/security_level"
+async def add_ips_to_list(session: aiohttp.ClientSession, account_id, list_id, new_ips, headers, comments=None):
+    """Start a bulk append of new_ips to the list and return its operation_id, or None on failure.
+
+    comments optionally maps an IP to the comment stored on its list item.
+    """
+    url = f"{CLOUDFLARE_API_URL}/accounts/{account_id}/rules/lists/{list_id}/items"
+    comments = comments or {}
+    payload = [{"ip": ip, "comment": comments[ip]} if ip in comments else {"ip": ip} for ip in new_ips]
+
+    async with session.post(url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT) as response:
+        if response.status == 200:
+            data = await response.json()
+            _LOGGER.info("✅ Submitted %d IPs to the list.", len(payload))
+            _LOGGER.debug(data)
+            return data.get("result", {}).get("operation_id")
+        else:
+            _LOGGER.error("❌ Failed to add IPs: %s\n%s", response.status, await response.text())
+            return None
+
+
+async def delete_list_items(session: aiohttp.ClientSession, account_id, list_id, item_ids, headers):
+    """Start a bulk delete of list items by id and return its operation_id, or None on failure."""
+    url = f"{CLOUDFLARE_API_URL}/accounts/{account_id}/rules/lists/{list_id}/items"
+    payload = {"items": [{"id": item_id} for item_id in item_ids]}
+
+    async with session.delete(url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT) as response:
+        if response.status == 200:
+            _LOGGER.info("✅ Submitted removal of %d list items.", len(item_ids))
+            return (await response.json()).get("result", {}).get("operation_id")
+        else:
+            _LOGGER.error("❌ Failed to remove list items: %s\n%s", response.status, await response.text())
+            return None
+
+
+async def get_bulk_operation(session: aiohttp.ClientSession, account_id, operation_id, headers):
+    """Return the status of a list bulk operation: pending, running, completed or failed."""
+    url = f"{CLOUDFLARE_API_URL}/accounts/{account_id}/rules/lists/bulk_operations/{operation_id}"
+    async with session.get(url, headers=headers, timeout=REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        return (await response.json()).get("result", {})
+
+
+
+async def set_under_attack_mode(session: aiohttp.ClientSession, zone_id, headers, enable=True):
+    url = f"{CLOUDFLARE_API_URL}/zones/{zone_id}/settings/security_level"
     mode = "under_attack" if enable else "high"
 
     payload = {"value": mode}
-    response = requests.patch(url, headers=headers, json=payload)
-
-    if response.status_code == 200:
-        _LOGGER.info("✅ Set Cloudflare 'Under Attack' mode to: %s", mode)
-        return mode
-    else:
-        _LOGGER.error("❌ Failed to update security level: %s - %s", response.status_code, response.text)
-        return "error"
-
-
-def get_cloudflare_security_level(zone_id, headers):
-    url = f"https://api.cloudflare.com/client/v4/zones/{zone_id}/settings/security_level"
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return response.json().get("result", {}).get("value", "")
-    else:
-        _LOGGER.error(f"Failed to fetch Cloudflare security level: {response.status_code}")
-        return ""
\ No newline at end of file
+    async with session.patch(url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT) as response:
+        if response.status == 200:
+            _LOGGER.info("✅ Set Cloudflare 'Under Attack' mode to: %s", mode)
+            return mode
+        else:
+            _LOGGER.error("❌ Failed to update security level: %s - %s", response.status, await response.text())
+            return "error"
+
+
+async def get_cloudflare_security_level(session: aiohttp.ClientSession, zone_id, headers):
+    url = f"{CLOUDFLARE_API_URL}/zones/{zone_id}/settings/security_level"
+    async with session.get(url, headers=headers, timeout=REQUEST_TIMEOUT) as response:
+        if response.status == 200:
+            return (await response.json()).get("result", {}).get("value", "")
+        else:
+            _LOGGER.error(f"Failed to fetch Cloudflare security level: {response.status}")
+            return ""
@@ -0,0 +1,132 @@
+import asyncio
+import ipaddress
+import json
+import logging
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+from .api import fetch_abuse_blacklist
+from .configuration import atomic_write
+from .const import BLACKLIST_FILE, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# AbuseIPDB does not accept a lower confidenceMinimum for the blacklist.
+MIN_CONFIDENCE = 25
+
+
+def _contains(values, value):
+    i = bisect_left(values, value)
+    return i < len(values) and values[i] == value
+
+
+class BlacklistSnapshot:
+    """Local copy of the AbuseIPDB blacklist, for lookups without an API call.
+
+    IPv4 addresses are kept as a sorted array of 32-bit integers and IPv6
+    addresses as a sorted list of integers, both searched by bisection. On
+    disk the file is a JSON header line followed by the IPv4 array and the
+    IPv6 addresses as 16-byte big-endian records, replaced atomically.
+    """
+
+    def __init__(self, hass, path=BLACKLIST_FILE):
+        self.hass = hass
+        self.path = path
+        self.v4 = array("I")
+        self.v6 = []
+        self.fetched_at = None
+        self.confidence_minimum = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def __contains__(self, ip):
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        if address.version == 4:
+            return _contains(self.v4, int(address))
+        return _contains(self.v6, int(address))
+
+    @property
+    def size(self):
+        return len(self.v4) + len(self.v6)
+
+    @property
+    def age(self):
+        """Seconds since the snapshot was downloaded, or None if there is none."""
+        return time.time() - self.fetched_at if self.fetched_at is not None else None
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                header = json.loads(f.readline())
+                v4 = array("I")
+                v4.frombytes(f.read(header["v4"] * v4.itemsize))
+                if sys.byteorder != "little":
+                    v4.byteswap()
+                raw = f.read(header["v6"] * 16)
+        except FileNotFoundError:
+            return None
+        v6 = [int.from_bytes(raw[i:i + 16], "big") for i in range(0, len(raw), 16)]
+        return v4, v6, header["fetched_at"], header["confidence_minimum"]
+
+    def _save(self, ips, fetched_at, confidence_minimum):
+        v4 = set()
+        v6 = set()
+        for ip in ips:
+            try:
+                address = ipaddress.ip_address(ip.strip())
+            except ValueError:
+                continue
+            (v4 if address.version == 4 else v6).add(int(address))
+        v4 = array("I", sorted(v4))
+        v6 = sorted(v6)
+
+        header = {
+            "fetched_at": fetched_at,
+            "confidence_minimum": confidence_minimum,
+            "v4": len(v4),
+            "v6": len(v6),
+        }
+        stored = array("I", v4)
+        if sys.byteorder != "little":
+            stored.byteswap()
+        with atomic_write(self.path, "wb") as f:
+            f.write(json.dumps(header).encode() + b"\n")
+            f.write(stored.tobytes())
+            f.write(b"".join(value.to_bytes(16, "big") for value in v6))
+        return v4, v6, fetched_at, confidence_minimum
+
+    def _apply(self, snapshot):
+        if snapshot is not None:
+            self.v4, self.v6, self.fetched_at, self.confidence_minimum = snapshot
+
+    async def async_refresh(self, session, api_key, max_age, confidence_minimum):
+        """Download the blacklist if the snapshot is missing, older than max_age seconds or for another minimum."""
+        confidence_minimum = max(MIN_CONFIDENCE, min(100, int(confidence_minimum)))
+        async with self._lock:
+            if not self._loaded:
+                try:
+                    self._apply(await self.hass.async_add_executor_job(self._load))
+                except Exception as e:
+                    _LOGGER.warning(f"⚠️ Failed to read {self.path}: {e}")
+                self._loaded = True
+
+            if self.age is not None and self.age < max_age and self.confidence_minimum == confidence_minimum:
+                return False
+
+            ips = await fetch_abuse_blacklist(session, api_key, confidence_minimum)
+            self._apply(await self.hass.async_add_executor_job(self._save, ips, time.time(), confidence_minimum))
+            _LOGGER.info("✅ AbuseIPDB blacklist snapshot refreshed with %d IPs", self.size)
+            return True
+
+
+def get_blacklist(hass):
+    """Return the process-wide blacklist snapshot."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "blacklist" not in domain_data:
+        domain_data["blacklist"] = BlacklistSnapshot(hass)
+    return domain_data["blacklist"]
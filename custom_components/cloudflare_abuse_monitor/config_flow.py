@@ -1,11 +1,12 @@
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
-from .const import DOMAIN,CONFIG_FILE
-import json
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from .const import DOMAIN,CONFIG_FILE,DEFAULT_BLOCK_TTL_DAYS,DEFAULT_LIST_CAPACITY,DEFAULT_MAX_EVENTS_PER_CYCLE,DEFAULT_AGGREGATE_MIN_IPS,DEFAULT_BLACKLIST_REFRESH_HOURS,DEFAULT_LIVE_CHECK_MIN_HITS
 from pathlib import Path
 import logging
 from .api import fetch_zones, fetch_rules_lists
+from .configuration import get_config_cache
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -47,8 +48,8 @@ class CloudflareAbuseMonitorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN)
             self.scan_interval = user_input["scan_interval_minutes"]
 
             try:
-                response_data = await self.hass.async_add_executor_job(
-                    fetch_zones, self.email, self.api_key
+                response_data = await fetch_zones(
+                    async_get_clientsession(self.hass), self.email, self.api_key
                 )
                 if not response_data.get("success", False):
                     return self.async_show_form(
@@ -79,17 +80,9 @@ class CloudflareAbuseMonitorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN)
         if user_input is not None:
 
             try:
-                config_data = {}
-                if CONFIG_FILE.exists():
-                    with CONFIG_FILE.open("r") as f:
-                        config_data = json.load(f)
-
-                config_data.update({
-                    "scan_interval_minutes": self.scan_interval,
-                })
-
-                with CONFIG_FILE.open("w") as f:
-                    json.dump(config_data, f, indent=2)
+                await get_config_cache(self.hass).async_update(
+                    scan_interval_minutes=self.scan_interval,
+                )
 
                 _LOGGER.debug("✅ Zone configuration and scan_interval_minutes saved to file")
 
@@ -107,8 +100,8 @@ class CloudflareAbuseMonitorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN)
                 "Content-Type": "application/json"
             }
 
-            self.rules_lists = await self.hass.async_add_executor_job(
-                fetch_rules_lists, self.account_id, headers
+            self.rules_lists = await fetch_rules_lists(
+                async_get_clientsession(self.hass), self.account_id, headers
             )
 
             if not self.rules_lists:
@@ -169,15 +162,9 @@ class CloudflareAbuseMonitorOptionsFlowHandler(config_entries.OptionsFlow):
         if user_input is not None:
             # 🔄 Save scan_interval_minutes to JSON config
             try:
-                config_data = {}
-                if CONFIG_FILE.exists():
-                    with CONFIG_FILE.open("r") as f:
-                        config_data = json.load(f)
-
-                config_data["scan_interval_minutes"] = user_input["scan_interval_minutes"]
-
-                with CONFIG_FILE.open("w") as f:
-                    json.dump(config_data, f, indent=2)
+                await get_config_cache(self.hass).async_update(
+                    scan_interval_minutes=user_input["scan_interval_minutes"],
+                )
 
                 _LOGGER.debug(f"✅ scan_interval_minutes saved: {user_input['scan_interval_minutes']}")
 
@@ -189,17 +176,35 @@ class CloudflareAbuseMonitorOptionsFlowHandler(config_entries.OptionsFlow):
         abuse_score = options.get("abuse_confidence_score", data.get("abuse_confidence_score", 100.0))
         mode = options.get("mode", data.get("mode", "Monitor"))
         recheck_days = options.get("recheck_days", data.get("recheck_days", 7))
+        clean_recheck_days = options.get("clean_recheck_days", recheck_days)
         under_attack_mode = options.get("under_attack_mode", data.get("under_attack_mode", False))
         under_attack_request_threshold = options.get("under_attack_request_threshold", data.get("under_attack_request_threshold", 15000))
         scan_interval_minutes = options.get("scan_interval_minutes", data.get("scan_interval_minutes", 1))
+        max_events_per_cycle = options.get("max_events_per_cycle", DEFAULT_MAX_EVENTS_PER_CYCLE)
+        block_ttl_days = options.get("block_ttl_days", DEFAULT_BLOCK_TTL_DAYS)
+        list_capacity = options.get("list_capacity", DEFAULT_LIST_CAPACITY)
+        aggregate_min_ips = options.get("aggregate_min_ips", DEFAULT_AGGREGATE_MIN_IPS)
+        aggregate_confirm = options.get("aggregate_confirm", False)
+        blacklist_refresh_hours = options.get("blacklist_refresh_hours", DEFAULT_BLACKLIST_REFRESH_HOURS)
+        live_check_min_hits = options.get("live_check_min_hits", DEFAULT_LIVE_CHECK_MIN_HITS)
+        logpush_ingest = options.get("logpush_ingest", False)
 
         schema = vol.Schema({
             vol.Required("abuse_confidence_score", default=abuse_score): vol.Coerce(float),
             vol.Required("mode", default=mode): vol.In(["Active", "Monitor"]),
             vol.Required("recheck_days", default=recheck_days): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Required("clean_recheck_days", default=clean_recheck_days): vol.All(vol.Coerce(int), vol.Range(min=1)),
             vol.Required("under_attack_mode", default=under_attack_mode): bool,
             vol.Required("under_attack_request_threshold", default=under_attack_request_threshold): vol.All(vol.Coerce(int), vol.Range(min=1)),
             vol.Required("scan_interval_minutes", default=scan_interval_minutes): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Required("max_events_per_cycle", default=max_events_per_cycle): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Required("block_ttl_days", default=block_ttl_days): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Required("list_capacity", default=list_capacity): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Required("aggregate_min_ips", default=aggregate_min_ips): vol.All(vol.Coerce(int), vol.Range(min=0, max=256)),
+            vol.Required("aggregate_confirm", default=aggregate_confirm): bool,
+            vol.Required("blacklist_refresh_hours", default=blacklist_refresh_hours): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Required("live_check_min_hits", default=live_check_min_hits): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Required("logpush_ingest", default=logpush_ingest): bool,
         })
 
         return self.async_show_form(step_id="init", data_schema=schema)
@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from .const import CONFIG_FILE, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# How often the file's mtime is checked for changes made by hand.
+STAT_INTERVAL = 30
+
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    """Open a temp file next to path and rename it over path once the block succeeds.
+
+    Readers never see a half-written file; on error the temp file is removed.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class WatchedFile:
+    """A file parsed in the executor and re-parsed only when its mtime changes.
+
+    The mtime is checked at most every STAT_INTERVAL seconds, or on the next
+    read after invalidate(). Subclasses implement _parse(); while the file is
+    missing the value is empty(), and a file that fails to parse keeps the
+    last good value.
+    """
+
+    def __init__(self, hass, path, empty):
+        self.hass = hass
+        self.path = path
+        self.value = empty()
+        self._empty = empty
+        self._mtime = None
+        self._last_stat = None
+
+    def _parse(self):
+        raise NotImplementedError
+
+    def _load(self):
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return self._empty(), None
+        if mtime == self._mtime:
+            return self.value, mtime
+        return self._parse(), mtime
+
+    def invalidate(self):
+        self._last_stat = None
+
+    async def async_get(self):
+        """Return the parsed file, re-reading it only if it changed."""
+        now = time.monotonic()
+        if self._last_stat is None or now - self._last_stat >= STAT_INTERVAL:
+            try:
+                self.value, self._mtime = await self.hass.async_add_executor_job(self._load)
+            except Exception as e:
+                _LOGGER.warning(f"⚠️ Failed to read {self.path}: {e}")
+            self._last_stat = now
+        return self.value
+
+
+class ConfigFileCache(WatchedFile):
+    """Cached view of cloudflare_abuse_monitor_configuration.json.
+
+    invalidate() is called after an options update. Writes go through
+    atomic_write in the executor.
+    """
+
+    def __init__(self, hass, path=CONFIG_FILE):
+        super().__init__(hass, path, dict)
+
+    def _parse(self):
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _write(self, values):
+        data, _ = self._load()
+        data = {**data, **values}
+        with atomic_write(self.path) as f:
+            json.dump(data, f, indent=2)
+        return data, self.path.stat().st_mtime
+
+    async def async_update(self, **values):
+        """Merge values into the file with an atomic replace."""
+        self.value, self._mtime = await self.hass.async_add_executor_job(self._write, values)
+        self._last_stat = time.monotonic()
+
+
+def get_config_cache(hass):
+    """Return the process-wide configuration cache."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "config_cache" not in domain_data:
+        domain_data["config_cache"] = ConfigFileCache(hass)
+    return domain_data["config_cache"]
@@ -1,3 +1,13 @@
 from pathlib import Path
 CONFIG_FILE = Path("/config/cloudflare_abuse_monitor_configuration.json")
+CHECKED_IPS_FILE = Path("/config/cloudflare_checked_ips.json")
+REPUTATION_DB_FILE = Path("/config/cloudflare_abuse_monitor.db")
+PREFILTER_FILE = Path("/config/cloudflare_abuse_monitor_prefilter.json")
+BLACKLIST_FILE = Path("/config/cloudflare_abuse_monitor_blacklist.bin")
 DOMAIN = "cloudflare_abuse_monitor"
+DEFAULT_MAX_EVENTS_PER_CYCLE = 10000
+DEFAULT_BLOCK_TTL_DAYS = 30
+DEFAULT_LIST_CAPACITY = 10000
+DEFAULT_AGGREGATE_MIN_IPS = 0
+DEFAULT_BLACKLIST_REFRESH_HOURS = 0
+DEFAULT_LIVE_CHECK_MIN_HITS = 1
@@ -0,0 +1,659 @@
+import asyncio
+import logging
+from collections import Counter, deque
+from datetime import datetime, timedelta
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from .aggregate import aggregate_ips, drop_covered
+from .api import (
+    AbuseIPDBRateLimitError,
+    check_abuse_block,
+    fetch_zone_scan,
+    firewall_events_page_limit,
+    iter_firewall_events,
+    parse_traffic_hours,
+    parse_traffic_minutes,
+    set_under_attack_mode,
+)
+from .blacklist import get_blacklist
+from .const import (
+    DEFAULT_AGGREGATE_MIN_IPS,
+    DEFAULT_BLACKLIST_REFRESH_HOURS,
+    DEFAULT_BLOCK_TTL_DAYS,
+    DEFAULT_LIST_CAPACITY,
+    DEFAULT_LIVE_CHECK_MIN_HITS,
+    DEFAULT_MAX_EVENTS_PER_CYCLE,
+    DOMAIN,
+)
+from .configuration import get_config_cache
+from .graphql import get_graphql_batcher
+from .list_mirror import CAPACITY_HIGH_WATER, get_list_mirror
+from .logpush import SkipAggregate
+from .lookup import get_lookup_engine, get_rate_limiter
+from .metrics import get_metrics
+from .prefilter import ALLOW, DENY, get_prefilter
+from .resilience import get_session
+from .scheduler import EntryScheduler
+from .traffic import AttackDetector, TrafficAggregator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Cadence of the data classes that do not follow scan_interval_minutes.
+LIST_SYNC_INTERVAL = timedelta(minutes=15)
+LIST_SWEEP_INTERVAL = timedelta(minutes=15)
+# How often the blacklist snapshot's age is checked against blacklist_refresh_hours.
+BLACKLIST_CHECK_INTERVAL = timedelta(hours=1)
+# Ray names of pushed events remembered to drop Logpush retries of a batch
+PUSHED_RAYS_KEPT = 100000
+
+
+class CloudflareAbuseMonitorCoordinator(DataUpdateCoordinator):
+    """Run one fetch pipeline per config entry and share it with all sensors.
+
+    The coordinator does not poll by itself. EntryScheduler runs each data
+    class on its own cadence: the zone scan every scan_interval_minutes, list
+    sync and list sweep every 15 minutes, the blacklist snapshot check every
+    hour. Each run pushes its sections to the entities with
+    async_set_updated_data.
+
+    The zone scan fetches traffic, the attack detector's minutes and the first
+    page of firewall events in a single GraphQL request. With Logpush
+    ingestion enabled, firewall events are pushed to LogpushView instead and
+    the scan leaves them out.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, store):
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {entry.data['zone_name']}",
+            update_interval=None,
+        )
+        self.entry = entry
+        # Entries of one account share their jitter so their GraphQL queries can be batched
+        self.scheduler = EntryScheduler(hass, f"{entry.data['email']}:{entry.data['account_id']}")
+        self.scan_interval = timedelta(minutes=1)
+        self._sections = {}
+        # Sections that failed and show their last good data: {key: {"since", "error"}}
+        self.stale = {}
+        self.store = store
+        self.session = get_session(hass)
+        self.metrics = get_metrics(hass)
+        self.rate_limiter = get_rate_limiter(hass, entry.data["abuseipdb_token"])
+        self.list_mirror = get_list_mirror(hass, self.session, store, entry.data["account_id"], entry.data["list_id"])
+        self.lookup_engine = get_lookup_engine(hass, self.session, entry.data["abuseipdb_token"], store)
+        self.graphql_batcher = get_graphql_batcher(hass, self.session, entry)
+        self.prefilter = get_prefilter(hass)
+        self.blacklist = get_blacklist(hass)
+        self.prefilter_saved_total = 0
+        self.traffic = TrafficAggregator()
+        self.attack_detector = AttackDetector()
+        self._day = None
+        self._watermark = None
+        self._watermark_rays = set()
+        self._day_skip_ips = {}
+        # One zone scan at a time: scans share the watermark, the day's hits and the traffic totals
+        self._scan_lock = asyncio.Lock()
+        self._high_risk_lock = asyncio.Lock()
+        self._pushed_rays = set()
+        self._pushed_ray_order = deque()
+        self._push_check = None
+        self._push_check_again = False
+        self._first_high_risk = None
+        self.logpush_stats = {"batches": 0, "skip_events": 0, "duplicates": 0, "last_batch": None}
+
+    @property
+    def headers(self):
+        data = self.entry.data
+        return {
+            "X-Auth-Email": data["email"],
+            "X-Auth-Key": data["global_token"],
+            "Content-Type": "application/json"
+        }
+
+    @property
+    def block_ttl(self):
+        """Seconds a blocked IP stays on the list, or None to keep it forever."""
+        days = int(self.entry.options.get("block_ttl_days", DEFAULT_BLOCK_TTL_DAYS))
+        return days * 86400 if days > 0 else None
+
+    @property
+    def list_capacity(self):
+        return int(self.entry.options.get("list_capacity", DEFAULT_LIST_CAPACITY))
+
+    @property
+    def aggregate_min_ips(self):
+        """High-risk IPs of one /24 or /64 needed to block the whole network, or 0 to never aggregate."""
+        return int(self.entry.options.get("aggregate_min_ips", DEFAULT_AGGREGATE_MIN_IPS))
+
+    @property
+    def blacklist_refresh_hours(self):
+        """Hours between AbuseIPDB blacklist downloads, or 0 to check every IP live."""
+        return int(self.entry.options.get("blacklist_refresh_hours", DEFAULT_BLACKLIST_REFRESH_HOURS))
+
+    @property
+    def live_check_min_hits(self):
+        return int(self.entry.options.get("live_check_min_hits", DEFAULT_LIVE_CHECK_MIN_HITS))
+
+    @property
+    def logpush_enabled(self):
+        """Whether firewall events arrive through Logpush instead of being polled."""
+        return bool(self.entry.options.get("logpush_ingest", False))
+
+    @property
+    def day_skip_hits(self):
+        """Skip hits per IP in the zone today."""
+        return self._day_skip_ips
+
+    def async_start(self):
+        """Start the per-class schedule and the High Risk pass the first refresh left out."""
+        # A background task, so Home Assistant's startup does not wait for its AbuseIPDB lookups
+        self._first_high_risk = self.entry.async_create_background_task(
+            self.hass, self._async_run_first_high_risk(), f"{DOMAIN} first high risk {self.entry.entry_id}"
+        )
+        self._schedule_scan_tasks()
+        self.scheduler.schedule("list_sync", LIST_SYNC_INTERVAL, self._async_run_list_sync)
+        self.scheduler.schedule("list_sweep", LIST_SWEEP_INTERVAL, self._async_run_list_sweep)
+        self.scheduler.schedule("blacklist", BLACKLIST_CHECK_INTERVAL, self._async_run_blacklist)
+
+    def _schedule_scan_tasks(self):
+        self.scheduler.schedule("scan", self.scan_interval, self._async_run_scan)
+
+    async def _async_refresh_scan_interval(self):
+        scan_interval = await self._async_get_scan_interval()
+        if scan_interval != self.scan_interval:
+            self.scan_interval = scan_interval
+            self._schedule_scan_tasks()
+
+    def _merge(self, sections):
+        """Take new sections in, keeping the last good data of a section that failed."""
+        for key, section in sections.items():
+            previous = self._sections.get(key)
+            if _is_error(section) and previous is not None and not _is_error(previous):
+                stale = self.stale.setdefault(key, {"since": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+                stale["error"] = section["error"]
+                continue
+            self.stale.pop(key, None)
+            self._sections[key] = section
+
+    def _publish(self, **sections):
+        self._merge(sections)
+        self.async_set_updated_data(dict(self._sections))
+
+    async def _async_run_scan(self):
+        await self._async_refresh_scan_interval()
+        async with self._scan_lock:
+            with self.metrics.track_cycle(self.entry.entry_id, "scan"):
+                sections = await self._async_collect_scan(datetime.utcnow())
+            self._publish(**sections)
+
+    async def _async_run_list_sync(self):
+        with self.metrics.track_cycle(self.entry.entry_id, "list_sync"):
+            try:
+                list_ips = await self.list_mirror.async_get_ips(self.headers, force=True)
+            except Exception as e:
+                list_ips = {"error": str(e)}
+        self._publish(list_ips=list_ips)
+
+    async def _async_run_list_sweep(self):
+        with self.metrics.track_cycle(self.entry.entry_id, "list_sweep"):
+            await self.list_mirror.async_get_ips(self.headers)
+            expired, evicted = await self.list_mirror.async_sweep(self.headers, self.list_capacity)
+        if expired or evicted:
+            _LOGGER.info("✅ List sweep removed %d expired and %d evicted IPs", expired, evicted)
+            self._publish(list_ips=self.list_mirror.ips)
+
+    async def _async_run_blacklist(self):
+        if not self.blacklist_refresh_hours:
+            return
+        await self.blacklist.async_refresh(
+            self.session,
+            self.entry.data["abuseipdb_token"],
+            self.blacklist_refresh_hours * 3600,
+            self._blacklist_confidence_minimum(),
+        )
+
+    def _blacklist_confidence_minimum(self):
+        """Return the lowest threshold of the entries using the snapshot, since they share it."""
+        thresholds = [
+            int(e.options.get("abuse_confidence_score", e.data.get("abuse_confidence_score", 100)))
+            for e in self.hass.config_entries.async_entries(DOMAIN)
+            if int(e.options.get("blacklist_refresh_hours", DEFAULT_BLACKLIST_REFRESH_HOURS))
+        ]
+        return min(thresholds, default=100)
+
+    async def _async_get_scan_interval(self):
+        """Read scan_interval_minutes from the cached config file."""
+        try:
+            config_data = await get_config_cache(self.hass).async_get()
+            minutes = int(config_data.get("scan_interval_minutes", 1))
+            return timedelta(seconds=max(1, minutes * 60))
+        except Exception as e:
+            _LOGGER.warning(f"⚠️ Failed to read scan_interval_minutes from config: {e}")
+        return timedelta(seconds=60)
+
+    async def async_options_updated(self):
+        """Drop the cached config and apply a changed scan interval right away."""
+        get_config_cache(self.hass).invalidate()
+        await self._async_refresh_scan_interval()
+
+    async def _async_update_data(self):
+        """Collect every section once; used for the first refresh and manual updates.
+
+        A refresh requested while a scan is running waits for that scan and
+        returns its data instead of scanning the same window a second time.
+        """
+        if self._scan_lock.locked():
+            async with self._scan_lock:
+                return dict(self._sections)
+        self.scan_interval = await self._async_get_scan_interval()
+        try:
+            await self._async_run_blacklist()
+        except Exception as e:
+            _LOGGER.warning(f"⚠️ Failed to refresh the AbuseIPDB blacklist snapshot: {e}")
+        async with self._scan_lock:
+            with self.metrics.track_cycle(self.entry.entry_id, "scan"):
+                # The first refresh holds up entry setup; its High Risk pass runs from async_start
+                self._merge(await self._async_collect_scan(datetime.utcnow(), high_risk=self.data is not None))
+            return dict(self._sections)
+
+    @property
+    def _attack_check_enabled(self):
+        options = self.entry.options
+        mode = options.get("mode", self.entry.data.get("mode", "Monitor"))
+        return mode != "Monitor" and options.get("under_attack_mode", False)
+
+    async def _async_fetch_scan(self, now):
+        """Fetch this cycle's traffic hours, attack minutes and first events page in one request."""
+        await self._async_load_day(now)
+        parts = ["traffic"]
+        variables = {
+            "until": now.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            "trafficSince": self.traffic.window_start(now),
+        }
+        if not self.logpush_enabled:
+            parts.append("events")
+            variables["eventsSince"] = self._watermark
+            variables["eventsLimit"] = firewall_events_page_limit(self._max_events, 0, self._watermark_rays)
+        if self._attack_check_enabled:
+            parts.append("minutes")
+            variables["minutesSince"] = self.attack_detector.window_start(now)
+            variables["minutesLimit"] = self.attack_detector.size
+        return await fetch_zone_scan(
+            self.session, self.headers, self.entry.data["zone_id"], tuple(parts), variables, self.graphql_batcher
+        )
+
+    async def _async_collect_scan(self, now, high_risk=True):
+        """Every section fed by the zone scan, plus the mirrored list the High Risk pipeline needs.
+
+        With high_risk False the High Risk pass, with its AbuseIPDB lookups
+        and list writes, is left out.
+        """
+        try:
+            zone = await self._async_fetch_scan(now)
+        except Exception as e:
+            _LOGGER.warning(f"⚠️ Zone scan failed: {e}")
+            zone = e
+
+        result = {}
+        try:
+            result["traffic"] = self.traffic.apply(parse_traffic_hours(_scan_part(zone, "traffic")), now)
+        except Exception as e:
+            result["traffic"] = {"error": str(e)}
+
+        try:
+            result["under_attack"] = await self._async_process_under_attack(now, zone)
+        except Exception as e:
+            result["under_attack"] = {"error": str(e)}
+
+        try:
+            if self.logpush_enabled:
+                await self._async_load_day(now)
+                result["skip_ips"] = list(self._day_skip_ips)
+            else:
+                result["skip_ips"] = await self._async_fetch_skip_ips(now, _scan_part(zone, "events"))
+        except Exception as e:
+            result["skip_ips"] = {"error": str(e)}
+
+        try:
+            result["list_ips"] = await self.list_mirror.async_get_ips(self.headers)
+        except Exception as e:
+            result["list_ips"] = {"error": str(e)}
+
+        if high_risk:
+            result["high_risk"] = await self._async_high_risk_section(result["skip_ips"], result["list_ips"])
+
+        if not isinstance(result["list_ips"], dict):
+            # Pick up IPs the High Risk pipeline just added
+            result["list_ips"] = self.list_mirror.ips
+        return result
+
+    async def _async_high_risk_section(self, skip_ips, current_ips):
+        try:
+            async with self._high_risk_lock:
+                return await self._async_process_high_risk(skip_ips, current_ips)
+        except Exception as e:
+            _LOGGER.warning(f"⚠️ High Risk check failed: {e}")
+            return {"error": str(e)}
+
+    async def _async_run_first_high_risk(self):
+        """Run the High Risk pass the first refresh left out, on the sections it collected."""
+        async with self._scan_lock:
+            with self.metrics.track_cycle(self.entry.entry_id, "scan"):
+                high_risk = await self._async_high_risk_section(
+                    self._sections.get("skip_ips", {"error": "No data"}),
+                    self._sections.get("list_ips", {"error": "No data"}),
+                )
+            sections = {"high_risk": high_risk}
+            if not _is_error(self._sections.get("list_ips")):
+                sections["list_ips"] = self.list_mirror.ips
+            self._publish(**sections)
+
+    @property
+    def _max_events(self):
+        return int(self.entry.options.get("max_events_per_cycle", DEFAULT_MAX_EVENTS_PER_CYCLE))
+
+    async def _async_load_day(self, now):
+        """Switch to the UTC day of now, loading its watermark and skip IP hits from the store."""
+        day = now.strftime('%Y-%m-%d')
+        if day != self._day:
+            watermark, rays, hits = await self.store.async_load_day(self.entry.data["zone_id"], day)
+            self._day = day
+            self._watermark = watermark or now.replace(hour=0, minute=0, second=0, microsecond=0).strftime('%Y-%m-%dT%H:%M:%SZ')
+            self._watermark_rays = rays
+            self._day_skip_ips = hits
+
+    async def _async_fetch_skip_ips(self, now, first_page):
+        """Page firewall events on from the zone scan's first page and merge them into today's skip IPs."""
+        zone_id = self.entry.data["zone_id"]
+        day = self._day
+        new_hits = Counter()
+        watermark = self._watermark
+        watermark_rays = set(self._watermark_rays)
+        async for event in iter_firewall_events(
+            self.session,
+            zone_id,
+            self._watermark,
+            now.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            self.headers,
+            self._max_events,
+            self._watermark_rays,
+            first_page,
+        ):
+            if event["datetime"] != watermark:
+                watermark = event["datetime"]
+                watermark_rays = set()
+            watermark_rays.add(event.get("rayName"))
+            if event.get("action") == "skip":
+                new_hits[event["clientIP"]] += 1
+
+        if watermark != self._watermark or watermark_rays != self._watermark_rays or new_hits:
+            await self.store.async_save_day(zone_id, day, watermark, watermark_rays, new_hits)
+        self._watermark = watermark
+        self._watermark_rays = watermark_rays
+        for ip, hits in new_hits.items():
+            self._day_skip_ips[ip] = self._day_skip_ips.get(ip, 0) + hits
+
+        return list(self._day_skip_ips)
+
+    async def async_start_batch(self):
+        """Return an empty aggregate for a pushed batch of today's skip events."""
+        await self._async_load_day(datetime.utcnow())
+        return SkipAggregate(self._day, self._pushed_rays)
+
+    async def async_ingest_events(self, aggregate):
+        """Merge a pushed batch's SkipAggregate into today's skip IPs and return how many hits were new.
+
+        IPs that got new hits are checked right away in the background, so
+        the Logpush request is answered without waiting for AbuseIPDB.
+        """
+        await self._async_load_day(datetime.utcnow())
+        # The day rolled over while the batch streamed in: its events belong to yesterday
+        new_hits = aggregate.hits if aggregate.day == self._day else Counter()
+        duplicates = aggregate.duplicates
+        for ray in aggregate.rays:
+            self._pushed_rays.add(ray)
+            self._pushed_ray_order.append(ray)
+            if len(self._pushed_ray_order) > PUSHED_RAYS_KEPT:
+                self._pushed_rays.discard(self._pushed_ray_order.popleft())
+
+        self.logpush_stats["batches"] += 1
+        self.logpush_stats["skip_events"] += sum(new_hits.values())
+        self.logpush_stats["duplicates"] += duplicates
+        self.logpush_stats["last_batch"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if not new_hits:
+            return 0
+
+        await self.store.async_save_day(
+            self.entry.data["zone_id"], self._day, self._watermark, self._watermark_rays, new_hits
+        )
+        for ip, hits in new_hits.items():
+            self._day_skip_ips[ip] = self._day_skip_ips.get(ip, 0) + hits
+        self._schedule_push_check()
+        return sum(new_hits.values())
+
+    def _schedule_push_check(self):
+        """Run the High Risk pipeline for pushed IPs; batches arriving meanwhile share the next run."""
+        if self._push_check is not None and not self._push_check.done():
+            self._push_check_again = True
+            return
+        self._push_check = self.entry.async_create_background_task(
+            self.hass, self._async_run_push_check(), f"{DOMAIN} logpush check {self.entry.entry_id}"
+        )
+
+    async def _async_run_push_check(self):
+        self._push_check_again = True
+        while self._push_check_again:
+            self._push_check_again = False
+            skip_ips = list(self._day_skip_ips)
+            with self.metrics.track_cycle(self.entry.entry_id, "logpush"):
+                high_risk = await self._async_high_risk_section(skip_ips, self.list_mirror.ips)
+            self._publish(skip_ips=skip_ips, high_risk=high_risk, list_ips=self.list_mirror.ips)
+
+    def _max_recheck_days(self):
+        """Return the longest recheck_days of all entries, since they share one store."""
+        days = [
+            max(
+                int(e.options.get("recheck_days", e.data.get("recheck_days", 7))),
+                int(e.options.get("clean_recheck_days", e.data.get("recheck_days", 7))),
+            )
+            for e in self.hass.config_entries.async_entries(DOMAIN)
+        ]
+        return max(days, default=7)
+
+    async def _async_process_high_risk(self, skip_ips, current_ips):
+        """Check new skip IPs against AbuseIPDB and block the high-risk ones in Active mode."""
+        if isinstance(skip_ips, dict):
+            raise RuntimeError(skip_ips["error"])
+        if isinstance(current_ips, dict):
+            raise RuntimeError(current_ips["error"])
+
+        data = self.entry.data
+        options = self.entry.options
+        threshold = int(options.get("abuse_confidence_score", data.get("abuse_confidence_score", 100)))
+        recheck_days = int(options.get("recheck_days", data.get("recheck_days", 7)))
+        clean_recheck_days = int(options.get("clean_recheck_days", recheck_days))
+        mode = options.get("mode", data.get("mode", "Monitor"))
+
+        # IPs inside a network we already block need neither a lookup nor a list entry
+        potential_ips = drop_covered(set(skip_ips) - set(current_ips), current_ips)
+
+        checked_cache = await self.store.async_get_fresh(
+            potential_ips, threshold, recheck_days * 86400, clean_recheck_days * 86400
+        )
+        self.metrics.record_cache(len(checked_cache), len(potential_ips) - len(checked_cache))
+
+        # IPs covered by a local allow or deny network are settled without AbuseIPDB
+        prefiltered = await self.prefilter.async_classify(potential_ips)
+        saved_lookups = sum(1 for ip in prefiltered if ip not in checked_cache)
+        self.prefilter_saved_total += saved_lookups
+        ips_to_check = [ip for ip in potential_ips if ip not in checked_cache and ip not in prefiltered]
+
+        # Known-bad IPs from the cache are reported and acted on without a new lookup
+        cached_high_risk = [
+            verdict for ip, verdict in checked_cache.items()
+            if ip not in prefiltered and (verdict.get("abuse_confidence_score") or 0) >= threshold
+        ]
+        denied = [ip for ip, verdict in prefiltered.items() if verdict == DENY]
+        high_risk_ips = list(cached_high_risk)
+        high_risk_ips += [{"ip": ip, "abuse_confidence_score": 100} for ip in denied]
+
+        # With a blacklist snapshot, listed IPs are settled locally and only
+        # unlisted IPs with enough hits today get a live check
+        blacklisted = []
+        below_volume = []
+        if self.blacklist_refresh_hours and self.blacklist.size:
+            if self.blacklist.confidence_minimum >= threshold:
+                blacklisted = [ip for ip in ips_to_check if ip in self.blacklist]
+            listed = set(blacklisted)
+            min_hits = self.live_check_min_hits
+            below_volume = [
+                ip for ip in ips_to_check
+                if ip not in listed and self._day_skip_ips.get(ip, 0) < min_hits
+            ]
+            settled = listed.union(below_volume)
+            ips_to_check = [ip for ip in ips_to_check if ip not in settled]
+            high_risk_ips += [
+                {"ip": ip, "abuse_confidence_score": self.blacklist.confidence_minimum} for ip in blacklisted
+            ]
+        results, errors, deferred = await self.lookup_engine.async_lookup(ips_to_check)
+        for ip, result in results.items():
+            if result.get("abuse_confidence_score", 0) >= threshold:
+                high_risk_ips.append(result)
+
+        # The lookup engine has already queued the new verdicts in the store
+        await self.store.async_expire(self._max_recheck_days() * 86400)
+
+        blocked = []
+        failed_blocks = {}
+        aggregated = {}
+        if mode == "Active" and high_risk_ips:
+            entries, aggregated = aggregate_ips(
+                {ip_info["ip"]: ip_info.get("abuse_confidence_score") for ip_info in high_risk_ips},
+                self.aggregate_min_ips,
+                self.prefilter.trie,
+            )
+            if aggregated and options.get("aggregate_confirm", False):
+                entries, aggregated = await self._async_confirm_networks(entries, aggregated, threshold)
+            if len(current_ips) + len(entries) > self.list_capacity * CAPACITY_HIGH_WATER:
+                await self.list_mirror.async_sweep(self.headers, self.list_capacity, len(entries))
+            blocked, failed_blocks = await self.list_mirror.async_add_ips(
+                self.headers, list(entries), entries, self.block_ttl
+            )
+
+        return {
+            "abuse_confidence_score_threshold": threshold,
+            "recheck_days": recheck_days,
+            "clean_recheck_days": clean_recheck_days,
+            "mode": mode,
+            "high_risk_ip_list": [ip["ip"] for ip in high_risk_ips],
+            "ips_to_check": ips_to_check,
+            "cached_high_risk": len(cached_high_risk),
+            "prefilter_allowed": sum(1 for verdict in prefiltered.values() if verdict == ALLOW),
+            "prefilter_denied": len(denied),
+            "prefilter_saved_lookups": saved_lookups,
+            "prefilter_saved_lookups_total": self.prefilter_saved_total,
+            "blacklist_size": self.blacklist.size,
+            "blacklist_age_hours": round(self.blacklist.age / 3600, 1) if self.blacklist.age is not None else None,
+            "blacklisted": len(blacklisted),
+            "below_volume_threshold": len(below_volume),
+            "blocked_ips": len(blocked),
+            "aggregated_networks": list(aggregated),
+            "list_capacity": self.list_capacity,
+            "failed_blocks": failed_blocks,
+            "lookup_errors": len(errors),
+            "deferred_lookups": len(deferred),
+            "shared_lookups_total": self.lookup_engine.shared_total,
+            "abuseipdb_rate_limit_remaining": self.rate_limiter.remaining,
+        }
+
+    async def _async_confirm_networks(self, entries, aggregated, threshold):
+        """Keep a collapsed network only if AbuseIPDB's check-block sees enough offenders in it.
+
+        A network is confirmed when at least aggregate_min_ips of its reported
+        addresses score at or above threshold; otherwise, or if the check
+        fails, its members are written as single IPs again.
+        """
+        entries = dict(entries)
+        confirmed = {}
+        for network, members in aggregated.items():
+            try:
+                reported = await check_abuse_block(self.session, network, self.entry.data["abuseipdb_token"])
+                offenders = sum(1 for _, score in reported if (score or 0) >= threshold)
+            except AbuseIPDBRateLimitError as e:
+                _LOGGER.warning(f"⚠️ {e}; writing {network} as single IPs")
+                offenders = 0
+            except Exception as e:
+                _LOGGER.warning(f"⚠️ check-block of {network} failed: {e}")
+                offenders = 0
+
+            if offenders >= self.aggregate_min_ips:
+                confirmed[network] = members
+                continue
+            score = entries.pop(network)
+            for ip in members:
+                entries[ip] = score
+        return entries, confirmed
+
+    async def _async_process_under_attack(self, now, zone):
+        """Check the request rate over a sliding window and toggle Under Attack mode."""
+        options = self.entry.options
+        mode = options.get("mode", self.entry.data.get("mode", "Monitor"))
+        if mode == "Monitor":
+            return {
+                "state": "off",
+                "mode": "Monitor",
+                "reason": "Monitoring mode is active"
+            }
+
+        enabled = options.get("under_attack_mode", False)
+        threshold = options.get("under_attack_request_threshold", 15000)
+
+        if not enabled:
+            await set_under_attack_mode(
+                self.session,
+                self.entry.data["zone_id"],
+                self.headers,
+                False
+            )
+            return {
+                "state": "off",
+                "enabled": enabled,
+                "reason": "Under attack mode is disabled"
+            }
+
+        self.attack_detector.apply(parse_traffic_minutes(_scan_part(zone, "minutes")))
+        window_minutes = max(1, int(self.scan_interval.total_seconds() // 60))
+        window_requests = self.attack_detector.window_requests(now, window_minutes)
+        real_mode_enabled = window_requests >= threshold
+
+        if real_mode_enabled:
+            await set_under_attack_mode(
+                self.session,
+                self.entry.data["zone_id"],
+                self.headers,
+                True
+            )
+        return {
+            "state": "on" if real_mode_enabled else "off",
+            "enabled": enabled,
+            "threshold": threshold,
+            "window_minutes": window_minutes,
+            "window_request_count": window_requests,
+            "last_minute_request_count": self.attack_detector.latest_requests,
+            "under_attack_mode_active": real_mode_enabled,
+        }
+
+
+def _is_error(section):
+    return isinstance(section, dict) and "error" in section
+
+
+def _scan_part(zone, part):
+    """Return one part of a zone scan result, re-raising the scan's failure."""
+    if isinstance(zone, Exception):
+        raise zone
+    return zone.get(part) or []
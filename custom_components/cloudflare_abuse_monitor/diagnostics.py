@@ -0,0 +1,57 @@
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {"email", "global_token", "abuseipdb_token", "account_id"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Return the entry's settings, schedule, last cycles and the process-wide API metrics."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    rate_limiter = coordinator.rate_limiter
+    entry_metrics = coordinator.metrics.entry(entry.entry_id)
+
+    sections = {}
+    for key, section in (coordinator.data or {}).items():
+        if isinstance(section, dict) and "error" in section:
+            sections[key] = {"error": section["error"]}
+        elif isinstance(section, (list, set)):
+            sections[key] = {"count": len(section)}
+        else:
+            sections[key] = "ok"
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "scan_interval_seconds": coordinator.scan_interval.total_seconds(),
+        "next_runs": {
+            name: next_run.strftime("%Y-%m-%d %H:%M:%S")
+            for name in ("scan", "list_sync", "list_sweep", "blacklist")
+            if (next_run := coordinator.scheduler.next_run(name)) is not None
+        },
+        "sections": sections,
+        "cycles": coordinator.metrics.cycles.get(entry.entry_id, {}),
+        "entry_api": {
+            "calls": dict(entry_metrics.calls),
+            "cache_hit_ratio": entry_metrics.cache_hit_ratio,
+            "shared_lookups": entry_metrics.shared_lookups,
+        },
+        "abuseipdb_rate_limiter": {
+            "remaining": rate_limiter.remaining,
+            "limit": rate_limiter.limit,
+            "tokens": round(rate_limiter.tokens, 2),
+        },
+        "list_mirror": {
+            "items": len(coordinator.list_mirror.items),
+            "capacity": coordinator.list_capacity,
+        },
+        "blacklist_snapshot_size": coordinator.blacklist.size,
+        "logpush": dict(coordinator.logpush_stats, enabled=coordinator.logpush_enabled),
+        "stale_sections": dict(coordinator.stale),
+        "circuit_breakers": {host: breaker.as_dict() for host, breaker in coordinator.session.breakers.items()},
+        "api": coordinator.metrics.as_dict(histogram=True),
+    }
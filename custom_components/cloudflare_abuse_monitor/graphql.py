@@ -0,0 +1,96 @@
+import asyncio
+import logging
+
+from . import api
+from .const import DOMAIN
+from .metrics import count_cycle_call, detach_cycle
+
+_LOGGER = logging.getLogger(__name__)
+
+# Longest time queries are collected before one batched request is sent.
+BATCH_WINDOW = 0.5
+# Zone blocks per request, to stay within Cloudflare's GraphQL query cost limits.
+MAX_BATCH_ZONES = 10
+
+
+class GraphQLBatcher:
+    """Merge zone scans of entries sharing an account into one GraphQL request.
+
+    Scans arriving within BATCH_WINDOW seconds are sent together as aliased
+    zones(...) blocks, and each caller gets its own block of the response back.
+    The batch goes out at once when every entry using the batcher has queued
+    its scan, so a lone entry never waits. Each caller's cycle counts the
+    batched request once, not only the cycle that happened to send it.
+    """
+
+    def __init__(self, session, headers):
+        self.session = session
+        self.headers = headers
+        self.entries = set()
+        self._pending = []
+        self._flush_handle = None
+        # Sends in flight; the loop only keeps weak references to tasks
+        self._sends = set()
+
+    def release(self, entry_id):
+        self.entries.discard(entry_id)
+
+    async def async_query(self, zone_id, parts, variables):
+        """Queue a zone scan and return that zone's result once the batch is sent."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((zone_id, parts, variables, future))
+        if len(self._pending) >= len(self.entries):
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(BATCH_WINDOW, self._flush)
+        try:
+            return await future
+        finally:
+            count_cycle_call("POST", f"{api.CLOUDFLARE_API_URL}/graphql")
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_handle = None
+        pending, self._pending = self._pending, []
+        for i in range(0, len(pending), MAX_BATCH_ZONES):
+            send = asyncio.get_running_loop().create_task(self._async_send(pending[i:i + MAX_BATCH_ZONES]))
+            self._sends.add(send)
+            send.add_done_callback(self._sends.discard)
+
+    async def _async_send(self, batch):
+        detach_cycle()
+        try:
+            results = await api.fetch_zone_scans(
+                self.session, self.headers, [(zone_id, parts, variables) for zone_id, parts, variables, _ in batch]
+            )
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        _LOGGER.debug("Sent %d zone scans in one GraphQL request", len(batch))
+        for (*_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def get_graphql_batcher(hass, session, entry):
+    """Return the batcher shared by every entry with the same account and credentials."""
+    batchers = hass.data.setdefault(DOMAIN, {}).setdefault("graphql_batchers", {})
+    data = entry.data
+    key = (data["account_id"], data["email"], data["global_token"])
+    if key not in batchers:
+        batchers[key] = GraphQLBatcher(session, {
+            "X-Auth-Email": data["email"],
+            "X-Auth-Key": data["global_token"],
+            "Content-Type": "application/json"
+        })
+    batchers[key].entries.add(entry.entry_id)
+    return batchers[key]
@@ -0,0 +1,73 @@
+import hashlib
+
+# How many IPs a sensor shows as a sample; the full lists are served by the get_ips service.
+TOP_IPS = 10
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+
+
+def _section(data, key):
+    section = (data or {}).get(key)
+    if section is None or (isinstance(section, dict) and "error" in section):
+        return None
+    return section
+
+
+def _high_risk(data, key):
+    section = _section(data, "high_risk")
+    return None if section is None else section.get(key)
+
+
+# Lists served by get_ips: name -> function returning the list from coordinator data, or None
+IP_LISTS = {
+    "skip_ips": lambda data: _section(data, "skip_ips"),
+    "list_ips": lambda data: _section(data, "list_ips"),
+    "high_risk_ips": lambda data: _high_risk(data, "high_risk_ip_list"),
+    "ips_to_check": lambda data: _high_risk(data, "ips_to_check"),
+    "aggregated_networks": lambda data: _high_risk(data, "aggregated_networks"),
+    "failed_blocks": lambda data: _high_risk(data, "failed_blocks"),
+}
+
+
+def ip_digest(ips):
+    """Return a short hash of a set of IPs that only changes when its members do."""
+    return hashlib.sha256("\n".join(sorted(ips)).encode()).hexdigest()[:16]
+
+
+def summarize_ips(name, ips, hits=None):
+    """Return the count, the top TOP_IPS and the hash of a list as {name}_* attributes.
+
+    The top IPs are the ones with the most hits when hits are given,
+    otherwise the first in sorted order.
+    """
+    if hits:
+        top = sorted(ips, key=lambda ip: (-hits.get(ip, 0), ip))[:TOP_IPS]
+    else:
+        top = sorted(ips)[:TOP_IPS]
+    return {
+        f"{name}_count": len(ips),
+        f"{name}_top": top,
+        f"{name}_hash": ip_digest(ips),
+    }
+
+
+def page_ips(ips, offset=0, limit=DEFAULT_PAGE_SIZE):
+    """Return one page of a list in sorted order, so pages stay stable between calls.
+
+    A mapping (failed_blocks: IP -> error) is paged by its keys and the
+    page's items keep their values.
+    """
+    values = ips if isinstance(ips, dict) else None
+    ips = sorted(ips)
+    items = ips[offset:offset + limit]
+    next_offset = offset + len(items)
+    if values is not None:
+        items = {ip: values[ip] for ip in items}
+    return {
+        "total": len(ips),
+        "hash": ip_digest(ips),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset if next_offset < len(ips) else None,
+        "items": items,
+    }
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timezone
+
+from .api import add_ips_to_list, delete_list_items, get_bulk_operation, iter_list_items
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+LIST_RECONCILE_INTERVAL = 15 * 60
+LIST_WRITE_CHUNK_SIZE = 1000
+BULK_POLL_DELAYS = (0.5, 1, 2, 4, 8, 15)
+# Start evicting at 90% of capacity and evict down to 80%.
+CAPACITY_HIGH_WATER = 0.9
+CAPACITY_LOW_WATER = 0.8
+
+COMMENT_PREFIX = "cloudflare_abuse_monitor"
+COMMENT_EXPIRES_RE = re.compile(r"expires=(\S+)")
+
+
+def build_comment(score, expires_at):
+    """Return the list item comment carrying an IP's score and expiry."""
+    comment = f"{COMMENT_PREFIX} score={score}"
+    if expires_at is not None:
+        expires = datetime.fromtimestamp(expires_at, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        comment += f" expires={expires}"
+    return comment
+
+
+def parse_comment_expiry(comment):
+    """Return the expiry timestamp stored in one of our comments, or None."""
+    if not comment or not comment.startswith(COMMENT_PREFIX):
+        return None
+    match = COMMENT_EXPIRES_RE.search(comment)
+    if not match:
+        return None
+    try:
+        return datetime.strptime(match.group(1), '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+class CloudflareListMirror:
+    """In-memory copy of a Cloudflare IP list, kept current by local updates.
+
+    The full list is downloaded only on first use and every
+    LIST_RECONCILE_INTERVAL seconds afterwards; in between, IPs we add
+    ourselves are applied to the mirror directly.
+    """
+
+    def __init__(self, session, store, account_id, list_id, reconcile_interval=LIST_RECONCILE_INTERVAL):
+        self.session = session
+        self.store = store
+        self.account_id = account_id
+        self.list_id = list_id
+        self.reconcile_interval = reconcile_interval
+        self.items = {}
+        self.last_reconcile = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def ips(self):
+        return set(self.items)
+
+    def needs_reconcile(self):
+        return self.last_reconcile is None or time.monotonic() - self.last_reconcile >= self.reconcile_interval
+
+    async def async_reconcile(self, headers):
+        """Replace the mirror with a full paged download of the list."""
+        items = {}
+        async for item in iter_list_items(self.session, self.account_id, self.list_id, headers):
+            ip = item.get("ip")
+            if ip:
+                items[ip] = item
+        self.items = items
+        self.last_reconcile = time.monotonic()
+        _LOGGER.debug("Reconciled list %s: %d items", self.list_id, len(items))
+
+    async def async_get_ips(self, headers, force=False):
+        """Return the listed IPs, reconciling first when the mirror is stale."""
+        async with self._lock:
+            if force or self.needs_reconcile():
+                await self.async_reconcile(headers)
+        return self.ips
+
+    async def async_wait_for_operation(self, operation_id, headers):
+        """Poll a bulk operation until it finishes; return None on success or the error text."""
+        for delay in BULK_POLL_DELAYS:
+            await asyncio.sleep(delay)
+            operation = await get_bulk_operation(self.session, self.account_id, operation_id, headers)
+            status = operation.get("status")
+            if status == "completed":
+                return None
+            if status == "failed":
+                return operation.get("error") or "Bulk operation failed"
+        return f"Bulk operation {operation_id} still pending"
+
+    async def async_add_ips(self, headers, ips, scores=None, ttl=None):
+        """Append IPs in chunked bulk writes and return (added, failed).
+
+        Chunks are written one after the other because Cloudflare runs one
+        bulk operation per list at a time; failed maps each IP of a failed
+        chunk to the error reported for it. With a ttl in seconds each IP
+        gets an expiry, stored locally and in its item comment.
+        """
+        scores = scores or {}
+        expires_at = time.time() + ttl if ttl else None
+        ips = [ip for ip in dict.fromkeys(ips) if ip not in self.items]
+        comments = {ip: build_comment(scores.get(ip), expires_at) for ip in ips}
+        added = []
+        failed = {}
+        async with self._lock:
+            for i in range(0, len(ips), LIST_WRITE_CHUNK_SIZE):
+                chunk = ips[i:i + LIST_WRITE_CHUNK_SIZE]
+                try:
+                    operation_id = await add_ips_to_list(
+                        self.session, self.account_id, self.list_id, chunk, headers, comments
+                    )
+                    if operation_id is None:
+                        error = "List write rejected"
+                    else:
+                        error = await self.async_wait_for_operation(operation_id, headers)
+                except Exception as e:
+                    error = str(e)
+
+                if error:
+                    _LOGGER.error("❌ Failed to add %d IPs to list %s: %s", len(chunk), self.list_id, error)
+                    failed.update({ip: error for ip in chunk})
+                else:
+                    for ip in chunk:
+                        self.items.setdefault(ip, {"ip": ip, "comment": comments[ip]})
+                    added.extend(chunk)
+        await self.store.async_record_blocks(
+            self.list_id, [(ip, expires_at, scores.get(ip)) for ip in added]
+        )
+        return added, failed
+
+    async def async_remove_ips(self, headers, ips):
+        """Bulk-delete IPs from the list and return the ones removed."""
+        async with self._lock:
+            if any(ip in self.items and "id" not in self.items[ip] for ip in ips):
+                # Items we added since the last reconcile have no id yet
+                await self.async_reconcile(headers)
+            present = [ip for ip in ips if ip in self.items]
+            removed = []
+            for i in range(0, len(present), LIST_WRITE_CHUNK_SIZE):
+                chunk = present[i:i + LIST_WRITE_CHUNK_SIZE]
+                try:
+                    operation_id = await delete_list_items(
+                        self.session, self.account_id, self.list_id,
+                        [self.items[ip]["id"] for ip in chunk], headers
+                    )
+                    if operation_id is None:
+                        error = "List delete rejected"
+                    else:
+                        error = await self.async_wait_for_operation(operation_id, headers)
+                except Exception as e:
+                    error = str(e)
+
+                if error:
+                    _LOGGER.error("❌ Failed to remove %d IPs from list %s: %s", len(chunk), self.list_id, error)
+                    continue
+                for ip in chunk:
+                    self.items.pop(ip, None)
+                removed.extend(chunk)
+        # IPs already gone from the list (e.g. removed by hand) are forgotten as well
+        await self.store.async_forget_blocks(
+            self.list_id, removed + [ip for ip in ips if ip not in present]
+        )
+        return removed
+
+    async def async_sweep(self, headers, capacity, incoming=0):
+        """Remove expired IPs and evict ours when the list nears capacity.
+
+        Expired IPs come from the local block records and from the expiry in
+        item comments. If the list would still be above CAPACITY_HIGH_WATER
+        after taking incoming new IPs, our lowest-scored and oldest entries
+        are evicted down to CAPACITY_LOW_WATER. Returns (expired, evicted).
+        """
+        now = time.time()
+        expired = set(await self.store.async_get_expired_blocks(self.list_id))
+        for ip, item in self.items.items():
+            expires_at = parse_comment_expiry(item.get("comment"))
+            if expires_at is not None and expires_at <= now:
+                expired.add(ip)
+
+        evicted = []
+        remaining = len(self.items) - len(expired & set(self.items)) + incoming
+        if remaining > capacity * CAPACITY_HIGH_WATER:
+            excess = remaining - int(capacity * CAPACITY_LOW_WATER)
+            candidates = await self.store.async_get_eviction_candidates(self.list_id, excess + len(expired))
+            evicted = [ip for ip in candidates if ip not in expired][:excess]
+            _LOGGER.warning(
+                "⚠️ List %s at %d of %d items, evicting %d entries", self.list_id, len(self.items), capacity, len(evicted)
+            )
+
+        to_remove = list(expired) + evicted
+        if to_remove:
+            await self.async_remove_ips(headers, to_remove)
+        return len(expired), len(evicted)
+
+
+def get_list_mirror(hass, session, store, account_id, list_id):
+    """Return the process-wide mirror of a list, shared by every entry writing to it."""
+    mirrors = hass.data.setdefault(DOMAIN, {}).setdefault("list_mirrors", {})
+    key = (account_id, list_id)
+    if key not in mirrors:
+        mirrors[key] = CloudflareListMirror(session, store, account_id, list_id)
+    return mirrors[key]
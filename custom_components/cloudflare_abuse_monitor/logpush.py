@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+from http import HTTPStatus
+
+from homeassistant.components.http import HomeAssistantView
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+LOGPUSH_URL = "/api/cloudflare_abuse_monitor/logpush/{zone_id}"
+CHUNK_SIZE = 64 * 1024
+# Limits of one batch, compressed as received and decompressed
+MAX_BATCH_BYTES = 32 * 1024 * 1024
+MAX_DECOMPRESSED_BYTES = 256 * 1024 * 1024
+# Largest piece decompressed at once, so a small, highly compressed body cannot balloon in memory
+MAX_PIECE_BYTES = 1024 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _event_datetime(value):
+    """Return a Logpush Datetime (RFC 3339, unix seconds or unix nanoseconds) in the GraphQL format."""
+    if isinstance(value, (int, float)):
+        seconds = value / 1e9 if value > 1e15 else value
+        when = datetime.fromtimestamp(seconds, tz=timezone.utc)
+    else:
+        when = datetime.fromisoformat(str(value).replace("Z", "+00:00")).astimezone(timezone.utc)
+    return when.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def parse_logpush_line(line):
+    """Return a firewall_events line as {clientIP, action, datetime, rayName}, or None if it is not one.
+
+    Cloudflare posts a test line without these fields when the job is
+    created; it is ignored like any other line without a ClientIP.
+    """
+    try:
+        record = json.loads(line)
+        if not isinstance(record, dict) or not record.get("ClientIP"):
+            return None
+        return {
+            "clientIP": record["ClientIP"],
+            "action": record.get("Action"),
+            "datetime": _event_datetime(record["Datetime"]),
+            "rayName": record.get("RayName") or record.get("RayID"),
+        }
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return None
+
+
+class SkipAggregate:
+    """Today's skip events of one batch, folded per IP while the batch streams in.
+
+    seen_rays is the receiving coordinator's memory of pushed rays: events it
+    already holds, as in a retried batch, count as duplicates instead of hits.
+    """
+
+    def __init__(self, day, seen_rays):
+        self.day = day
+        self.hits = Counter()
+        self.rays = set()
+        self.duplicates = 0
+        self._seen_rays = seen_rays
+
+    def add(self, event):
+        if event["action"] != "skip" or not event["datetime"].startswith(self.day):
+            return
+        ray = event["rayName"]
+        if ray:
+            if ray in self.rays or ray in self._seen_rays:
+                self.duplicates += 1
+                return
+            self.rays.add(ray)
+        self.hits[event["clientIP"]] += 1
+
+
+class BatchTooLarge(Exception):
+    pass
+
+
+def _gunzip(decompressor, chunk):
+    """Yield chunk decompressed, in pieces of at most MAX_PIECE_BYTES."""
+    yield decompressor.decompress(chunk, MAX_PIECE_BYTES)
+    while decompressor.unconsumed_tail:
+        yield decompressor.decompress(decompressor.unconsumed_tail, MAX_PIECE_BYTES)
+
+
+async def iter_ndjson_lines(content):
+    """Yield the lines of an NDJSON body, gunzipping it on the fly if it is gzip compressed.
+
+    The body is read in CHUNK_SIZE pieces, so a batch never sits in memory
+    whole. aiohttp already decodes a body sent with Content-Encoding: gzip;
+    a gzip body without it is recognized by its magic bytes.
+    """
+    decompressor = None
+    received = 0
+    decompressed = 0
+    buffer = b""
+    async for chunk in content.iter_chunked(CHUNK_SIZE):
+        if not received and chunk.startswith(GZIP_MAGIC):
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        received += len(chunk)
+        if received > MAX_BATCH_BYTES:
+            raise BatchTooLarge(f"batch is larger than {MAX_BATCH_BYTES} bytes")
+        for piece in _gunzip(decompressor, chunk) if decompressor is not None else (chunk,):
+            decompressed += len(piece)
+            if decompressed > MAX_DECOMPRESSED_BYTES:
+                raise BatchTooLarge(f"batch decompresses to more than {MAX_DECOMPRESSED_BYTES} bytes")
+            buffer += piece
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield line
+    if decompressor is not None:
+        buffer += decompressor.flush()
+    for line in buffer.split(b"\n"):
+        yield line
+
+
+class LogpushView(HomeAssistantView):
+    """Receive Cloudflare Logpush firewall_events batches for a zone.
+
+    Needs a Home Assistant access token, which the Logpush HTTP destination
+    sends when its URL carries header_Authorization=Bearer%20<token>.
+    """
+
+    url = LOGPUSH_URL
+    name = "api:cloudflare_abuse_monitor:logpush"
+    requires_auth = True
+
+    def __init__(self, hass):
+        self.hass = hass
+        # One batch per zone at a time, so a retry overlapping its original is still deduplicated
+        self._locks = {}
+
+    async def post(self, request, zone_id):
+        coordinators = [
+            coordinator for entry in self.hass.config_entries.async_entries(DOMAIN)
+            if (coordinator := self.hass.data.get(DOMAIN, {}).get(entry.entry_id)) is not None
+            and entry.data["zone_id"] == zone_id and coordinator.logpush_enabled
+        ]
+        if not coordinators:
+            return self.json_message("Logpush ingestion is not enabled for this zone", HTTPStatus.NOT_FOUND)
+
+        async with self._locks.setdefault(zone_id, asyncio.Lock()):
+            aggregates = [await coordinator.async_start_batch() for coordinator in coordinators]
+            lines = 0
+            skip_events = 0
+            try:
+                async for line in iter_ndjson_lines(request.content):
+                    if not line.strip():
+                        continue
+                    lines += 1
+                    event = parse_logpush_line(line)
+                    # Only skip events feed the pipeline, and only as hits per IP
+                    if event is not None and event["action"] == "skip":
+                        skip_events += 1
+                        for aggregate in aggregates:
+                            aggregate.add(event)
+            except BatchTooLarge as e:
+                return self.json_message(str(e), HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            except zlib.error as e:
+                return self.json_message(f"Invalid gzip body: {e}", HTTPStatus.BAD_REQUEST)
+
+            ingested = 0
+            for coordinator, aggregate in zip(coordinators, aggregates):
+                ingested = max(ingested, await coordinator.async_ingest_events(aggregate))
+        _LOGGER.debug("Logpush batch for %s: %d lines, %d skip events, %d new", zone_id, lines, skip_events, ingested)
+        return self.json({"lines": lines, "skip_events": skip_events, "ingested": ingested})
+
+
+def async_register_logpush_view(hass):
+    """Register the Logpush endpoint once; zones without ingestion enabled get 404."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if domain_data.get("logpush_view") or getattr(hass, "http", None) is None:
+        return
+    hass.http.register_view(LogpushView(hass))
+    domain_data["logpush_view"] = True
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+
+from .api import AbuseIPDBRateLimitError, check_abuse_ip
+from .const import DOMAIN
+from .metrics import get_metrics
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 10
+# Longest wait we accept inside a cycle; anything longer defers the IP to a later cycle.
+MAX_WAIT_SECONDS = 30
+# Requests kept in reserve so a burst of new IPs never drains the daily quota completely.
+QUOTA_RESERVE = 5
+# How long a finished lookup is handed to other entries asking for the same IP.
+RECENT_SECONDS = 120
+
+
+class AbuseIPDBRateLimiter:
+    """Token bucket fed by AbuseIPDB's X-RateLimit-* and Retry-After headers."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.blocked_until = 0.0
+        self.remaining = None
+        self.limit = None
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def block_for(self, seconds):
+        """Stop handing out tokens for the given number of seconds."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    def update_from_headers(self, headers):
+        """Adjust the bucket from the rate-limit headers of a response."""
+        try:
+            if "X-RateLimit-Limit" in headers:
+                self.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Remaining" in headers:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+                if self.remaining <= QUOTA_RESERVE:
+                    reset = headers.get("X-RateLimit-Reset")
+                    wait = int(reset) - time.time() if reset else 60
+                    self.block_for(max(1, wait))
+                else:
+                    self.tokens = min(self.tokens, float(self.remaining - QUOTA_RESERVE))
+            if "Retry-After" in headers:
+                self.block_for(int(headers["Retry-After"]))
+        except (TypeError, ValueError):
+            _LOGGER.debug("Ignoring malformed AbuseIPDB rate-limit headers: %s", dict(headers))
+
+    async def async_acquire(self, max_wait=MAX_WAIT_SECONDS):
+        """Take one token, waiting up to max_wait seconds. Return False if that is not enough."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if self.blocked_until > now:
+                    wait = self.blocked_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return True
+                    wait = (1 - self.tokens) / self.rate
+                if wait > max_wait:
+                    return False
+                await asyncio.sleep(wait)
+
+
+def get_rate_limiter(hass, api_key):
+    """Return the process-wide rate limiter for an AbuseIPDB key, shared by every entry using it."""
+    limiters = hass.data.setdefault(DOMAIN, {}).setdefault("rate_limiters", {})
+    if api_key not in limiters:
+        limiters[api_key] = AbuseIPDBRateLimiter()
+    return limiters[api_key]
+
+
+class AbuseIPDBLookupEngine:
+    """Look up many IPs against AbuseIPDB with bounded concurrency.
+
+    One engine serves every entry using the same key. An IP already being
+    looked up is not looked up again: later callers wait for the running
+    lookup and share its outcome, and finished outcomes are kept for
+    RECENT_SECONDS so a caller whose store read raced the lookup still gets
+    them. Verdicts are queued in the reputation store as they arrive.
+    """
+
+    def __init__(self, session, api_key, rate_limiter, store=None, metrics=None, concurrency=DEFAULT_CONCURRENCY):
+        self.session = session
+        self.api_key = api_key
+        self.rate_limiter = rate_limiter
+        self.store = store
+        self.metrics = metrics
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # IP -> future of the running lookup's outcome
+        self._inflight = {}
+        # IP -> (monotonic time, outcome) of recent lookups
+        self._recent = {}
+        self.shared_total = 0
+
+    async def _async_check(self, ip):
+        """Look one IP up and return its outcome as ("result" | "error" | "deferred", value)."""
+        async with self._semaphore:
+            for _ in range(2):
+                if not await self.rate_limiter.async_acquire():
+                    return "deferred", None
+                try:
+                    result = await check_abuse_ip(self.session, ip, self.api_key, self.rate_limiter)
+                except AbuseIPDBRateLimitError as e:
+                    _LOGGER.warning("⚠️ %s", e)
+                    self.rate_limiter.block_for(e.retry_after)
+                    continue
+                except Exception as e:
+                    return "error", str(e)
+                if "error" in result:
+                    return "error", result["error"]
+                if self.store is not None:
+                    await self.store.async_upsert({ip: result})
+                return "result", result
+            return "deferred", None
+
+    async def _async_outcome(self, ip):
+        """Return (outcome, shared), shared telling whether another caller's lookup answered it."""
+        recent = self._recent.get(ip)
+        if recent is not None and recent[1][0] == "result":
+            return recent[1], True
+        future = self._inflight.get(ip)
+        if future is not None:
+            try:
+                # Shielded so a cancelled follower does not cancel the leader's lookup
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader was cancelled; try again next cycle
+                return ("deferred", None), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[ip] = future
+        try:
+            outcome = await self._async_check(ip)
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            self._inflight.pop(ip, None)
+        future.set_result(outcome)
+        self._recent[ip] = (time.monotonic(), outcome)
+        return outcome, False
+
+    def _prune_recent(self):
+        horizon = time.monotonic() - RECENT_SECONDS
+        self._recent = {ip: item for ip, item in self._recent.items() if item[0] >= horizon}
+
+    async def async_lookup(self, ips):
+        """Check every IP and return (results, errors, deferred).
+
+        results maps IP to the check_abuse_ip result, errors maps IP to the
+        error text, and deferred lists IPs skipped because the quota or a
+        Retry-After window did not allow them in this cycle.
+        """
+        self._prune_recent()
+        outcomes = await asyncio.gather(*(self._async_outcome(ip) for ip in ips))
+
+        results = {}
+        errors = {}
+        deferred = []
+        shared = 0
+        for ip, ((kind, value), was_shared) in zip(ips, outcomes):
+            shared += was_shared
+            if kind == "result":
+                results[ip] = value
+            elif kind == "error":
+                errors[ip] = value
+            else:
+                deferred.append(ip)
+
+        if shared:
+            self.shared_total += shared
+            _LOGGER.debug("Shared %d AbuseIPDB lookups with other entries", shared)
+            if self.metrics is not None:
+                self.metrics.record_shared(shared)
+        if errors:
+            _LOGGER.warning("⚠️ %d AbuseIPDB lookups failed", len(errors))
+        if deferred:
+            _LOGGER.info("AbuseIPDB quota deferred %d lookups to a later cycle", len(deferred))
+        return results, errors, deferred
+
+
+def get_lookup_engine(hass, session, api_key, store):
+    """Return the process-wide lookup engine for an AbuseIPDB key, shared by every entry using it."""
+    engines = hass.data.setdefault(DOMAIN, {}).setdefault("lookup_engines", {})
+    if api_key not in engines:
+        engines[api_key] = AbuseIPDBLookupEngine(
+            session, api_key, get_rate_limiter(hass, api_key), store, get_metrics(hass)
+        )
+    return engines[api_key]
@@ -0,0 +1,282 @@
+import contextvars
+import re
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import DOMAIN
+
+# Upper bounds of the latency histogram buckets, in milliseconds; the last bucket is open.
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+# Path segments after these are ids and are folded into {id} in endpoint names.
+ID_PARENTS = {"zones", "accounts", "lists", "bulk_operations"}
+ENDPOINT_LITERALS = {"bulk_operations", "rules", "items", "settings"}
+RATE_LIMIT_HEADER_RE = re.compile(r"^(x-)?ratelimit-(limit|remaining|reset)$", re.IGNORECASE)
+
+# Counter of the cycle currently running in this task, if any, and the EntryMetrics of its entry
+_cycle_calls = contextvars.ContextVar("cycle_calls", default=None)
+_cycle_entry = contextvars.ContextVar("cycle_entry", default=None)
+
+
+def endpoint_name(method, url):
+    """Return "METHOD host/path" with ids replaced by {id}."""
+    parts = urlsplit(str(url))
+    segments = parts.path.split("/")
+    for i in range(1, len(segments)):
+        if segments[i - 1] in ID_PARENTS and segments[i] and segments[i] not in ENDPOINT_LITERALS:
+            segments[i] = "{id}"
+    return f"{method} {parts.netloc}{'/'.join(segments)}"
+
+
+class EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, seconds, ok):
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+        self.total_seconds += seconds
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+
+    def percentile_ms(self, fraction):
+        """Return the upper bound of the bucket holding the given share of calls, or None if unbounded."""
+        target = self.calls * fraction
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return None if self.buckets[-1] else 0
+
+    def as_dict(self, histogram=False):
+        data = {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_seconds * 1000 / self.calls, 1) if self.calls else 0,
+            "p50_ms": self.percentile_ms(0.5),
+            "p95_ms": self.percentile_ms(0.95),
+        }
+        if histogram:
+            labels = [f"le_{bound}" for bound in LATENCY_BUCKETS_MS] + ["gt_%d" % LATENCY_BUCKETS_MS[-1]]
+            data["histogram"] = dict(zip(labels, self.buckets))
+        return data
+
+
+def _count_in_cycle(endpoint):
+    calls = _cycle_calls.get()
+    if calls is not None:
+        calls[endpoint] += 1
+    entry = _cycle_entry.get()
+    if entry is not None:
+        entry.calls[endpoint] += 1
+
+
+def count_cycle_call(method, url):
+    """Count a call made on behalf of the running cycle by another task, such as a batched request."""
+    _count_in_cycle(endpoint_name(method, url))
+
+
+def detach_cycle():
+    """Stop counting the calls of the current task towards the cycle that started it."""
+    _cycle_calls.set(None)
+    _cycle_entry.set(None)
+
+
+def _hit_ratio(hits, misses):
+    total = hits + misses
+    return round(hits / total * 100, 1) if total else None
+
+
+class EntryMetrics:
+    """Calls and reputation cache use of one entry's cycles."""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.shared_lookups = 0
+
+    @property
+    def cache_hit_ratio(self):
+        return _hit_ratio(self.cache_hits, self.cache_misses)
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+
+class ApiMetrics:
+    """Process-wide counters of API calls, the reputation cache and rate limits.
+
+    Requests are recorded by InstrumentedSession. A cycle wrapped in
+    track_cycle() also counts the calls made from its task and the tasks
+    it starts, and its duration is kept per entry. Those calls and the
+    cache use of the cycle add up in the entry's EntryMetrics.
+    """
+
+    def __init__(self):
+        self.started = datetime.now()
+        self.endpoints = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.shared_lookups = 0
+        self.rate_limits = {}
+        self.cycles = {}
+        self.entries = {}
+
+    def record_request(self, method, url, seconds, status=None, headers=None):
+        endpoint = endpoint_name(method, url)
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        stats.record(seconds, status is not None and status < 400)
+
+        _count_in_cycle(endpoint)
+
+        if headers:
+            limits = {key.lower(): value for key, value in headers.items() if RATE_LIMIT_HEADER_RE.match(key)}
+            if limits:
+                self.rate_limits[urlsplit(str(url)).netloc] = limits
+
+    def record_cache(self, hits, misses):
+        self.cache_hits += hits
+        self.cache_misses += misses
+        entry = _cycle_entry.get()
+        if entry is not None:
+            entry.cache_hits += hits
+            entry.cache_misses += misses
+
+    def record_shared(self, count):
+        """Count lookups answered by another entry's lookup of the same IP."""
+        self.shared_lookups += count
+        entry = _cycle_entry.get()
+        if entry is not None:
+            entry.shared_lookups += count
+
+    @property
+    def cache_hit_ratio(self):
+        return _hit_ratio(self.cache_hits, self.cache_misses)
+
+    def entry(self, entry_id):
+        """Return the EntryMetrics of an entry, empty until one of its cycles ran."""
+        if entry_id not in self.entries:
+            self.entries[entry_id] = EntryMetrics()
+        return self.entries[entry_id]
+
+    @property
+    def total_calls(self):
+        return sum(stats.calls for stats in self.endpoints.values())
+
+    @contextmanager
+    def track_cycle(self, entry_id, name):
+        calls = Counter()
+        token = _cycle_calls.set(calls)
+        entry_token = _cycle_entry.set(self.entry(entry_id))
+        start = time.monotonic()
+        try:
+            yield calls
+        finally:
+            _cycle_calls.reset(token)
+            _cycle_entry.reset(entry_token)
+            self.cycles.setdefault(entry_id, {})[name] = {
+                "duration_seconds": round(time.monotonic() - start, 3),
+                "api_calls": sum(calls.values()),
+                "api_calls_by_endpoint": dict(calls),
+                "finished": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+
+    def last_cycle(self, entry_id, name):
+        return self.cycles.get(entry_id, {}).get(name)
+
+    def as_dict(self, histogram=False):
+        return {
+            "since": self.started.strftime("%Y-%m-%d %H:%M:%S"),
+            "total_calls": self.total_calls,
+            "endpoints": {
+                endpoint: stats.as_dict(histogram) for endpoint, stats in sorted(self.endpoints.items())
+            },
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_ratio": self.cache_hit_ratio,
+            "shared_lookups": self.shared_lookups,
+            "rate_limits": dict(self.rate_limits),
+        }
+
+
+class _TimedRequest:
+    def __init__(self, request, metrics, method, url):
+        self._request = request
+        self._metrics = metrics
+        self._method = method
+        self._url = url
+        self._response = None
+
+    async def __aenter__(self):
+        self._start = time.monotonic()
+        try:
+            self._response = await self._request.__aenter__()
+        except BaseException:
+            self._metrics.record_request(self._method, self._url, time.monotonic() - self._start)
+            raise
+        return self._response
+
+    async def __aexit__(self, *exc_info):
+        # Timed on exit, so reading the body counts towards the call's latency
+        try:
+            return await self._request.__aexit__(*exc_info)
+        finally:
+            self._metrics.record_request(
+                self._method, self._url, time.monotonic() - self._start,
+                self._response.status, self._response.headers,
+            )
+
+
+class InstrumentedSession:
+    """aiohttp session wrapper that records every request in ApiMetrics."""
+
+    def __init__(self, session, metrics):
+        self._session = session
+        self.metrics = metrics
+
+    def request(self, method, url, **kwargs):
+        return _TimedRequest(self._session.request(method, url, **kwargs), self.metrics, method, url)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+def get_metrics(hass):
+    """Return the process-wide API metrics."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "metrics" not in domain_data:
+        domain_data["metrics"] = ApiMetrics()
+    return domain_data["metrics"]
+
+
+def get_instrumented_session(hass):
+    """Return the shared client session wrapped to record into the process-wide metrics."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "session" not in domain_data:
+        domain_data["session"] = InstrumentedSession(async_get_clientsession(hass), get_metrics(hass))
+    return domain_data["session"]
@@ -0,0 +1,120 @@
+import ipaddress
+import json
+import logging
+
+from .configuration import WatchedFile
+from .const import DOMAIN, PREFILTER_FILE
+
+_LOGGER = logging.getLogger(__name__)
+
+ALLOW = "allow"
+DENY = "deny"
+
+
+class PrefixTrie:
+    """Binary trie of IPv4 and IPv6 networks with longest-prefix-match lookup."""
+
+    def __init__(self):
+        # Node: [child for bit 0, child for bit 1, value]; one root per IP version
+        self._roots = {4: [None, None, None], 6: [None, None, None]}
+        self.size = 0
+
+    def insert(self, network, value):
+        network = ipaddress.ip_network(network, strict=False)
+        bits = network.max_prefixlen
+        address = int(network.network_address)
+        node = self._roots[network.version]
+        for i in range(network.prefixlen):
+            bit = (address >> (bits - 1 - i)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        node[2] = value
+        self.size += 1
+
+    def overlaps(self, network, value):
+        """Whether network lies inside, or contains, a network holding value."""
+        network = ipaddress.ip_network(network, strict=False)
+        bits = network.max_prefixlen
+        address = int(network.network_address)
+        node = self._roots[network.version]
+        for i in range(network.prefixlen):
+            if node[2] == value:
+                return True
+            node = node[(address >> (bits - 1 - i)) & 1]
+            if node is None:
+                return False
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node[2] == value:
+                return True
+            stack.extend(child for child in node[:2] if child is not None)
+        return False
+
+    def lookup(self, ip):
+        """Return the value of the longest network containing ip, or None."""
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        bits = address.max_prefixlen
+        value = int(address)
+        node = self._roots[address.version]
+        match = node[2]
+        for i in range(bits):
+            node = node[(value >> (bits - 1 - i)) & 1]
+            if node is None:
+                break
+            if node[2] is not None:
+                match = node[2]
+        return match
+
+
+class CIDRPrefilter(WatchedFile):
+    """Allow and deny networks from cloudflare_abuse_monitor_prefilter.json.
+
+    The file holds {"allow": [cidr, ...], "deny": [cidr, ...]}. The most
+    specific network wins, so an allowed /24 can be carved out of a denied
+    /16. As a WatchedFile, the trie is rebuilt only when the file changes.
+    """
+
+    def __init__(self, hass, path=PREFILTER_FILE):
+        super().__init__(hass, path, PrefixTrie)
+
+    @property
+    def trie(self):
+        return self.value
+
+    def _parse(self):
+        with open(self.path, "r") as f:
+            rules = json.load(f)
+        trie = PrefixTrie()
+        for verdict in (ALLOW, DENY):
+            for network in rules.get(verdict, []):
+                try:
+                    trie.insert(network, verdict)
+                except ValueError:
+                    _LOGGER.warning(f"⚠️ Ignoring invalid network {network!r} in {self.path}")
+        _LOGGER.info("✅ Loaded %d prefilter networks from %s", trie.size, self.path)
+        return trie
+
+    async def async_classify(self, ips):
+        """Return {ip: "allow" | "deny"} for the IPs covered by a local rule."""
+        trie = await self.async_get()
+        if not trie.size:
+            return {}
+        matches = {}
+        for ip in ips:
+            verdict = trie.lookup(ip)
+            if verdict is not None:
+                matches[ip] = verdict
+        return matches
+
+
+def get_prefilter(hass):
+    """Return the process-wide CIDR prefilter."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "prefilter" not in domain_data:
+        domain_data["prefilter"] = CIDRPrefilter(hass)
+    return domain_data["prefilter"]
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import random
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from . import api
+from .const import DOMAIN
+from .metrics import get_instrumented_session
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+# A Retry-After longer than this is not waited out; the response goes back to the caller.
+MAX_RETRY_AFTER = 30
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Methods safe to send again; list bulk POST and DELETE are not, GraphQL queries are
+RETRY_METHODS = {"GET", "PATCH"}
+
+# Consecutive failures that open a host's circuit, and how long it stays open.
+FAILURE_THRESHOLD = 5
+OPEN_SECONDS = 30
+MAX_OPEN_SECONDS = 300
+
+
+class CircuitOpenError(aiohttp.ClientConnectionError):
+    """Raised instead of calling a host whose circuit is open."""
+
+    def __init__(self, host, retry_in):
+        super().__init__(f"{host} is failing, calls are paused for another {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Per-host breaker: opens after FAILURE_THRESHOLD failures in a row.
+
+    While open, calls fail fast. Once the open period is over a single probe
+    is let through; its success closes the circuit, its failure opens it
+    again for twice as long, up to MAX_OPEN_SECONDS.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.failures = 0
+        self.open_until = None
+        self.open_seconds = OPEN_SECONDS
+        self.probing = False
+
+    @property
+    def state(self):
+        if self.open_until is None:
+            return "closed"
+        return "open" if time.monotonic() < self.open_until else "half_open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half_open" and self.probing):
+            raise CircuitOpenError(self.host, max(0.0, (self.open_until or 0) - time.monotonic()))
+        if state == "half_open":
+            self.probing = True
+
+    def record_success(self):
+        if self.open_until is not None:
+            _LOGGER.info("✅ %s is answering again, circuit closed", self.host)
+        self.failures = 0
+        self.open_until = None
+        self.open_seconds = OPEN_SECONDS
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing:
+            self.open_seconds = min(MAX_OPEN_SECONDS, self.open_seconds * 2)
+        if self.probing or self.failures >= FAILURE_THRESHOLD:
+            self.open_until = time.monotonic() + self.open_seconds
+            _LOGGER.warning(f"⚠️ {self.host} failed {self.failures} times in a row, pausing calls for {self.open_seconds}s")
+        self.probing = False
+
+    def as_dict(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_in_seconds": round(max(0.0, self.open_until - time.monotonic()), 1) if self.open_until else 0,
+        }
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given zero-based attempt."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def is_retryable(method, url):
+    """Whether a call may be sent again after a failure without doing its work twice."""
+    return method in RETRY_METHODS or (method == "POST" and urlsplit(str(url)).path.endswith("/graphql"))
+
+
+def passes_429(url):
+    """Whether a 429 goes straight back to the caller; AbuseIPDB's feed the shared rate limiter."""
+    return str(url).startswith(api.ABUSEIPDB_API_URL)
+
+
+def retry_after(headers):
+    try:
+        return max(0, int(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return None
+
+
+class _ResilientRequest:
+    def __init__(self, session, method, url, kwargs):
+        self._session = session
+        self._method = method
+        self._url = url
+        self._kwargs = kwargs
+        self._request = None
+
+    async def __aenter__(self):
+        breaker = self._session.breaker(self._url)
+        attempts = MAX_ATTEMPTS if is_retryable(self._method, self._url) else 1
+        for attempt in range(attempts):
+            breaker.before_call()
+            last = attempt == attempts - 1
+            request = self._session.inner.request(self._method, self._url, **self._kwargs)
+            try:
+                response = await request.__aenter__()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                breaker.record_failure()
+                if last:
+                    raise
+                delay = backoff_delay(attempt)
+                _LOGGER.debug("%s %s failed (%s), retrying in %.1fs", self._method, self._url, e, delay)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled mid-call; let the next call probe instead
+                breaker.probing = False
+                raise
+
+            if response.status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if response.status not in RETRY_STATUSES or last or (response.status == 429 and passes_429(self._url)):
+                self._request = request
+                return response
+
+            delay = retry_after(response.headers)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            elif delay > MAX_RETRY_AFTER:
+                self._request = request
+                return response
+            await request.__aexit__(None, None, None)
+            _LOGGER.debug("%s %s answered %s, retrying in %.1fs", self._method, self._url, response.status, delay)
+            await asyncio.sleep(delay)
+
+    async def __aexit__(self, *exc_info):
+        if self._request is not None:
+            return await self._request.__aexit__(*exc_info)
+
+
+class ResilientSession:
+    """Session wrapper that retries 429 and 5xx answers and trips a breaker per host.
+
+    Retries back off exponentially with full jitter, or wait for Retry-After
+    when the server sends one short enough to wait out. Only GET, PATCH and
+    GraphQL calls are retried, and AbuseIPDB's 429s go back to the caller so
+    its rate limiter holds every lookup, not just the one that hit the limit.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.breakers = {}
+
+    def breaker(self, url):
+        host = urlsplit(str(url)).netloc
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(host)
+        return self.breakers[host]
+
+    def request(self, method, url, **kwargs):
+        return _ResilientRequest(self, method, url, kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+def get_session(hass):
+    """Return the shared, instrumented client session with retries and circuit breakers."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "resilient_session" not in domain_data:
+        domain_data["resilient_session"] = ResilientSession(get_instrumented_session(hass))
+    return domain_data["resilient_session"]
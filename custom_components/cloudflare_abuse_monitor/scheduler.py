@@ -0,0 +1,85 @@
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+
+_LOGGER = logging.getLogger(__name__)
+
+# Upper bound of the start offset given to each entry's tasks.
+MAX_JITTER = timedelta(minutes=1)
+
+
+class EntryScheduler:
+    """Run an entry's data classes on their own cadence, offset by a jitter.
+
+    The jitter is derived from seed, so it is stable across restarts while
+    still spreading schedulers with different seeds. A run that is still in
+    progress when its next tick fires is skipped rather than stacked.
+    """
+
+    def __init__(self, hass: HomeAssistant, seed: str):
+        self.hass = hass
+        self._seed = seed
+        self._tasks = {}
+
+    def schedule(self, name, interval: timedelta, action):
+        """Run action every interval, starting after the entry's jitter; no-op if unchanged."""
+        task = self._tasks.get(name)
+        if task is not None and task["interval"] == interval:
+            return
+        self.cancel(name)
+
+        # The offset is a phase within the interval on the wall clock, seeded per
+        # task, so schedulers with the same seed tick together whenever they started
+        jitter = random.Random(f"{self._seed}:{name}").uniform(0, min(interval, MAX_JITTER).total_seconds())
+        delay = (jitter - time.time()) % interval.total_seconds()
+        task = {
+            "interval": interval,
+            "action": action,
+            "running": False,
+            "next_run": datetime.now() + timedelta(seconds=delay),
+            "unsub": None,
+        }
+        self._tasks[name] = task
+
+        @callback
+        def _start(_now):
+            task["unsub"] = async_track_time_interval(self.hass, _tick, interval)
+            _tick(_now)
+
+        @callback
+        def _tick(_now):
+            task["next_run"] = datetime.now() + interval
+            if task["running"]:
+                _LOGGER.debug("Skipping %s run, the previous one is still in progress", name)
+                return
+            self.hass.async_create_task(_run())
+
+        async def _run():
+            task["running"] = True
+            try:
+                await action()
+            except Exception as e:
+                _LOGGER.warning(f"⚠️ Scheduled {name} run failed: {e}")
+            finally:
+                task["running"] = False
+
+        task["unsub"] = async_call_later(self.hass, delay, _start)
+
+    def next_run(self, name):
+        """Return when the named task runs next, or None if it is not scheduled."""
+        task = self._tasks.get(name)
+        return task["next_run"] if task else None
+
+    def cancel(self, name):
+        task = self._tasks.pop(name, None)
+        if task is not None and task["unsub"] is not None:
+            task["unsub"]()
+
+    @callback
+    def async_cancel_all(self):
+        for name in list(self._tasks):
+            self.cancel(name)
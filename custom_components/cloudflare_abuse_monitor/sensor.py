@@ -1,52 +1,51 @@
-import asyncio
-import random
-import json
 import logging
-from datetime import datetime, timedelta
-from pathlib import Path
-import aiofiles
-import os
+from datetime import datetime
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EntityCategory
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from .api import (
-    fetch_today_traffic_summary,
-    get_skip_ips,
-    get_current_list_ips,
-    check_abuse_ip,
-    add_ips_to_list,
-    set_under_attack_mode,
-)
-from .const import CONFIG_FILE 
-
-DOMAIN = "cloudflare_abuse_monitor"
-CHECKED_IPS_FILE = Path("/config/cloudflare_checked_ips.json")
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from .const import DOMAIN
+from .coordinator import CloudflareAbuseMonitorCoordinator
+from .ip_lists import summarize_ips
+
 _LOGGER = logging.getLogger(__name__)
 
 log_file_path = "/config/cloudflare_abuse_monitor.log"
-file_handler = logging.FileHandler(log_file_path)
+file_handler = logging.FileHandler(log_file_path, delay=True)
 file_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
 file_handler.setLevel(logging.DEBUG)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback):
+    coordinator = hass.data[DOMAIN][entry.entry_id]
     async_add_entities([
-        CloudflareTrafficSummarySensor(hass, entry),
-        CloudflareSkipIPsSensor(hass, entry),
-        CloudflareListIPsSensor(hass, entry),
-        CloudflareHighRiskIPsSensor(hass, entry),
-        CloudflareUnderAttackSensor(hass, entry),
+        CloudflareTrafficSummarySensor(coordinator, entry),
+        CloudflareSkipIPsSensor(coordinator, entry),
+        CloudflareListIPsSensor(coordinator, entry),
+        CloudflareHighRiskIPsSensor(coordinator, entry),
+        CloudflareUnderAttackSensor(coordinator, entry),
+        CloudflareScanDurationSensor(coordinator, entry),
+        CloudflareApiCallsSensor(coordinator, entry),
+        CloudflareCacheHitRatioSensor(coordinator, entry),
+        CloudflareAbuseIPDBQuotaSensor(coordinator, entry),
     ])
 
-class CloudflareBaseSensor(SensorEntity):
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
-        self.hass = hass
+class CloudflareBaseSensor(CoordinatorEntity, SensorEntity):
+    data_key = None
+    # IP samples change every scan; the counts and hashes are enough history
+    _unrecorded_attributes = frozenset({
+        "skip_ips_top", "current_list_ips_top", "high_risk_ips_top", "ips_to_check_top",
+        "aggregated_networks_top", "failed_blocks_top",
+    })
+    # Scheduler task that refreshes this sensor's data
+    cadence = "scan"
+
+    def __init__(self, coordinator: CloudflareAbuseMonitorCoordinator, entry: ConfigEntry):
+        super().__init__(coordinator)
         self._entry = entry
-        self._attr_should_poll = True
-        self._next_update_in = 60 * 60
         self._attr_extra_state_attributes = {}
-        self.config_file = CONFIG_FILE
 
     @property
     def device_info(self):
@@ -60,173 +59,100 @@ class CloudflareBaseSensor(SensorEntity):
     @property
     def extra_state_attributes(self):
         attrs = self._attr_extra_state_attributes.copy()
-        if hasattr(self, '_next_update_in') and self._next_update_in is not None:
-            attrs["next_update_in_seconds"] = self._next_update_in
-        if hasattr(self, '_next_update_in_full_date') and self._next_update_in_full_date:
-            attrs["next_update"] = self._next_update_in_full_date
+        next_run = self.coordinator.scheduler.next_run(self.cadence)
+        if next_run is not None:
+            attrs["next_update_in_seconds"] = max(0, int((next_run - datetime.now()).total_seconds()))
+            attrs["next_update"] = next_run.strftime("%Y-%m-%d %H:%M:%S")
+        stale = self.coordinator.stale.get(self.data_key)
+        if stale is not None:
+            # The last fetch failed; the state is the last good data
+            attrs["stale_since"] = stale["since"]
+            attrs["last_error"] = stale["error"]
         return attrs
 
-    async def _get_sleep_interval(self):
-        """Generate a sleep interval based on scan_interval_minutes from the config file."""
-        if self.counter == 0:
-            seconds_to_wait = random.randint(4, 7)
-            self.counter = 1
+    @property
+    def section(self):
+        """Return this sensor's slice of the coordinator data, or None if it was not collected yet."""
+        if not self.coordinator.data:
+            return {"error": "No data"}
+        return self.coordinator.data.get(self.data_key)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        section = self.section
+        if section is None:
+            # High Risk is filled in after the first refresh; keep the initial state until then
+            pass
+        elif isinstance(section, dict) and "error" in section:
+            self._attr_native_value = "error"
+            self._attr_extra_state_attributes = {"error": section["error"]}
         else:
-            self.counter = 1
-            try:
-                if self.config_file.exists():
-                    async with aiofiles.open(self.config_file, mode="r") as f:
-                        content = await f.read()
-                        config_data = json.loads(content)
-                        minutes = int(config_data.get("scan_interval_minutes", 1))
-                        seconds = max(1, minutes * 60)
-                else:
-                    seconds = 60
-            except Exception as e:
-                _LOGGER.warning(f"⚠️ Failed to read scan_interval_minutes from config: {e}")
-                seconds = 60
-
-            seconds_to_wait = seconds
-
-        return seconds_to_wait
-        
-        
-    async def _schedule_next_update(self):
-        """Schedule the next sensor update after a random interval."""
-        #print(f"Waiting for {self._next_update_in} seconds before next update...")
-        await asyncio.sleep(self._next_update_in)  # Wait for the random interval
-        #await self.async_update()  # Perform the update again
+            self._update_from_section(section)
+        super()._handle_coordinator_update()
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self._handle_coordinator_update()
+
+    def _update_from_section(self, section):
+        raise NotImplementedError
 
 
 class CloudflareTrafficSummarySensor(CloudflareBaseSensor):
-    def __init__(self, hass, entry):
-        super().__init__(hass, entry)
+    data_key = "traffic"
+
+    def __init__(self, coordinator, entry):
+        super().__init__(coordinator, entry)
         data = entry.data
         self._attr_name = f"{data['email']} {data['zone_name']} Traffic Summary"
         self._attr_unique_id = f"{data['email']}_{data['zone_name']}_traffic_summary".replace(" ", "_").lower()
         self._attr_native_unit_of_measurement = "requests"
         self._attr_native_value = None
-        self._next_update_in_full_date = None
-        self._next_update_in = None
-        self.counter = 0
-
-    async def async_update(self):
-        self._next_update_in = await self._get_sleep_interval() 
-        next_run_full_format = datetime.now() + timedelta(seconds=self._next_update_in)
-        self._next_update_in_full_date = next_run_full_format.strftime("%Y-%m-%d %H:%M:%S")           
-        await self._schedule_next_update()
-        self._next_update_in = await self._get_sleep_interval() 
-        next_run_full_format = datetime.now() + timedelta(seconds=self._next_update_in)
-        self._next_update_in_full_date = next_run_full_format.strftime("%Y-%m-%d %H:%M:%S")  
-
-        try:
-            data = self._entry.data
-            summary = await self.hass.async_add_executor_job(
-                fetch_today_traffic_summary, data["email"], data["global_token"], data["zone_id"]
-            )
-            self._attr_native_value = summary.get("requests", 0)
-
-            # Merge summary fields directly into the attributes
-            self._attr_extra_state_attributes = {
-                **summary,
-                "zone_id": data["zone_id"]
-            }
-
-            self._attr_extra_state_attributes.update({
-                **summary,
-                "zone_id": data["zone_id"]
-            })
-
-        except Exception as e:
-            self._attr_native_value = "error"
-            self._attr_extra_state_attributes = {
-                "error": str(e),
-                "zone_id": data.get("zone_id")
-            }
+
+    def _update_from_section(self, summary):
+        self._attr_native_value = summary.get("requests", 0)
+        # Merge summary fields directly into the attributes
+        self._attr_extra_state_attributes = {
+            **summary,
+            "zone_id": self._entry.data["zone_id"]
+        }
+
 class CloudflareSkipIPsSensor(CloudflareBaseSensor):
-    def __init__(self, hass, entry):
-        super().__init__(hass, entry)
+    data_key = "skip_ips"
+
+    def __init__(self, coordinator, entry):
+        super().__init__(coordinator, entry)
         data = entry.data
         self._attr_name = f"{data['email']} {data['zone_name']} Skip IPs"
         self._attr_unique_id = f"{data['email']}_{data['zone_name']}_skip_ips".replace(" ", "_").lower()
         self._attr_native_unit_of_measurement = "IPs"
         self._attr_native_value = 0
-        self._next_update_in_full_date = None
-        self._next_update_in = None
-        self.counter = 0
-        
-
-    async def async_update(self):     
-        self._next_update_in = await self._get_sleep_interval() 
-        next_run_full_format = datetime.now() + timedelta(seconds=self._next_update_in)
-        self._next_update_in_full_date = next_run_full_format.strftime("%Y-%m-%d %H:%M:%S")           
-        await self._schedule_next_update()
-        self._next_update_in = await self._get_sleep_interval() 
-        next_run_full_format = datetime.now() + timedelta(seconds=self._next_update_in)
-        self._next_update_in_full_date = next_run_full_format.strftime("%Y-%m-%d %H:%M:%S")  
-
-        try:
-            data = self._entry.data
-            headers = {
-                "X-Auth-Email": data["email"],
-                "X-Auth-Key": data["global_token"],
-                "Content-Type": "application/json"
-            }
-            now = datetime.utcnow()
-            midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            skip_ips = await self.hass.async_add_executor_job(
-                get_skip_ips,
-                data["zone_id"],
-                midnight.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                now.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                headers
-            )
-            self._attr_native_value = len(skip_ips)
-            self._attr_extra_state_attributes["skip_ips"] = skip_ips
-        except Exception as e:
-            self._attr_native_value = "error"
-            self._attr_extra_state_attributes["error"] = str(e)
+
+    def _update_from_section(self, skip_ips):
+        self._attr_native_value = len(skip_ips)
+        self._attr_extra_state_attributes = summarize_ips("skip_ips", skip_ips, self.coordinator.day_skip_hits)
 
 class CloudflareListIPsSensor(CloudflareBaseSensor):
-    def __init__(self, hass, entry):
-        super().__init__(hass, entry)
+    data_key = "list_ips"
+    cadence = "list_sync"
+
+    def __init__(self, coordinator, entry):
+        super().__init__(coordinator, entry)
         data = entry.data
         self._attr_name = f"{data['email']} {data['zone_name']} List IPs"
         self._attr_unique_id = f"{data['email']}_{data['zone_name']}_list_ips".replace(" ", "_").lower()
         self._attr_native_unit_of_measurement = "IPs"
         self._attr_native_value = 0
-        self._next_update_in_full_date = None
-        self._next_update_in = None
-        self.counter = 0
-
-    async def async_update(self):      
-        self._next_update_in = await self._get_sleep_interval() 
-        next_run_full_format = datetime.now() + timedelta(seconds=self._next_update_in)
-        self._next_update_in_full_date = next_run_full_format.strftime("%Y-%m-%d %H:%M:%S")           
-        await self._schedule_next_update()
-        self._next_update_in = await self._get_sleep_interval() 
-        next_run_full_format = datetime.now() + timedelta(seconds=self._next_update_in)
-        self._next_update_in_full_date = next_run_full_format.strftime("%Y-%m-%d %H:%M:%S")  
-
-        try:
-            data = self._entry.data
-            headers = {
-                "X-Auth-Email": data["email"],
-                "X-Auth-Key": data["global_token"],
-                "Content-Type": "application/json"
-            }
-            current_ips = await self.hass.async_add_executor_job(
-                get_current_list_ips, data["account_id"], data["list_id"], headers
-            )
-            self._attr_native_value = len(current_ips)
-            self._attr_extra_state_attributes["current_list_ips"] = list(current_ips)
-        except Exception as e:
-            self._attr_native_value = "error"
-            self._attr_extra_state_attributes["error"] = str(e)
+
+    def _update_from_section(self, current_ips):
+        self._attr_native_value = len(current_ips)
+        self._attr_extra_state_attributes = summarize_ips("current_list_ips", current_ips)
 
 class CloudflareHighRiskIPsSensor(CloudflareBaseSensor):
-    def __init__(self, hass, entry):
-        super().__init__(hass, entry)
+    data_key = "high_risk"
+
+    def __init__(self, coordinator, entry):
+        super().__init__(coordinator, entry)
         data = entry.data
         self._email = data["email"]
         self._zone_name = data["zone_name"]
@@ -235,260 +161,102 @@ class CloudflareHighRiskIPsSensor(CloudflareBaseSensor):
         self._attr_unique_id = f"{self._email}_{self._zone_id}_high_risk_ips".replace(" ", "_").lower()
         self._attr_native_unit_of_measurement = "IPs"
         self._attr_native_value = 0
-        self._attr_extra_state_attributes = {}
-        self._attr_available = True
-        self._next_update_in_full_date = None
-        self._next_update_in = None
-        self.counter = 0
-
-    async def async_update(self):
-        self._next_update_in = await self._get_sleep_interval() 
-        next_run_full_format = datetime.now() + timedelta(seconds=self._next_update_in)
-        self._next_update_in_full_date = next_run_full_format.strftime("%Y-%m-%d %H:%M:%S")           
-        await self._schedule_next_update()
-        self._next_update_in = await self._get_sleep_interval() 
-        next_run_full_format = datetime.now() + timedelta(seconds=self._next_update_in)
-        self._next_update_in_full_date = next_run_full_format.strftime("%Y-%m-%d %H:%M:%S")  
-
-        try:
-            data = self._entry.data
-            options = self._entry.options
-            email = data["email"]
-            api_key = data["global_token"]
-            account_id = data["account_id"]
-            zone_id = data["zone_id"]
-            list_id = data["list_id"]
-            abuseipdb_api_key = data["abuseipdb_token"]
-            threshold = int(options.get("abuse_confidence_score", data.get("abuse_confidence_score", 100)))
-            recheck_days = int(options.get("recheck_days", data.get("recheck_days", 7)))
-            mode = options.get("mode", data.get("mode", "Monitor"))
-
-            headers = {
-                "X-Auth-Email": email,
-                "X-Auth-Key": api_key,
-                "Content-Type": "application/json"
-            }
-
-            now = datetime.utcnow()
-            midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
-            skip_ips = await self.hass.async_add_executor_job(
-                get_skip_ips,
-                zone_id,
-                midnight.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                now.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                headers
-            )
-            current_ips = await self.hass.async_add_executor_job(
-                get_current_list_ips,
-                account_id,
-                list_id,
-                headers
-            )
-
-            potential_ips = list(set(skip_ips) - set(current_ips))
-            ips_to_check = []
-
-            if CHECKED_IPS_FILE.exists():
-                with open(CHECKED_IPS_FILE, "r") as f:
-                    checked_cache = json.load(f)
-            else:
-                checked_cache = {}
-
-            high_risk_ips = []
-            updated_cache = checked_cache.copy()
-
-            for ip in potential_ips:
-                last_checked = checked_cache.get(ip)
-                should_check = True
-                if last_checked:
-                    try:
-                        last_dt = datetime.fromisoformat(last_checked)
-                        if (now - last_dt).days < recheck_days:
-                            should_check = False
-                            updated_cache[ip] = last_checked
-                            continue
-                    except Exception:
-                        pass
-
-                ips_to_check.append(ip)
-
-                try:
-                    result = await self.hass.async_add_executor_job(check_abuse_ip, ip, abuseipdb_api_key)
-                    updated_cache[ip] = now.isoformat()
-                    if result.get("abuse_confidence_score", 0) >= threshold:
-                        high_risk_ips.append(result)
-                except Exception:
-                    pass
-
-            with open(CHECKED_IPS_FILE, "w") as f:
-                json.dump(updated_cache, f, indent=2)
-
-            if mode == "Active":
-                for ip_info in high_risk_ips:
-                    ip = ip_info["ip"]
-                    try:
-                        await self.hass.async_add_executor_job(
-                            add_ips_to_list,
-                            account_id,
-                            list_id,
-                            [ip],
-                            headers
-                        )
-                    except Exception:
-                        pass
-
-            self._attr_native_value = len(high_risk_ips)
-            self._attr_extra_state_attributes = {
-                "abuse_confidence_score_threshold": threshold,
-                "recheck_days": recheck_days,
-                "mode": mode,
-                "high_risk_ip_list": [ip["ip"] for ip in high_risk_ips],
-                "ips_to_check": ips_to_check
-            }
-
-        except Exception as e:
-            self._attr_native_value = "error"
-            self._attr_extra_state_attributes = {"error": str(e)}
-            self._attr_available = False
+
+    def _update_from_section(self, high_risk):
+        attrs = dict(high_risk)
+        high_risk_ips = attrs.pop("high_risk_ip_list")
+        ips_to_check = attrs.pop("ips_to_check")
+        aggregated_networks = attrs.pop("aggregated_networks", [])
+        failed_blocks = attrs.pop("failed_blocks", {})
+        self._attr_native_value = len(high_risk_ips)
+        self._attr_extra_state_attributes = {
+            **attrs,
+            **summarize_ips("high_risk_ips", high_risk_ips),
+            **summarize_ips("ips_to_check", ips_to_check),
+            **summarize_ips("aggregated_networks", aggregated_networks),
+            **summarize_ips("failed_blocks", failed_blocks),
+        }
 
 class CloudflareUnderAttackSensor(CloudflareBaseSensor):
-    def __init__(self, hass, entry):
-        super().__init__(hass, entry)
+    data_key = "under_attack"
+
+    def __init__(self, coordinator, entry):
+        super().__init__(coordinator, entry)
         self._attr_native_value = "off"
-        self._attr_available = True
         self._attr_name = f"{entry.data['email']} {entry.data['zone_name']} Under Attack Mode"
         self._attr_unique_id = f"{entry.data['email']}_{entry.data['zone_id']}_under_attack".replace("@", "_").replace(".", "_").lower()
-        self._next_update_in_full_date = None
-        self._next_update_in = None
-        self.counter = 0
-        self.is_first_run = False
-
-    async def _wait_for_sensor_state(self, entity_id: str, retries: int = 5, delay: int = 30):
-        for attempt in range(retries):
-            state = self.hass.states.get(entity_id)
-            if state and state.state not in ("unknown", "unavailable", None):
-                return state
-            await asyncio.sleep(delay)
-        return None
-
-    async def async_update(self):
-        self._next_update_in = await self._get_sleep_interval()
-        self._next_update_in_full_date = (datetime.now() + timedelta(seconds=self._next_update_in)).strftime("%Y-%m-%d %H:%M:%S")
-        await self._schedule_next_update()
-        self._next_update_in = await self._get_sleep_interval()
-        self._next_update_in_full_date = (datetime.now() + timedelta(seconds=self._next_update_in)).strftime("%Y-%m-%d %H:%M:%S")
-
-        try:
-            options = self._entry.options
-            mode = options.get("mode", self._entry.data.get("mode", "Monitor"))
-            if mode == "Monitor":
-                self._attr_native_value = "off"
-                self._attr_extra_state_attributes = {
-                    "mode": "Monitor",
-                    "reason": "Monitoring mode is active"
-                }
-                return
-
-            enabled = options.get("under_attack_mode", False)
-            threshold = options.get("under_attack_request_threshold", 15000)
-            email = self._entry.data["email"]
-            zone_name = self._entry.data["zone_name"]
-
-            def sanitize_entity_id(email: str, zone: str, suffix: str):
-                return f"{email}_{zone}_{suffix}".replace("@", "_").replace(".", "_").lower()
-
-            traffic_entity_id = f"sensor.{sanitize_entity_id(email, zone_name, 'traffic_summary')}"
-            state = await self._wait_for_sensor_state(traffic_entity_id)
-
-            headers = {
-                "X-Auth-Email": email,
-                "X-Auth-Key": self._entry.data["global_token"],
-                "Content-Type": "application/json"
-            }
-
-            if not enabled:
-                self._attr_native_value = "off"
-                self.is_first_run = True
-                self._attr_extra_state_attributes = {
-                    "enabled": enabled,
-                    "reason": "Under attack mode is disabled",
-                    "traffic_sensor": traffic_entity_id
-                }
-                await self.hass.async_add_executor_job(
-                    set_under_attack_mode,
-                    self._entry.data["zone_id"],
-                    headers,
-                    False
-                )
-                return
-
-            if not state or state.state in ("unknown", "unavailable"):
-                self.is_first_run = True
-                self._attr_native_value = "unknown"
-                self._attr_extra_state_attributes = {
-                    "error": f"Sensor state is {state.state if state else 'missing'}",
-                    "traffic_sensor": traffic_entity_id
-                }
-                self._attr_available = False
-                return
-
-            current_count = int(float(state.state))
-
-            # Read or initialize config
-            last_request_count = 0
-            config_data = {}
-                
-            if CONFIG_FILE.exists():
-                try:
-                    async with aiofiles.open(CONFIG_FILE, mode="r") as f:
-                        content = await f.read()
-                        config_data = json.loads(content)
-                    if "last_request_count" not in config_data:
-                        self.is_first_run = True
-                        config_data["last_request_count"] = current_count
-                except Exception as e:
-                    self.is_first_run = True
-                    config_data["last_request_count"] = current_count
-            else:
-                self.is_first_run = True
-                config_data["last_request_count"] = current_count
-
-            last_request_count = config_data.get("last_request_count", current_count)
-            if self.is_first_run:
-                last_request_count = current_count
-            delta = current_count - last_request_count
-            real_mode_enabled = not self.is_first_run and delta >= threshold
-
-            config_data["last_request_count"] = current_count
-            async with aiofiles.open(CONFIG_FILE, mode="w") as f:
-                await f.write(json.dumps(config_data, indent=2))
-            if real_mode_enabled:
-                await self.hass.async_add_executor_job(
-                    set_under_attack_mode,
-                    self._entry.data["zone_id"],
-                    headers,
-                    True
-                )
-            self.is_first_run = False
-            self._attr_native_value = "on" if real_mode_enabled else "off"
-            self._attr_extra_state_attributes = {
-                "enabled": enabled,
-                "threshold": threshold,
-                "current_request_count": current_count,
-                "last_request_count": last_request_count,
-                "delta": delta,
-                "under_attack_mode_active": real_mode_enabled,
-                "traffic_sensor": traffic_entity_id
-            }
-            self._attr_available = True
-
-
-        except Exception as e:
-            self._attr_native_value = "error"
-            self._attr_extra_state_attributes = {
-                "error": str(e),
-                "traffic_sensor": traffic_entity_id
-            }
-            self._attr_available = False
 
+    def _update_from_section(self, under_attack):
+        attrs = dict(under_attack)
+        self._attr_native_value = attrs.pop("state")
+        self._attr_extra_state_attributes = attrs
+
+
+class CloudflareDiagnosticSensor(CloudflareBaseSensor):
+    """Diagnostic sensor rendering the API metrics instead of a data section."""
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    label = None
+    key = None
+
+    def __init__(self, coordinator, entry):
+        super().__init__(coordinator, entry)
+        data = entry.data
+        self._attr_name = f"{data['email']} {data['zone_name']} {self.label}"
+        self._attr_unique_id = f"{data['email']}_{data['zone_id']}_{self.key}".replace("@", "_").replace(".", "_").lower()
+        self._attr_native_value = None
+
+    @property
+    def section(self):
+        return self.coordinator.metrics
+
+class CloudflareScanDurationSensor(CloudflareDiagnosticSensor):
+    label = "Last Scan Duration"
+    key = "last_scan_duration"
+    _attr_native_unit_of_measurement = "s"
+
+    def _update_from_section(self, metrics):
+        cycle = metrics.last_cycle(self._entry.entry_id, "scan") or {}
+        self._attr_native_value = cycle.get("duration_seconds")
+        self._attr_extra_state_attributes = {
+            name: metrics.last_cycle(self._entry.entry_id, name)
+            for name in ("scan", "list_sync", "list_sweep")
+            if metrics.last_cycle(self._entry.entry_id, name)
+        }
+
+class CloudflareApiCallsSensor(CloudflareDiagnosticSensor):
+    label = "API Calls"
+    key = "api_calls"
+    _attr_native_unit_of_measurement = "calls"
+
+    def _update_from_section(self, metrics):
+        entry_metrics = metrics.entry(self._entry.entry_id)
+        self._attr_native_value = entry_metrics.total_calls
+        self._attr_extra_state_attributes = {
+            "since": metrics.started.strftime("%Y-%m-%d %H:%M:%S"),
+            **dict(sorted(entry_metrics.calls.items())),
+        }
+
+class CloudflareCacheHitRatioSensor(CloudflareDiagnosticSensor):
+    label = "Reputation Cache Hit Ratio"
+    key = "cache_hit_ratio"
+    _attr_native_unit_of_measurement = "%"
+
+    def _update_from_section(self, metrics):
+        entry_metrics = metrics.entry(self._entry.entry_id)
+        self._attr_native_value = entry_metrics.cache_hit_ratio
+        self._attr_extra_state_attributes = {
+            "hits": entry_metrics.cache_hits,
+            "misses": entry_metrics.cache_misses,
+            "shared_lookups": entry_metrics.shared_lookups,
+        }
+
+class CloudflareAbuseIPDBQuotaSensor(CloudflareDiagnosticSensor):
+    label = "AbuseIPDB Quota Remaining"
+    key = "abuseipdb_quota_remaining"
+    _attr_native_unit_of_measurement = "requests"
+
+    def _update_from_section(self, metrics):
+        # The quota of the entry's AbuseIPDB key, shared by the entries using the same key
+        rate_limiter = self.coordinator.rate_limiter
+        self._attr_native_value = rate_limiter.remaining
+        self._attr_extra_state_attributes = {"limit": rate_limiter.limit}
@@ -0,0 +1,59 @@
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+
+from .const import DOMAIN
+from .ip_lists import DEFAULT_PAGE_SIZE, IP_LISTS, MAX_PAGE_SIZE, page_ips
+
+SERVICE_GET_IPS = "get_ips"
+
+GET_IPS_SCHEMA = vol.Schema({
+    vol.Optional("entry_id"): cv.string,
+    vol.Required("list"): vol.In(list(IP_LISTS)),
+    vol.Optional("offset", default=0): vol.All(vol.Coerce(int), vol.Range(min=0)),
+    vol.Optional("limit", default=DEFAULT_PAGE_SIZE): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_PAGE_SIZE)),
+})
+
+
+def _coordinator(hass, entry_id):
+    entries = hass.config_entries.async_entries(DOMAIN)
+    if entry_id is None:
+        if len(entries) != 1:
+            raise HomeAssistantError("entry_id is required when more than one zone is configured")
+        entry_id = entries[0].entry_id
+    coordinator = hass.data.get(DOMAIN, {}).get(entry_id)
+    if coordinator is None:
+        raise HomeAssistantError(f"No loaded Cloudflare Abuse Monitor entry {entry_id}")
+    return entry_id, coordinator
+
+
+async def async_get_ips(hass: HomeAssistant, call: ServiceCall):
+    """Return one page of an IP list that the sensors only summarize."""
+    entry_id, coordinator = _coordinator(hass, call.data.get("entry_id"))
+    name = call.data["list"]
+    ips = IP_LISTS[name](coordinator.data)
+    if ips is None:
+        raise HomeAssistantError(f"{name} is not available, the last scan failed")
+    return {
+        "entry_id": entry_id,
+        "list": name,
+        **page_ips(ips, call.data["offset"], call.data["limit"]),
+    }
+
+
+def async_setup_services(hass: HomeAssistant):
+    """Register the integration's services once, for all entries."""
+    if hass.services.has_service(DOMAIN, SERVICE_GET_IPS):
+        return
+
+    async def _async_get_ips(call):
+        return await async_get_ips(hass, call)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_GET_IPS, _async_get_ips, schema=GET_IPS_SCHEMA, supports_response=SupportsResponse.ONLY
+    )
+
+
+def async_unload_services(hass: HomeAssistant):
+    hass.services.async_remove(DOMAIN, SERVICE_GET_IPS)
@@ -0,0 +1,353 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from .const import CHECKED_IPS_FILE, DOMAIN, REPUTATION_DB_FILE
+
+_LOGGER = logging.getLogger(__name__)
+
+# SQLite's default limit on host parameters is 999; stay well below it.
+SQL_CHUNK_SIZE = 500
+EXPIRE_INTERVAL_SECONDS = 60 * 60
+
+# Verdict columns and the check_abuse_ip keys they are stored from.
+VERDICT_COLUMNS = {
+    "score": "INTEGER",
+    "country": "TEXT",
+    "usage_type": "TEXT",
+    "domain": "TEXT",
+    "total_reports": "INTEGER",
+    "last_reported_at": "TEXT",
+}
+VERDICT_KEYS = {
+    "score": "abuse_confidence_score",
+    "country": "countryCode",
+    "usage_type": "usageType",
+    "domain": "domain",
+    "total_reports": "totalReports",
+    "last_reported_at": "lastReportedAt",
+}
+
+
+class ReputationStore:
+    """SQLite-backed store of AbuseIPDB verdicts, keyed by IP and run off the event loop."""
+
+    def __init__(self, hass, path=REPUTATION_DB_FILE):
+        self.hass = hass
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._last_expire = None
+        # Verdict rows queued for the single writer, and the batch it is writing now
+        self._pending = {}
+        self._writing = {}
+        self._writer = None
+
+    def _setup(self):
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checked_ips ("
+            " ip TEXT PRIMARY KEY,"
+            " checked_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(checked_ips)")}
+        for column, column_type in VERDICT_COLUMNS.items():
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE checked_ips ADD COLUMN {column} {column_type}")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_checked_ips_checked_at ON checked_ips (checked_at)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks ("
+            " zone_id TEXT PRIMARY KEY,"
+            " day TEXT NOT NULL,"
+            " watermark TEXT NOT NULL)"
+        )
+        if "rays" not in {row[1] for row in self._conn.execute("PRAGMA table_info(watermarks)")}:
+            self._conn.execute("ALTER TABLE watermarks ADD COLUMN rays TEXT")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS skip_ips ("
+            " zone_id TEXT NOT NULL,"
+            " day TEXT NOT NULL,"
+            " ip TEXT NOT NULL,"
+            " hits INTEGER NOT NULL,"
+            " PRIMARY KEY (zone_id, ip))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blocked_ips ("
+            " list_id TEXT NOT NULL,"
+            " ip TEXT NOT NULL,"
+            " added_at REAL NOT NULL,"
+            " expires_at REAL,"
+            " score INTEGER,"
+            " PRIMARY KEY (list_id, ip))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_blocked_ips_expires_at ON blocked_ips (list_id, expires_at)"
+        )
+        self._conn.commit()
+        self._migrate_json()
+
+    def _migrate_json(self):
+        """Import the legacy cloudflare_checked_ips.json once, then rename it out of the way."""
+        if not CHECKED_IPS_FILE.exists():
+            return
+        try:
+            with open(CHECKED_IPS_FILE, "r") as f:
+                legacy = json.load(f)
+            rows = []
+            for ip, checked in legacy.items():
+                try:
+                    # Legacy timestamps are naive UTC from datetime.utcnow()
+                    checked_at = datetime.fromisoformat(checked).replace(tzinfo=timezone.utc)
+                    rows.append((ip, checked_at.timestamp()) + (None,) * len(VERDICT_COLUMNS))
+                except (TypeError, ValueError):
+                    continue
+            self._upsert(rows)
+            CHECKED_IPS_FILE.rename(CHECKED_IPS_FILE.with_suffix(".json.migrated"))
+            _LOGGER.info("✅ Migrated %d checked IPs from %s", len(rows), CHECKED_IPS_FILE)
+        except Exception as e:
+            _LOGGER.warning(f"⚠️ Failed to migrate {CHECKED_IPS_FILE}: {e}")
+
+    def _get_fresh(self, ips, threshold, max_age, clean_max_age):
+        now = time.time()
+        ips = list(ips)
+        columns = ", ".join(VERDICT_COLUMNS)
+        fresh = {}
+        with self._lock:
+            for i in range(0, len(ips), SQL_CHUNK_SIZE):
+                chunk = ips[i:i + SQL_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self._conn.execute(
+                    f"SELECT ip, checked_at, {columns} FROM checked_ips "
+                    f"WHERE ip IN ({placeholders}) "
+                    "AND checked_at >= CASE WHEN score >= ? THEN ? ELSE ? END",
+                    [*chunk, threshold, now - max_age, now - clean_max_age],
+                )
+                for ip, checked_at, *values in cursor.fetchall():
+                    verdict = {"ip": ip, "checked_at": checked_at}
+                    for column, value in zip(VERDICT_COLUMNS, values):
+                        verdict[VERDICT_KEYS[column]] = value
+                    fresh[ip] = verdict
+        return fresh
+
+    def _upsert(self, rows):
+        columns = ", ".join(VERDICT_COLUMNS)
+        placeholders = ", ".join("?" * (len(VERDICT_COLUMNS) + 2))
+        updates = ", ".join(f"{column} = excluded.{column}" for column in ("checked_at", *VERDICT_COLUMNS))
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT INTO checked_ips (ip, checked_at, {columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT(ip) DO UPDATE SET {updates}",
+                rows,
+            )
+            self._conn.commit()
+
+    def _queued_fresh(self, ips, threshold, max_age, clean_max_age):
+        """Return fresh verdicts that are queued or being written but not yet on disk."""
+        now = time.time()
+        fresh = {}
+        for ip in ips:
+            row = self._pending.get(ip) or self._writing.get(ip)
+            if row is None:
+                continue
+            ip, checked_at, *values = row
+            score = values[0]
+            max_row_age = max_age if score is not None and score >= threshold else clean_max_age
+            if checked_at < now - max_row_age:
+                continue
+            verdict = {"ip": ip, "checked_at": checked_at}
+            for column, value in zip(VERDICT_COLUMNS, values):
+                verdict[VERDICT_KEYS[column]] = value
+            fresh[ip] = verdict
+        return fresh
+
+    def _expire(self, max_age):
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM checked_ips WHERE checked_at < ?", (time.time() - max_age,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def _load_day(self, zone_id, day):
+        with self._lock:
+            self._conn.execute("DELETE FROM skip_ips WHERE zone_id = ? AND day != ?", (zone_id, day))
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT watermark, rays FROM watermarks WHERE zone_id = ? AND day = ?", (zone_id, day)
+            ).fetchone()
+            hits = dict(self._conn.execute(
+                "SELECT ip, hits FROM skip_ips WHERE zone_id = ?", (zone_id,)
+            ).fetchall())
+        if row is None:
+            return None, set(), hits
+        return row[0], set(json.loads(row[1] or "[]")), hits
+
+    def _save_day(self, zone_id, day, watermark, rays, new_hits):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO skip_ips (zone_id, day, ip, hits) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(zone_id, ip) DO UPDATE SET hits = hits + excluded.hits",
+                [(zone_id, day, ip, hits) for ip, hits in new_hits.items()],
+            )
+            self._conn.execute(
+                "INSERT INTO watermarks (zone_id, day, watermark, rays) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(zone_id) DO UPDATE SET "
+                "day = excluded.day, watermark = excluded.watermark, rays = excluded.rays",
+                (zone_id, day, watermark, json.dumps(sorted(ray for ray in rays if ray))),
+            )
+            self._conn.commit()
+
+    def _record_blocks(self, list_id, rows):
+        added_at = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO blocked_ips (list_id, ip, added_at, expires_at, score) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(list_id, ip) DO UPDATE SET expires_at = excluded.expires_at, score = excluded.score",
+                [(list_id, ip, added_at, expires_at, score) for ip, expires_at, score in rows],
+            )
+            self._conn.commit()
+
+    def _get_expired_blocks(self, list_id):
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT ip FROM blocked_ips WHERE list_id = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                (list_id, time.time()),
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _get_eviction_candidates(self, list_id, count):
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT ip FROM blocked_ips WHERE list_id = ? "
+                "ORDER BY COALESCE(score, 0) ASC, added_at ASC LIMIT ?",
+                (list_id, count),
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _forget_blocks(self, list_id, ips):
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM blocked_ips WHERE list_id = ? AND ip = ?",
+                [(list_id, ip) for ip in ips],
+            )
+            self._conn.commit()
+
+    def _close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def async_setup(self):
+        await self.hass.async_add_executor_job(self._setup)
+
+    async def async_get_fresh(self, ips, threshold, max_age, clean_max_age):
+        """Return cached verdicts for the given IPs that are still fresh.
+
+        Verdicts scoring at or above threshold stay fresh for max_age seconds,
+        clean verdicts for clean_max_age seconds.
+        """
+        if not ips:
+            return {}
+        fresh = await self.hass.async_add_executor_job(
+            self._get_fresh, ips, threshold, max_age, clean_max_age
+        )
+        # Queued rows are newer than anything on disk
+        fresh.update(self._queued_fresh(ips, threshold, max_age, clean_max_age))
+        return fresh
+
+    async def async_upsert(self, results):
+        """Queue verdicts for the single writer; they are visible to async_get_fresh at once.
+
+        Rows queued while a batch is being written go out together in the
+        next batch, so concurrent lookups from many entries never open
+        competing write transactions.
+        """
+        if not results:
+            return
+        checked_at = time.time()
+        for ip, result in results.items():
+            self._pending[ip] = (ip, checked_at, *(result.get(key) for key in VERDICT_KEYS.values()))
+        if self._writer is None or self._writer.done():
+            self._writer = self.hass.async_create_task(self._async_write_pending())
+
+    async def _async_write_pending(self):
+        while self._pending:
+            self._writing, self._pending = self._pending, {}
+            try:
+                await self.hass.async_add_executor_job(self._upsert, list(self._writing.values()))
+            except Exception as e:
+                _LOGGER.warning(f"⚠️ Failed to write {len(self._writing)} verdicts to the reputation store: {e}")
+            finally:
+                self._writing = {}
+
+    async def async_flush(self):
+        """Wait until every queued verdict is written."""
+        while self._writer is not None and not self._writer.done():
+            await self._writer
+
+    async def async_expire(self, max_age):
+        """Drop rows older than max_age seconds, at most once per EXPIRE_INTERVAL_SECONDS."""
+        now = time.monotonic()
+        if self._last_expire is not None and now - self._last_expire < EXPIRE_INTERVAL_SECONDS:
+            return 0
+        self._last_expire = now
+        removed = await self.hass.async_add_executor_job(self._expire, max_age)
+        if removed:
+            _LOGGER.debug("Expired %d checked IPs from the reputation store", removed)
+        return removed
+
+    async def async_load_day(self, zone_id, day):
+        """Return (watermark, watermark rays, {ip: hits}) of a zone for the given UTC day, dropping older days.
+
+        The watermark rays are the rayNames already counted at the watermark
+        second, which the next page returns again.
+        """
+        return await self.hass.async_add_executor_job(self._load_day, zone_id, day)
+
+    async def async_save_day(self, zone_id, day, watermark, rays, new_hits):
+        """Add this cycle's skip IP hits to the day set and move the zone's watermark and its rays."""
+        await self.hass.async_add_executor_job(self._save_day, zone_id, day, watermark, rays, new_hits)
+
+    async def async_record_blocks(self, list_id, rows):
+        """Remember IPs we added to a list as (ip, expires_at, score) rows."""
+        if rows:
+            await self.hass.async_add_executor_job(self._record_blocks, list_id, rows)
+
+    async def async_get_expired_blocks(self, list_id):
+        """Return IPs we added to a list whose expiry has passed."""
+        return await self.hass.async_add_executor_job(self._get_expired_blocks, list_id)
+
+    async def async_get_eviction_candidates(self, list_id, count):
+        """Return up to count of our IPs on a list, lowest score first, then oldest."""
+        if count <= 0:
+            return []
+        return await self.hass.async_add_executor_job(self._get_eviction_candidates, list_id, count)
+
+    async def async_forget_blocks(self, list_id, ips):
+        if ips:
+            await self.hass.async_add_executor_job(self._forget_blocks, list_id, list(ips))
+
+    async def async_close(self):
+        await self.async_flush()
+        await self.hass.async_add_executor_job(self._close)
+
+
+async def async_get_store(hass):
+    """Return the process-wide reputation store, opening it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    lock = domain_data.setdefault("store_lock", asyncio.Lock())
+    async with lock:
+        if "store" not in domain_data:
+            store = ReputationStore(hass)
+            await store.async_setup()
+            domain_data["store"] = store
+    return domain_data["store"]
@@ -0,0 +1,99 @@
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+
+from .api import TRAFFIC_FIELDS
+
+_LOGGER = logging.getLogger(__name__)
+
+# Cloudflare keeps updating an hourly bucket for a few minutes after it closes.
+HOUR_SETTLE_TIME = timedelta(minutes=5)
+# Minutes of per-minute request counts kept by the attack detector.
+ATTACK_RING_SIZE = 60
+
+
+class TrafficAggregator:
+    """Today's traffic totals, with settled hours cached and only recent hours re-queried."""
+
+    def __init__(self):
+        self.day = None
+        self.completed = {}
+        self.completed_until = None
+
+    def _reset(self, midnight):
+        self.day = midnight
+        self.completed = {key: 0 for key in TRAFFIC_FIELDS.values()}
+        self.completed_until = midnight
+
+    def window_start(self, now):
+        """Return where the next query for now (a naive UTC datetime) has to start."""
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        if self.day != midnight:
+            self._reset(midnight)
+        return self.completed_until.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def apply(self, hours, now):
+        """Fold {hour_start: sums} queried from window_start(now) in and return today's summary."""
+        midnight = self.day
+        settled_until = max(midnight, (now - HOUR_SETTLE_TIME).replace(minute=0, second=0, microsecond=0))
+        settled_key = settled_until.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+        live = {key: 0 for key in TRAFFIC_FIELDS.values()}
+        for hour, sums in hours.items():
+            target = self.completed if hour < settled_key else live
+            for key, value in sums.items():
+                target[key] += value or 0
+        self.completed_until = max(self.completed_until, settled_until)
+
+        summary = {
+            "from": midnight.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            "to": now.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        }
+        for key in TRAFFIC_FIELDS.values():
+            summary[key] = self.completed[key] + live[key]
+        return summary
+
+
+class AttackDetector:
+    """Sliding-window request rate over a fixed-size ring buffer of per-minute counts."""
+
+    def __init__(self, size=ATTACK_RING_SIZE):
+        self.size = size
+        # (minute_start, requests), oldest first
+        self.buckets = deque(maxlen=size)
+
+    def window_start(self, now):
+        """Return where the next query has to start; the newest bucket is re-read since it may have been partial."""
+        oldest = (now - timedelta(minutes=self.size - 1)).replace(second=0, microsecond=0)
+        datetime_geq = oldest.strftime('%Y-%m-%dT%H:%M:%SZ')
+        if self.buckets and self.buckets[-1][0] > datetime_geq:
+            datetime_geq = self.buckets[-1][0]
+        return datetime_geq
+
+    def apply(self, minutes):
+        """Fold [(minute_start, requests)] queried from window_start() into the ring."""
+        for minute, requests in minutes:
+            if self.buckets and self.buckets[-1][0] == minute:
+                self.buckets[-1] = (minute, requests)
+            elif not self.buckets or minute > self.buckets[-1][0]:
+                self.buckets.append((minute, requests))
+
+    def window_requests(self, now, window_minutes):
+        """Return the requests of the last window_minutes complete minutes.
+
+        The current minute is still being counted and Cloudflare's analytics
+        lag behind, so the window ends at the newest bucket before it.
+        """
+        current = now.replace(second=0, microsecond=0)
+        current_key = current.strftime('%Y-%m-%dT%H:%M:%SZ')
+        oldest_key = (current - timedelta(minutes=self.size)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        complete = [(minute, requests) for minute, requests in self.buckets if oldest_key <= minute < current_key]
+        if not complete:
+            return 0
+        end = datetime.strptime(complete[-1][0], '%Y-%m-%dT%H:%M:%SZ')
+        start_key = (end - timedelta(minutes=window_minutes - 1)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        return sum(requests for minute, requests in complete if minute >= start_key)
+
+    @property
+    def latest_requests(self):
+        return self.buckets[-1][1] if self.buckets else 0
@@ -0,0 +1,73 @@
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# Import the integration as custom_components.cloudflare_abuse_monitor, like Home Assistant does,
+# and reuse the benchmark's throwaway Home Assistant and stand-in APIs
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from custom_components.cloudflare_abuse_monitor import api  # noqa: E402
+from custom_components.cloudflare_abuse_monitor.const import DOMAIN  # noqa: E402
+from custom_components.cloudflare_abuse_monitor.lookup import get_rate_limiter  # noqa: E402
+from run_benchmark import _config_entry, async_setup_hass  # noqa: E402
+from stub_servers import StubCloudflare, async_start_stub  # noqa: E402
+
+ABUSEIPDB_KEY = "test-key"
+
+
+@pytest.fixture
+def stub_hass(tmp_path, monkeypatch):
+    """Return an async context manager yielding (hass, stub).
+
+    hass is a Home Assistant instance in tmp_path whose integration talks to
+    stub, the benchmark's stand-in Cloudflare and AbuseIPDB APIs, built from
+    the keyword arguments given.
+    """
+    @asynccontextmanager
+    async def _stub_hass(**stub_options):
+        stub = StubCloudflare(**stub_options)
+        runner, base = await async_start_stub(stub)
+        monkeypatch.setattr(api, "CLOUDFLARE_API_URL", f"{base}/client/v4")
+        monkeypatch.setattr(api, "ABUSEIPDB_API_URL", f"{base}/api/v2")
+        hass = await async_setup_hass(str(tmp_path))
+        limiter = get_rate_limiter(hass, ABUSEIPDB_KEY)
+        limiter.rate = limiter.burst = limiter.tokens = 1000
+        try:
+            yield hass, stub
+        finally:
+            await hass.async_stop()
+            await runner.cleanup()
+
+    return _stub_hass
+
+
+@pytest.fixture
+def add_entry():
+    """Return a coroutine function setting up an entry for one of the stub's zones and returning it."""
+    async def _add_entry(hass, stub, zone=0, mode="Monitor", **options):
+        entry = _config_entry(
+            version=1, minor_version=1, domain=DOMAIN, title=f"zone {zone}", source="user", unique_id=f"zone-{zone}",
+            data={
+                "email": "user@example.com",
+                "global_token": "token",
+                "abuseipdb_token": ABUSEIPDB_KEY,
+                "abuse_confidence_score": 90,
+                "recheck_days": 7,
+                "scan_interval_minutes": 1,
+                "zone_id": stub.zones[zone],
+                "zone_name": f"zone{zone}.example",
+                "account_id": stub.account_id,
+                "list_name": "block_ips",
+                "list_id": stub.list_id,
+                "mode": mode,
+            },
+            options={"mode": mode, **options},
+        )
+        await hass.config_entries.async_add(entry)
+        return entry
+
+    return _add_entry
@@ -0,0 +1,80 @@
+from custom_components.cloudflare_abuse_monitor.aggregate import aggregate_ips, drop_covered, group_by_network
+from custom_components.cloudflare_abuse_monitor.prefilter import ALLOW, DENY, PrefixTrie
+
+
+def test_trie_longest_prefix_wins():
+    trie = PrefixTrie()
+    trie.insert("10.0.0.0/8", DENY)
+    trie.insert("10.1.2.0/24", ALLOW)
+    trie.insert("2001:db8::/32", DENY)
+    assert trie.lookup("10.1.2.3") == ALLOW
+    assert trie.lookup("10.1.3.3") == DENY
+    assert trie.lookup("11.0.0.1") is None
+    assert trie.lookup("2001:db8::1") == DENY
+    assert trie.size == 3
+
+
+def test_trie_keeps_ip_versions_apart():
+    trie = PrefixTrie()
+    trie.insert("0.0.0.0/0", DENY)
+    assert trie.lookup("192.0.2.1") == DENY
+    assert trie.lookup("2001:db8::1") is None
+
+
+def test_trie_ignores_invalid_ips():
+    trie = PrefixTrie()
+    trie.insert("0.0.0.0/0", DENY)
+    assert trie.lookup("not an ip") is None
+
+
+def test_group_by_network():
+    groups = group_by_network(["192.0.2.1", "192.0.2.200", "198.51.100.1", "2001:db8::1", "2001:db8::2", "bad"])
+    assert groups == {
+        "192.0.2.0/24": ["192.0.2.1", "192.0.2.200"],
+        "198.51.100.0/24": ["198.51.100.1"],
+        "2001:db8::/64": ["2001:db8::1", "2001:db8::2"],
+    }
+
+
+def test_aggregate_collapses_networks_with_enough_ips():
+    scores = {"192.0.2.1": 90, "192.0.2.2": 100, "192.0.2.3": None, "198.51.100.1": 95}
+    entries, collapsed = aggregate_ips(scores, 3)
+    assert entries == {"192.0.2.0/24": 100, "198.51.100.1": 95}
+    assert collapsed == {"192.0.2.0/24": ["192.0.2.1", "192.0.2.2", "192.0.2.3"]}
+
+
+def test_aggregate_keeps_networks_with_allowed_addresses_apart():
+    allowed = PrefixTrie()
+    allowed.insert("192.0.2.10/32", ALLOW)
+    allowed.insert("198.51.0.0/16", ALLOW)
+    allowed.insert("203.0.113.0/24", DENY)
+    scores = {
+        "192.0.2.1": 90, "192.0.2.2": 100, "192.0.2.3": 95,
+        "198.51.100.1": 90, "198.51.100.2": 90, "198.51.100.3": 90,
+        "203.0.113.1": 90, "203.0.113.2": 90, "203.0.113.3": 90,
+    }
+    entries, collapsed = aggregate_ips(scores, 3, allowed)
+    assert list(collapsed) == ["203.0.113.0/24"]
+    assert "192.0.2.1" in entries and "198.51.100.1" in entries
+
+
+def test_trie_overlaps():
+    trie = PrefixTrie()
+    trie.insert("192.0.2.10/32", ALLOW)
+    trie.insert("10.0.0.0/8", ALLOW)
+    trie.insert("198.51.100.0/24", DENY)
+    assert trie.overlaps("192.0.2.0/24", ALLOW)
+    assert trie.overlaps("10.1.2.0/24", ALLOW)
+    assert not trie.overlaps("198.51.100.0/24", ALLOW)
+    assert not trie.overlaps("2001:db8::/64", ALLOW)
+
+
+def test_aggregate_disabled():
+    scores = {"192.0.2.1": 90, "192.0.2.2": 100}
+    assert aggregate_ips(scores, 0) == (scores, {})
+
+
+def test_drop_covered():
+    ips = ["192.0.2.1", "198.51.100.1", "2001:db8::1"]
+    assert drop_covered(ips, ["192.0.2.0/24", "203.0.113.5"]) == ["198.51.100.1", "2001:db8::1"]
+    assert drop_covered(ips, ["203.0.113.5"]) == ips
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+
+import pytest
+
+from custom_components.cloudflare_abuse_monitor import api
+
+SINCE = "2024-01-01T00:00:00Z"
+UNTIL = "2024-01-01T01:00:00Z"
+
+
+def _events(*seconds):
+    """Return skip events at the given seconds past SINCE, with rayNames r0, r1, ..."""
+    return [
+        {"action": "skip", "clientIP": f"192.0.2.{i}", "datetime": f"2024-01-01T00:00:{second:02d}Z", "rayName": f"r{i}"}
+        for i, second in enumerate(seconds)
+    ]
+
+
+@pytest.fixture
+def zone_events(monkeypatch):
+    """Serve follow-up pages from a list of events the way the GraphQL API does."""
+    served = {"events": [], "calls": []}
+
+    async def fake_fetch_zone_scan(session, headers, zone_id, parts, variables):
+        served["calls"].append(variables)
+        page = [e for e in served["events"] if variables["eventsSince"] <= e["datetime"] < variables["until"]]
+        return {"events": page[:variables["eventsLimit"]]}
+
+    monkeypatch.setattr(api, "fetch_zone_scan", fake_fetch_zone_scan)
+    monkeypatch.setattr(api, "FIREWALL_EVENTS_PAGE_SIZE", 3)
+    return served
+
+
+def _collect(**kwargs):
+    async def run():
+        return [event async for event in api.iter_firewall_events(None, "zone", SINCE, UNTIL, {}, **kwargs)]
+    return asyncio.run(run())
+
+
+def test_page_limit_grows_by_boundary_rays(monkeypatch):
+    monkeypatch.setattr(api, "FIREWALL_EVENTS_PAGE_SIZE", 3)
+    assert api.firewall_events_page_limit() == 3
+    assert api.firewall_events_page_limit(None, 0, {"a", "b"}) == 5
+    # The budget left still counts the boundary rays that come back
+    assert api.firewall_events_page_limit(4, 3, {"a", "b"}) == 3
+    monkeypatch.setattr(api, "FIREWALL_EVENTS_MAX_LIMIT", 4)
+    assert api.firewall_events_page_limit(None, 0, {"a", "b"}) == 4
+
+
+def test_pager_yields_every_event_once(zone_events):
+    zone_events["events"] = _events(0, 1, 2, 3, 4, 5, 6)
+    assert [e["rayName"] for e in _collect()] == [f"r{i}" for i in range(7)]
+
+
+def test_pager_pages_past_a_second_holding_a_page(zone_events):
+    # Five events in second 1 with a page size of 3: the boundary rays must not crowd the page out
+    zone_events["events"] = _events(0, 1, 1, 1, 1, 1, 2)
+    assert [e["rayName"] for e in _collect()] == [f"r{i}" for i in range(7)]
+
+
+def test_pager_skips_rest_of_second_beyond_max_limit(zone_events, monkeypatch, caplog):
+    monkeypatch.setattr(api, "FIREWALL_EVENTS_MAX_LIMIT", 4)
+    zone_events["events"] = _events(0, 1, 1, 1, 1, 1, 1, 2)
+    with caplog.at_level(logging.WARNING):
+        rays = [e["rayName"] for e in _collect()]
+    assert rays == ["r0", "r1", "r2", "r3", "r4", "r7"]
+    assert "skipping the rest of that second" in caplog.text
+
+
+def test_pager_stops_at_max_events(zone_events):
+    zone_events["events"] = _events(0, 1, 2, 3, 4, 5, 6)
+    assert [e["rayName"] for e in _collect(max_events=4)] == ["r0", "r1", "r2", "r3"]
+
+
+def test_pager_drops_seen_rays_and_uses_first_page(zone_events):
+    zone_events["events"] = events = _events(0, 0, 1, 2)
+    first_page = events[:api.firewall_events_page_limit(None, 0, {"r0"})]
+    rays = [e["rayName"] for e in _collect(seen_rays={"r0"}, first_page=first_page)]
+    assert rays == ["r1", "r2", "r3"]
+    # The first page came from the zone scan; only the last partial page was fetched
+    assert [call["eventsSince"] for call in zone_events["calls"]] == ["2024-01-01T00:00:02Z"]
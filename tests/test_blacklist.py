@@ -0,0 +1,65 @@
+import asyncio
+import ipaddress
+
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from custom_components.cloudflare_abuse_monitor.blacklist import BlacklistSnapshot
+
+BLACKLIST = "GET /api/v2/blacklist"
+DAY = 86400
+
+
+def _with_snapshots(stub_hass, tmp_path, test):
+    """Run test(hass, stub, new_snapshot) where new_snapshot() opens the snapshot file in tmp_path."""
+    async def run():
+        async with stub_hass(events=0, ip_pool=200, ipv6_ratio=0.5, high_risk_ratio=0.5) as (hass, stub):
+            await test(hass, stub, lambda: BlacklistSnapshot(hass, tmp_path / "blacklist.bin"))
+
+    asyncio.run(run())
+
+
+def _refresh(hass, snapshot, max_age=DAY, confidence_minimum=100):
+    return snapshot.async_refresh(async_get_clientsession(hass), "test-key", max_age, confidence_minimum)
+
+
+def test_snapshot_answers_membership_for_both_ip_versions(stub_hass, tmp_path):
+    async def test(hass, stub, new_snapshot):
+        snapshot = new_snapshot()
+        assert await _refresh(hass, snapshot)
+        listed = {ip for ip in stub.ip_pool if stub.scores[ip] >= 100}
+        assert {ipaddress.ip_address(ip).version for ip in listed} == {4, 6}
+        assert snapshot.size == len(listed)
+        assert all(ip in snapshot for ip in listed)
+        assert not any(ip in snapshot for ip in set(stub.ip_pool) - listed)
+        assert "not an ip" not in snapshot
+
+    _with_snapshots(stub_hass, tmp_path, test)
+
+
+def test_snapshot_is_reloaded_from_disk(stub_hass, tmp_path):
+    async def test(hass, stub, new_snapshot):
+        first = new_snapshot()
+        await _refresh(hass, first)
+
+        second = new_snapshot()
+        assert not await _refresh(hass, second)
+        assert stub.calls[BLACKLIST] == 1
+        assert (second.v4, second.v6, second.fetched_at) == (first.v4, first.v6, first.fetched_at)
+        assert not [path for path in tmp_path.iterdir() if path.name.startswith(".blacklist.bin.")]
+
+    _with_snapshots(stub_hass, tmp_path, test)
+
+
+def test_snapshot_is_downloaded_again_when_stale_or_for_another_minimum(stub_hass, tmp_path):
+    async def test(hass, stub, new_snapshot):
+        snapshot = new_snapshot()
+        await _refresh(hass, snapshot)
+        assert not await _refresh(hass, snapshot)
+        assert await _refresh(hass, snapshot, max_age=0)
+        # AbuseIPDB's lowest accepted minimum is used instead of 10
+        assert await _refresh(hass, snapshot, confidence_minimum=10)
+        assert snapshot.confidence_minimum == 25
+        assert not await _refresh(hass, snapshot, confidence_minimum=25)
+        assert stub.calls[BLACKLIST] == 3
+
+    _with_snapshots(stub_hass, tmp_path, test)
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+
+from custom_components.cloudflare_abuse_monitor import configuration
+from custom_components.cloudflare_abuse_monitor.configuration import ConfigFileCache
+
+
+def _with_cache(stub_hass, tmp_path, test):
+    """Run test(cache, path) on a ConfigFileCache of a file in tmp_path."""
+    async def run():
+        async with stub_hass(events=0) as (hass, _):
+            path = tmp_path / "configuration.json"
+            await test(ConfigFileCache(hass, path), path)
+
+    asyncio.run(run())
+
+
+def _write(path, data, mtime):
+    path.write_text(json.dumps(data))
+    os.utime(path, (mtime, mtime))
+
+
+def test_missing_file_reads_as_empty(stub_hass, tmp_path):
+    async def test(cache, path):
+        assert await cache.async_get() == {}
+
+    _with_cache(stub_hass, tmp_path, test)
+
+
+def test_changes_by_hand_are_seen_after_the_stat_interval(stub_hass, tmp_path, monkeypatch):
+    async def test(cache, path):
+        _write(path, {"scan_interval_minutes": 5}, 1000)
+        assert await cache.async_get() == {"scan_interval_minutes": 5}
+
+        _write(path, {"scan_interval_minutes": 10}, 2000)
+        assert await cache.async_get() == {"scan_interval_minutes": 5}
+        monkeypatch.setattr(configuration, "STAT_INTERVAL", 0)
+        assert await cache.async_get() == {"scan_interval_minutes": 10}
+
+    _with_cache(stub_hass, tmp_path, test)
+
+
+def test_invalidate_forces_a_check(stub_hass, tmp_path):
+    async def test(cache, path):
+        _write(path, {"scan_interval_minutes": 5}, 1000)
+        await cache.async_get()
+        _write(path, {"scan_interval_minutes": 10}, 2000)
+        cache.invalidate()
+        assert await cache.async_get() == {"scan_interval_minutes": 10}
+
+    _with_cache(stub_hass, tmp_path, test)
+
+
+def test_unchanged_mtime_is_not_reparsed(stub_hass, tmp_path, monkeypatch):
+    async def test(cache, path):
+        monkeypatch.setattr(configuration, "STAT_INTERVAL", 0)
+        _write(path, {"scan_interval_minutes": 5}, 1000)
+        await cache.async_get()
+        _write(path, {"scan_interval_minutes": 10}, 1000)
+        assert await cache.async_get() == {"scan_interval_minutes": 5}
+
+    _with_cache(stub_hass, tmp_path, test)
+
+
+def test_unreadable_file_keeps_the_last_values(stub_hass, tmp_path, monkeypatch):
+    async def test(cache, path):
+        monkeypatch.setattr(configuration, "STAT_INTERVAL", 0)
+        _write(path, {"scan_interval_minutes": 5}, 1000)
+        await cache.async_get()
+        path.write_text("{not json")
+        os.utime(path, (2000, 2000))
+        assert await cache.async_get() == {"scan_interval_minutes": 5}
+
+    _with_cache(stub_hass, tmp_path, test)
+
+
+def test_update_merges_and_replaces_the_file(stub_hass, tmp_path):
+    async def test(cache, path):
+        _write(path, {"scan_interval_minutes": 5, "mode": "Monitor"}, 1000)
+        await cache.async_update(mode="Block")
+        assert json.loads(path.read_text()) == {"scan_interval_minutes": 5, "mode": "Block"}
+        assert await cache.async_get() == {"scan_interval_minutes": 5, "mode": "Block"}
+        # The temp file was renamed over the file, not left behind
+        assert not [name for name in os.listdir(tmp_path) if name.startswith(f".{path.name}.")]
+
+    _with_cache(stub_hass, tmp_path, test)
+
+
+def test_atomic_write_leaves_the_file_alone_on_error(tmp_path):
+    path = tmp_path / "file.json"
+    path.write_text("old")
+    try:
+        with configuration.atomic_write(path) as f:
+            f.write("half")
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == [path.name]
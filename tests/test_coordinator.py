@@ -0,0 +1,74 @@
+import asyncio
+
+from custom_components.cloudflare_abuse_monitor.const import DOMAIN
+
+GRAPHQL = "POST /client/v4/graphql"
+CHECK = "GET /api/v2/check"
+
+
+def _skip_events(stub, zone=0):
+    return sum(1 for _, event in stub.events[stub.zones[zone]] if event["action"] == "skip")
+
+
+def test_setup_leaves_the_first_high_risk_pass_in_the_background(stub_hass, add_entry):
+    async def run():
+        async with stub_hass(events=200, ip_pool=30, event_rate=0, latency=0.05) as (hass, stub):
+            entry = await add_entry(hass, stub)
+            await hass.async_block_till_done()
+            coordinator = hass.data[DOMAIN][entry.entry_id]
+            assert "high_risk" not in coordinator.data
+            assert not coordinator._first_high_risk.done()
+
+            await coordinator._first_high_risk
+            assert coordinator.data["high_risk"]["ips_to_check"]
+            assert stub.calls[CHECK] == len(coordinator.data["skip_ips"])
+
+    asyncio.run(run())
+
+
+def test_refresh_during_a_scan_reuses_it(stub_hass, add_entry):
+    async def run():
+        async with stub_hass(events=300, ip_pool=30, event_rate=0, latency=0.05) as (hass, stub):
+            entry = await add_entry(hass, stub)
+            coordinator = hass.data[DOMAIN][entry.entry_id]
+            await coordinator._first_high_risk
+            scans = stub.calls[GRAPHQL]
+
+            scan = hass.async_create_task(coordinator._async_run_scan())
+            while not coordinator._scan_lock.locked():
+                await asyncio.sleep(0.001)
+            await coordinator.async_refresh()
+            await scan
+
+            assert stub.calls[GRAPHQL] == scans + 1
+            assert sum(coordinator.day_skip_hits.values()) == _skip_events(stub)
+
+    asyncio.run(run())
+
+
+def test_scans_run_one_at_a_time(stub_hass, add_entry):
+    async def run():
+        async with stub_hass(events=300, ip_pool=30, event_rate=0, latency=0.02) as (hass, stub):
+            entry = await add_entry(hass, stub)
+            coordinator = hass.data[DOMAIN][entry.entry_id]
+            await coordinator._first_high_risk
+
+            await asyncio.gather(coordinator._async_run_scan(), coordinator._async_run_scan())
+            assert sum(coordinator.day_skip_hits.values()) == _skip_events(stub)
+
+    asyncio.run(run())
+
+
+def test_reload_does_not_recount_the_watermark_second(stub_hass, add_entry):
+    async def run():
+        async with stub_hass(zones=2, events=300, ip_pool=30, event_rate=0, skip_ratio=1.0) as (hass, stub):
+            entry = await add_entry(hass, stub)
+            # A second entry keeps the shared store open while the first reloads
+            await add_entry(hass, stub, zone=1)
+            await hass.data[DOMAIN][entry.entry_id]._first_high_risk
+
+            assert await hass.config_entries.async_reload(entry.entry_id)
+            coordinator = hass.data[DOMAIN][entry.entry_id]
+            assert sum(coordinator.day_skip_hits.values()) == _skip_events(stub)
+
+    asyncio.run(run())
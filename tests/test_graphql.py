@@ -0,0 +1,102 @@
+import asyncio
+import gc
+
+import pytest
+
+from custom_components.cloudflare_abuse_monitor import api, graphql
+from custom_components.cloudflare_abuse_monitor.graphql import GraphQLBatcher
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Record the zone lists of the batched requests and answer each zone with its own block."""
+    requests = []
+
+    async def fake_fetch_zone_scans(session, headers, scans):
+        requests.append([zone_id for zone_id, _, _ in scans])
+        await asyncio.sleep(0)
+        return [ValueError(zone_id) if zone_id == "bad" else {"zone": zone_id} for zone_id, _, _ in scans]
+
+    monkeypatch.setattr(api, "fetch_zone_scans", fake_fetch_zone_scans)
+    monkeypatch.setattr(graphql, "BATCH_WINDOW", 0.05)
+    return requests
+
+
+def _batcher(*entries):
+    batcher = GraphQLBatcher(None, {})
+    batcher.entries.update(entries)
+    return batcher
+
+
+def _query(batcher, zone_id):
+    return batcher.async_query(zone_id, ("traffic",), {})
+
+
+def test_batch_goes_out_once_every_entry_queued(sent):
+    async def run():
+        batcher = _batcher("a", "b")
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await asyncio.gather(_query(batcher, "z1"), _query(batcher, "z2"))
+        return results, loop.time() - start
+
+    results, elapsed = asyncio.run(run())
+    assert results == [{"zone": "z1"}, {"zone": "z2"}]
+    assert sent == [["z1", "z2"]]
+    assert elapsed < graphql.BATCH_WINDOW
+
+
+def test_lone_entry_never_waits(sent):
+    async def run():
+        batcher = _batcher("a")
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await _query(batcher, "z1")
+        return loop.time() - start
+
+    assert asyncio.run(run()) < graphql.BATCH_WINDOW
+    assert sent == [["z1"]]
+
+
+def test_partial_batch_waits_for_the_window(sent):
+    async def run():
+        batcher = _batcher("a", "b", "c")
+        return await asyncio.gather(_query(batcher, "z1"), _query(batcher, "z2"))
+
+    assert asyncio.run(run()) == [{"zone": "z1"}, {"zone": "z2"}]
+    assert sent == [["z1", "z2"]]
+
+
+def test_batches_are_split_by_max_zones(sent, monkeypatch):
+    monkeypatch.setattr(graphql, "MAX_BATCH_ZONES", 2)
+
+    async def run():
+        batcher = _batcher("a", "b", "c")
+        return await asyncio.gather(*(_query(batcher, zone) for zone in ("z1", "z2", "z3")))
+
+    assert len(asyncio.run(run())) == 3
+    assert sent == [["z1", "z2"], ["z3"]]
+
+
+def test_errors_reach_their_own_caller(sent):
+    async def run():
+        batcher = _batcher("a", "b")
+        return await asyncio.gather(_query(batcher, "z1"), _query(batcher, "bad"), return_exceptions=True)
+
+    good, bad = asyncio.run(run())
+    assert good == {"zone": "z1"}
+    assert isinstance(bad, ValueError)
+
+
+def test_sends_survive_garbage_collection(sent):
+    async def run():
+        batcher = _batcher("a")
+        query = asyncio.ensure_future(_query(batcher, "z1"))
+        await asyncio.sleep(0)
+        assert batcher._sends
+        gc.collect()
+        result = await asyncio.wait_for(query, 1)
+        assert not batcher._sends
+        return result
+
+    assert asyncio.run(run()) == {"zone": "z1"}
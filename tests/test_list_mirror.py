@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from custom_components.cloudflare_abuse_monitor import list_mirror
+from custom_components.cloudflare_abuse_monitor.const import DOMAIN
+from custom_components.cloudflare_abuse_monitor.list_mirror import (
+    CloudflareListMirror,
+    build_comment,
+    parse_comment_expiry,
+)
+
+LIST_ITEMS = "GET /client/v4/accounts/{account_id}/rules/lists/{list_id}/items"
+
+
+@pytest.fixture(autouse=True)
+def fast_bulk_polls(monkeypatch):
+    monkeypatch.setattr(list_mirror, "BULK_POLL_DELAYS", (0,))
+
+
+def _ours(count):
+    """Return count IPs from a range the stub never puts on its list."""
+    return [f"2001:db8::{i + 1:x}" for i in range(count)]
+
+
+def _with_mirror(stub_hass, test, list_items):
+    """Run test(mirror, stub) on a mirror of a stub list holding list_items IPs someone else added."""
+    async def run():
+        async with stub_hass(events=0, list_items=list_items, ipv6_ratio=0) as (hass, stub):
+            mirror = CloudflareListMirror(
+                async_get_clientsession(hass), hass.data[DOMAIN]["store"], stub.account_id, stub.list_id
+            )
+            await mirror.async_get_ips({})
+            await test(mirror, stub)
+
+    asyncio.run(run())
+
+
+def test_comment_expiry_round_trip():
+    expires_at = int(time.time()) + 3600
+    assert parse_comment_expiry(build_comment(95, expires_at)) == expires_at
+    assert parse_comment_expiry(build_comment(95, None)) is None
+
+
+def test_comment_expiry_ignores_foreign_and_malformed_comments():
+    assert parse_comment_expiry(None) is None
+    assert parse_comment_expiry("") is None
+    assert parse_comment_expiry("added by hand expires=2024-01-01T00:00:00Z") is None
+    assert parse_comment_expiry("cloudflare_abuse_monitor score=90 expires=tomorrow") is None
+    assert parse_comment_expiry("cloudflare_abuse_monitor score=90 expires=2024-01-01T00:00:00Z") == 1704067200
+
+
+def test_sweep_evicts_only_above_the_high_water_mark(stub_hass):
+    async def test(mirror, stub):
+        foreign = set(stub.list_items)
+        ours = _ours(20)
+        await mirror.async_add_ips({}, ours, scores={ip: 90 + i % 10 for i, ip in enumerate(ours)})
+        assert len(mirror.items) == 90
+
+        # 90 of 100 is at the high-water mark, not above it
+        assert await mirror.async_sweep({}, 100) == (0, 0)
+        # One more incoming IP crosses it; evict down to 80 including the incoming one
+        assert await mirror.async_sweep({}, 100, incoming=1) == (0, 11)
+        assert len(mirror.items) == len(stub.list_items) == 79
+        assert foreign <= set(stub.list_items)
+
+    _with_mirror(stub_hass, test, list_items=70)
+
+
+def test_sweep_evicts_our_lowest_scored_then_oldest_ips(stub_hass):
+    async def test(mirror, stub):
+        old, new = _ours(4)[:2], _ours(4)[2:]
+        await mirror.async_add_ips({}, old, scores={old[0]: 95, old[1]: 100})
+        await mirror.async_add_ips({}, new, scores={new[0]: 95, new[1]: None})
+
+        # Each sweep has 1 over the low-water mark to evict; unscored counts as 0, ties go to the oldest
+        assert await mirror.async_sweep({}, 5, incoming=1) == (0, 1)
+        assert set(stub.list_items) == {*old, new[0]}
+        assert await mirror.async_sweep({}, 4, incoming=1) == (0, 1)
+        assert set(stub.list_items) == {old[1], new[0]}
+
+    _with_mirror(stub_hass, test, list_items=0)
+
+
+def test_sweep_removes_expired_ips(stub_hass):
+    async def test(mirror, stub):
+        recorded, commented, kept = _ours(3)
+        await mirror.async_add_ips({}, [recorded], ttl=1)
+        await mirror.async_add_ips({}, [kept], ttl=3600)
+        # Expired by its comment alone, e.g. added by another Home Assistant
+        stub.list_items[commented] = {
+            "id": "item-commented", "ip": commented, "comment": build_comment(100, time.time() - 60)
+        }
+        await mirror.async_get_ips({}, force=True)
+        await asyncio.sleep(1.1)
+
+        assert await mirror.async_sweep({}, 100) == (2, 0)
+        assert set(stub.list_items) == {kept}
+        assert await mirror.store.async_get_expired_blocks(mirror.list_id) == []
+
+    _with_mirror(stub_hass, test, list_items=0)
+
+
+def test_removing_ips_added_since_the_last_reconcile(stub_hass):
+    async def test(mirror, stub):
+        ours = _ours(3)
+        await mirror.async_add_ips({}, ours, scores={ip: 100 for ip in ours})
+        # Our own writes are mirrored without the item ids Cloudflare assigned
+        assert all("id" not in mirror.items[ip] for ip in ours)
+        reconciles = stub.calls[LIST_ITEMS]
+
+        # One was already deleted by hand
+        del stub.list_items[ours[2]]
+        assert await mirror.async_remove_ips({}, ours) == ours[:2]
+        assert stub.calls[LIST_ITEMS] == reconciles + 1
+        assert not stub.list_items
+        assert not mirror.items
+        # Every one of them is forgotten, so none comes back as an eviction candidate
+        assert await mirror.store.async_get_eviction_candidates(mirror.list_id, 10) == []
+
+    _with_mirror(stub_hass, test, list_items=0)
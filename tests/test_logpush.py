@@ -0,0 +1,112 @@
+import asyncio
+import gzip
+import json
+import zlib
+
+import pytest
+
+from custom_components.cloudflare_abuse_monitor import logpush
+from custom_components.cloudflare_abuse_monitor.logpush import (
+    BatchTooLarge,
+    SkipAggregate,
+    iter_ndjson_lines,
+    parse_logpush_line,
+)
+
+
+class FakeContent:
+    """Request body handing out fixed-size chunks, like aiohttp's StreamReader.iter_chunked."""
+
+    def __init__(self, body, chunk_size):
+        self._body = body
+        self._chunk_size = chunk_size
+
+    async def iter_chunked(self, n):
+        for i in range(0, len(self._body), self._chunk_size):
+            yield self._body[i:i + self._chunk_size]
+
+
+def _lines(body, chunk_size=7):
+    async def run():
+        return [line async for line in iter_ndjson_lines(FakeContent(body, chunk_size))]
+    return asyncio.run(run())
+
+
+BODY = b'{"a": 1}\n{"b": 2}\n\n{"c": 3}'
+
+
+def test_lines_are_split_across_chunks():
+    assert [line for line in _lines(BODY) if line] == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+
+def test_gzip_body_is_recognized_and_gunzipped():
+    assert _lines(gzip.compress(BODY), chunk_size=5) == _lines(BODY)
+
+
+def test_oversized_batch_is_refused(monkeypatch):
+    monkeypatch.setattr(logpush, "MAX_BATCH_BYTES", 10)
+    with pytest.raises(BatchTooLarge):
+        _lines(BODY)
+
+
+def test_oversized_decompressed_batch_is_refused(monkeypatch):
+    monkeypatch.setattr(logpush, "MAX_DECOMPRESSED_BYTES", 1000)
+    with pytest.raises(BatchTooLarge):
+        _lines(gzip.compress(b"\n" * 5000))
+
+
+def test_corrupt_gzip_body_raises():
+    with pytest.raises(zlib.error):
+        _lines(logpush.GZIP_MAGIC + b"not gzip at all")
+
+
+def _line(**record):
+    return json.dumps({"Action": "skip", "ClientIP": "192.0.2.1", "RayName": "r1", **record})
+
+
+@pytest.mark.parametrize("stamp", ["2024-01-01T10:20:30Z", "2024-01-01T12:20:30+02:00", 1704104430, 1704104430000000000])
+def test_parse_accepts_every_timestamp_format(stamp):
+    assert parse_logpush_line(_line(Datetime=stamp)) == {
+        "clientIP": "192.0.2.1", "action": "skip", "datetime": "2024-01-01T10:20:30Z", "rayName": "r1",
+    }
+
+
+def test_parse_falls_back_to_ray_id():
+    line = json.dumps({"Action": "skip", "ClientIP": "192.0.2.1", "Datetime": 1704104430, "RayID": "r2"})
+    assert parse_logpush_line(line)["rayName"] == "r2"
+
+
+@pytest.mark.parametrize("line", [
+    '{"content": "test", "filename": "test.txt"}',
+    _line(),
+    _line(Datetime="yesterday"),
+    "not json",
+    "[1, 2]",
+])
+def test_parse_ignores_other_lines(line):
+    assert parse_logpush_line(line) is None
+
+
+def _event(ip="192.0.2.1", ray="r1", action="skip", when="2024-01-01T10:20:30Z"):
+    return {"clientIP": ip, "action": action, "datetime": when, "rayName": ray}
+
+
+def test_aggregate_counts_today_skip_events_per_ip():
+    aggregate = SkipAggregate("2024-01-01", set())
+    aggregate.add(_event(ray="r1"))
+    aggregate.add(_event(ray="r2"))
+    aggregate.add(_event(ip="192.0.2.2", ray="r3"))
+    aggregate.add(_event(ray="r4", action="block"))
+    aggregate.add(_event(ray="r5", when="2023-12-31T23:59:59Z"))
+    assert aggregate.hits == {"192.0.2.1": 2, "192.0.2.2": 1}
+    assert aggregate.rays == {"r1", "r2", "r3"}
+
+
+def test_aggregate_drops_rays_seen_in_the_batch_or_before():
+    aggregate = SkipAggregate("2024-01-01", {"r1"})
+    aggregate.add(_event(ray="r1"))
+    aggregate.add(_event(ray="r2"))
+    aggregate.add(_event(ray="r2"))
+    aggregate.add(_event(ray=None))
+    assert aggregate.hits == {"192.0.2.1": 2}
+    assert aggregate.duplicates == 2
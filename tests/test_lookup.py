@@ -0,0 +1,45 @@
+import asyncio
+
+from custom_components.cloudflare_abuse_monitor.lookup import QUOTA_RESERVE, AbuseIPDBRateLimiter
+
+
+def _acquire(limiter, times, max_wait=0):
+    async def run():
+        return [await limiter.async_acquire(max_wait) for _ in range(times)]
+    return asyncio.run(run())
+
+
+def test_bucket_hands_out_its_burst_then_defers():
+    limiter = AbuseIPDBRateLimiter(rate=0.001, burst=3)
+    assert _acquire(limiter, 4) == [True, True, True, False]
+
+
+def test_bucket_refills_at_its_rate():
+    limiter = AbuseIPDBRateLimiter(rate=1000, burst=1)
+    assert _acquire(limiter, 3, max_wait=1) == [True, True, True]
+
+
+def test_remaining_quota_caps_the_tokens():
+    limiter = AbuseIPDBRateLimiter(rate=0.001, burst=10)
+    limiter.update_from_headers({"X-RateLimit-Limit": "1000", "X-RateLimit-Remaining": str(QUOTA_RESERVE + 2)})
+    assert (limiter.limit, limiter.remaining) == (1000, QUOTA_RESERVE + 2)
+    assert _acquire(limiter, 3) == [True, True, False]
+
+
+def test_exhausted_quota_blocks_until_reset():
+    limiter = AbuseIPDBRateLimiter(rate=1000, burst=10)
+    limiter.update_from_headers({"X-RateLimit-Remaining": str(QUOTA_RESERVE)})
+    assert _acquire(limiter, 1, max_wait=5) == [False]
+
+
+def test_retry_after_blocks():
+    limiter = AbuseIPDBRateLimiter(rate=1000, burst=10)
+    limiter.update_from_headers({"Retry-After": "60"})
+    assert _acquire(limiter, 1, max_wait=5) == [False]
+
+
+def test_malformed_headers_are_ignored():
+    limiter = AbuseIPDBRateLimiter(rate=0.001, burst=2)
+    limiter.update_from_headers({"X-RateLimit-Remaining": "soon", "Retry-After": "later"})
+    assert limiter.remaining is None
+    assert _acquire(limiter, 2) == [True, True]
@@ -0,0 +1,56 @@
+import asyncio
+import json
+import os
+
+from custom_components.cloudflare_abuse_monitor import configuration
+from custom_components.cloudflare_abuse_monitor.prefilter import ALLOW, DENY, CIDRPrefilter
+
+
+def _with_prefilter(stub_hass, tmp_path, test):
+    """Run test(prefilter, path) on a CIDRPrefilter of a file in tmp_path."""
+    async def run():
+        async with stub_hass(events=0) as (hass, _):
+            path = tmp_path / "prefilter.json"
+            await test(CIDRPrefilter(hass, path), path)
+
+    asyncio.run(run())
+
+
+def _write(path, rules, mtime):
+    path.write_text(json.dumps(rules))
+    os.utime(path, (mtime, mtime))
+
+
+def test_missing_file_classifies_nothing(stub_hass, tmp_path):
+    async def test(prefilter, path):
+        assert await prefilter.async_classify(["192.0.2.1"]) == {}
+
+    _with_prefilter(stub_hass, tmp_path, test)
+
+
+def test_most_specific_network_wins(stub_hass, tmp_path):
+    async def test(prefilter, path):
+        _write(path, {"allow": ["192.0.2.0/28"], "deny": ["192.0.2.0/24", "not a network"]}, 1000)
+        assert await prefilter.async_classify(["192.0.2.1", "192.0.2.100", "198.51.100.1"]) == {
+            "192.0.2.1": ALLOW, "192.0.2.100": DENY,
+        }
+        assert prefilter.trie.size == 2
+
+    _with_prefilter(stub_hass, tmp_path, test)
+
+
+def test_rules_are_rebuilt_when_the_file_changes(stub_hass, tmp_path, monkeypatch):
+    async def test(prefilter, path):
+        _write(path, {"deny": ["192.0.2.0/24"]}, 1000)
+        await prefilter.async_classify([])
+        _write(path, {"allow": ["192.0.2.0/24"]}, 2000)
+        assert await prefilter.async_classify(["192.0.2.1"]) == {"192.0.2.1": DENY}
+
+        monkeypatch.setattr(configuration, "STAT_INTERVAL", 0)
+        assert await prefilter.async_classify(["192.0.2.1"]) == {"192.0.2.1": ALLOW}
+        # A broken edit keeps the last rules in force
+        path.write_text("{not json")
+        os.utime(path, (3000, 3000))
+        assert await prefilter.async_classify(["192.0.2.1"]) == {"192.0.2.1": ALLOW}
+
+    _with_prefilter(stub_hass, tmp_path, test)
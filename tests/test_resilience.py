@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from custom_components.cloudflare_abuse_monitor import api
+from custom_components.cloudflare_abuse_monitor.resilience import (
+    FAILURE_THRESHOLD,
+    MAX_OPEN_SECONDS,
+    OPEN_SECONDS,
+    CircuitBreaker,
+    CircuitOpenError,
+    is_retryable,
+    passes_429,
+)
+
+
+def _open(breaker):
+    for _ in range(FAILURE_THRESHOLD):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_breaker_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker("api.example")
+    for _ in range(FAILURE_THRESHOLD - 1):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_success_resets_the_failure_count():
+    breaker = CircuitBreaker("api.example")
+    for _ in range(FAILURE_THRESHOLD - 1):
+        breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_breaker_lets_one_probe_through():
+    breaker = CircuitBreaker("api.example")
+    _open(breaker)
+    breaker.open_until = time.monotonic() - 1
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.open_seconds == OPEN_SECONDS
+
+
+def test_failed_probe_doubles_the_open_period_up_to_the_cap():
+    breaker = CircuitBreaker("api.example")
+    _open(breaker)
+    expected = OPEN_SECONDS
+    for _ in range(10):
+        breaker.open_until = time.monotonic() - 1
+        breaker.before_call()
+        breaker.record_failure()
+        expected = min(MAX_OPEN_SECONDS, expected * 2)
+        assert breaker.state == "open"
+        assert breaker.open_seconds == expected
+    assert breaker.open_seconds == MAX_OPEN_SECONDS
+
+
+def test_only_safe_calls_are_retried():
+    assert is_retryable("GET", f"{api.ABUSEIPDB_API_URL}/check")
+    assert is_retryable("PATCH", f"{api.CLOUDFLARE_API_URL}/zones/z/settings/security_level")
+    assert is_retryable("POST", f"{api.CLOUDFLARE_API_URL}/graphql")
+    assert not is_retryable("POST", f"{api.CLOUDFLARE_API_URL}/accounts/a/rules/lists/l/items")
+    assert not is_retryable("DELETE", f"{api.CLOUDFLARE_API_URL}/accounts/a/rules/lists/l/items")
+
+
+def test_abuseipdb_429s_go_back_to_the_caller():
+    assert passes_429(f"{api.ABUSEIPDB_API_URL}/check")
+    assert not passes_429(f"{api.CLOUDFLARE_API_URL}/graphql")
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.cloudflare_abuse_monitor.const import DOMAIN
+from custom_components.cloudflare_abuse_monitor.ip_lists import TOP_IPS, ip_digest, page_ips, summarize_ips
+
+
+def test_pages_are_sorted_and_end_without_a_next_offset():
+    ips = {"192.0.2.3", "192.0.2.1", "192.0.2.2"}
+    first = page_ips(ips, 0, 2)
+    assert first["items"] == ["192.0.2.1", "192.0.2.2"]
+    assert first["next_offset"] == 2
+    last = page_ips(ips, first["next_offset"], 2)
+    assert last["items"] == ["192.0.2.3"]
+    assert last["next_offset"] is None
+    assert first["total"] == last["total"] == 3
+    assert first["hash"] == last["hash"] == ip_digest(ips)
+
+
+def test_a_mapping_is_paged_by_its_keys():
+    failed = {"192.0.2.2": "List write rejected", "192.0.2.1": "timeout"}
+    assert page_ips(failed, 0, 1)["items"] == {"192.0.2.1": "timeout"}
+
+
+def test_summary_shows_the_most_hit_ips():
+    ips = [f"192.0.2.{i}" for i in range(1, 21)]
+    summary = summarize_ips("skip_ips", ips, {"192.0.2.20": 5, "192.0.2.9": 5, "192.0.2.1": 1})
+    assert summary["skip_ips_count"] == 20
+    assert summary["skip_ips_top"][:3] == ["192.0.2.20", "192.0.2.9", "192.0.2.1"]
+    assert len(summary["skip_ips_top"]) == TOP_IPS
+    assert summary["skip_ips_hash"] == ip_digest(reversed(ips))
+    assert summarize_ips("skip_ips", ips)["skip_ips_top"] == sorted(ips)[:TOP_IPS]
+
+
+def _get_ips(hass, **data):
+    return hass.services.async_call(DOMAIN, "get_ips", data, blocking=True, return_response=True)
+
+
+def test_get_ips_returns_a_page_of_the_entry_list(stub_hass, add_entry):
+    async def run():
+        async with stub_hass(events=200, ip_pool=30, event_rate=0) as (hass, stub):
+            entry = await add_entry(hass, stub)
+            coordinator = hass.data[DOMAIN][entry.entry_id]
+            await coordinator._first_high_risk
+
+            page = await _get_ips(hass, list="skip_ips", limit=5)
+            assert page["entry_id"] == entry.entry_id
+            assert page["items"] == sorted(coordinator.data["skip_ips"])[:5]
+            assert page["total"] == len(coordinator.data["skip_ips"])
+
+            coordinator.data["high_risk"]["failed_blocks"] = {"192.0.2.1": "List write rejected"}
+            page = await _get_ips(hass, entry_id=entry.entry_id, list="failed_blocks")
+            assert page["items"] == {"192.0.2.1": "List write rejected"}
+
+            coordinator.data["skip_ips"] = {"error": "Cloudflare unavailable"}
+            with pytest.raises(HomeAssistantError, match="last scan failed"):
+                await _get_ips(hass, list="skip_ips")
+
+    asyncio.run(run())
+
+
+def test_get_ips_needs_a_loaded_entry(stub_hass, add_entry):
+    async def run():
+        async with stub_hass(zones=2, events=0) as (hass, stub):
+            await add_entry(hass, stub)
+            await add_entry(hass, stub, zone=1)
+            with pytest.raises(HomeAssistantError, match="entry_id is required"):
+                await _get_ips(hass, list="skip_ips")
+            with pytest.raises(HomeAssistantError, match="No loaded"):
+                await _get_ips(hass, entry_id="missing", list="skip_ips")
+
+    asyncio.run(run())
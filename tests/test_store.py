@@ -0,0 +1,120 @@
+import asyncio
+import json
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from custom_components.cloudflare_abuse_monitor import store as store_module
+from custom_components.cloudflare_abuse_monitor.store import ReputationStore
+
+
+def _with_store(stub_hass, tmp_path, test, prepare=None):
+    """Run test(store) on a ReputationStore in tmp_path; prepare runs first, once Home Assistant is up."""
+    async def run():
+        async with stub_hass(events=0) as (hass, _):
+            if prepare is not None:
+                prepare()
+            store = ReputationStore(hass, tmp_path / "store.db")
+            await store.async_setup()
+            try:
+                await test(store)
+            finally:
+                await store.async_close()
+
+    asyncio.run(run())
+
+
+def test_legacy_json_is_migrated_once(stub_hass, tmp_path, monkeypatch):
+    legacy = tmp_path / "cloudflare_checked_ips.json"
+    checked = datetime.utcnow() - timedelta(days=1)
+
+    def prepare():
+        legacy.write_text(json.dumps({"192.0.2.1": checked.isoformat(), "192.0.2.2": "not a date"}))
+        monkeypatch.setattr(store_module, "CHECKED_IPS_FILE", legacy)
+
+    async def test(store):
+        fresh = await store.async_get_fresh(["192.0.2.1", "192.0.2.2"], 90, 7 * 86400, 7 * 86400)
+        assert list(fresh) == ["192.0.2.1"]
+        assert abs(fresh["192.0.2.1"]["checked_at"] - (checked - datetime(1970, 1, 1)).total_seconds()) < 1
+        assert fresh["192.0.2.1"]["abuse_confidence_score"] is None
+        assert not legacy.exists()
+        assert legacy.with_suffix(".json.migrated").exists()
+
+    _with_store(stub_hass, tmp_path, test, prepare)
+
+
+DAY = 86400
+
+
+def _clock(monkeypatch):
+    """Replace the store's wall clock with one the test moves by hand."""
+    clock = SimpleNamespace(now=time.time())
+    monkeypatch.setattr(store_module, "time", SimpleNamespace(time=lambda: clock.now, monotonic=time.monotonic))
+    return clock
+
+
+def test_clean_verdicts_go_stale_before_high_risk_ones(stub_hass, tmp_path, monkeypatch):
+    clock = _clock(monkeypatch)
+
+    async def test(store):
+        await store.async_upsert({
+            "192.0.2.1": {"abuse_confidence_score": 95, "countryCode": "XX", "totalReports": 12},
+            "192.0.2.2": {"abuse_confidence_score": 10},
+        })
+        await store.async_flush()
+        ips = ["192.0.2.1", "192.0.2.2", "192.0.2.3"]
+
+        fresh = await store.async_get_fresh(ips, 90, 7 * DAY, DAY)
+        assert sorted(fresh) == ["192.0.2.1", "192.0.2.2"]
+        assert fresh["192.0.2.1"]["countryCode"] == "XX"
+        assert fresh["192.0.2.1"]["totalReports"] == 12
+
+        clock.now += 2 * DAY
+        assert list(await store.async_get_fresh(ips, 90, 7 * DAY, DAY)) == ["192.0.2.1"]
+        clock.now += 6 * DAY
+        assert await store.async_get_fresh(ips, 90, 7 * DAY, DAY) == {}
+
+    _with_store(stub_hass, tmp_path, test)
+
+
+def test_queued_verdicts_are_read_before_they_are_written(stub_hass, tmp_path):
+    async def test(store):
+        await store.async_upsert({"192.0.2.1": {"abuse_confidence_score": 95}})
+        # Queued while the first batch is being written; goes out in the next one
+        await store.async_upsert({"192.0.2.2": {"abuse_confidence_score": 0}})
+        fresh = await store.async_get_fresh(["192.0.2.1", "192.0.2.2"], 90, DAY, DAY)
+        assert {ip: verdict["abuse_confidence_score"] for ip, verdict in fresh.items()} == {"192.0.2.1": 95, "192.0.2.2": 0}
+
+        await store.async_flush()
+        reopened = ReputationStore(store.hass, store.path)
+        await reopened.async_setup()
+        assert sorted(await reopened.async_get_fresh(["192.0.2.1", "192.0.2.2"], 90, DAY, DAY)) == ["192.0.2.1", "192.0.2.2"]
+        await reopened.async_close()
+
+    _with_store(stub_hass, tmp_path, test)
+
+
+def test_day_keeps_the_watermark_rays(stub_hass, tmp_path):
+    async def test(store):
+        assert await store.async_load_day("zone", "2024-01-01") == (None, set(), {})
+        await store.async_save_day("zone", "2024-01-01", "2024-01-01T10:00:00Z", {"r1", "r2", None}, {"192.0.2.1": 2})
+        await store.async_save_day("zone", "2024-01-01", "2024-01-01T10:00:05Z", {"r3"}, {"192.0.2.1": 1})
+        assert await store.async_load_day("zone", "2024-01-01") == ("2024-01-01T10:00:05Z", {"r3"}, {"192.0.2.1": 3})
+        # A new day starts from scratch
+        assert await store.async_load_day("zone", "2024-01-02") == (None, set(), {})
+
+    _with_store(stub_hass, tmp_path, test)
+
+
+def test_watermarks_from_before_the_rays_column_still_load(stub_hass, tmp_path):
+    conn = sqlite3.connect(tmp_path / "store.db")
+    conn.execute("CREATE TABLE watermarks (zone_id TEXT PRIMARY KEY, day TEXT NOT NULL, watermark TEXT NOT NULL)")
+    conn.execute("INSERT INTO watermarks VALUES ('zone', '2024-01-01', '2024-01-01T10:00:00Z')")
+    conn.commit()
+    conn.close()
+
+    async def test(store):
+        assert await store.async_load_day("zone", "2024-01-01") == ("2024-01-01T10:00:00Z", set(), {})
+
+    _with_store(stub_hass, tmp_path, test)
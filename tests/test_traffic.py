@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from custom_components.cloudflare_abuse_monitor.traffic import AttackDetector, TrafficAggregator
+
+
+def _hours(**requests):
+    """Return {hour_start: sums} for requests given as h00=..., h01=... on 2024-01-01."""
+    return {f"2024-01-01T{name[1:]}:00:00Z": {"requests": count} for name, count in requests.items()}
+
+
+def test_aggregator_starts_at_midnight():
+    traffic = TrafficAggregator()
+    assert traffic.window_start(datetime(2024, 1, 1, 3, 2)) == "2024-01-01T00:00:00Z"
+
+
+def test_aggregator_caches_settled_hours_and_requeries_live_ones():
+    traffic = TrafficAggregator()
+    now = datetime(2024, 1, 1, 3, 2)
+    traffic.window_start(now)
+    summary = traffic.apply(_hours(h00=10, h01=20, h02=5, h03=1), now)
+    assert summary["requests"] == 36
+    # 02:00 closed less than HOUR_SETTLE_TIME ago, so it is still re-queried
+    assert traffic.completed["requests"] == 30
+
+    now = datetime(2024, 1, 1, 3, 10)
+    assert traffic.window_start(now) == "2024-01-01T02:00:00Z"
+    summary = traffic.apply(_hours(h02=7, h03=4), now)
+    assert summary["requests"] == 41
+    assert traffic.completed["requests"] == 37
+    assert traffic.window_start(now) == "2024-01-01T03:00:00Z"
+
+
+def test_aggregator_resets_on_a_new_day():
+    traffic = TrafficAggregator()
+    now = datetime(2024, 1, 1, 23, 30)
+    traffic.window_start(now)
+    traffic.apply(_hours(h22=10), now)
+
+    now = datetime(2024, 1, 2, 0, 1)
+    assert traffic.window_start(now) == "2024-01-02T00:00:00Z"
+    summary = traffic.apply({}, now)
+    assert summary["requests"] == 0
+    assert summary["from"] == "2024-01-02T00:00:00Z"
+
+
+def test_attack_detector_rereads_the_newest_minute():
+    detector = AttackDetector(size=5)
+    detector.apply([("2024-01-01T00:00:00Z", 10), ("2024-01-01T00:01:00Z", 3)])
+    assert detector.window_start(datetime(2024, 1, 1, 0, 2, 30)) == "2024-01-01T00:01:00Z"
+    detector.apply([("2024-01-01T00:01:00Z", 8), ("2024-01-01T00:02:00Z", 4)])
+    assert detector.latest_requests == 4
+    # 00:02 is still being counted
+    assert detector.window_requests(datetime(2024, 1, 1, 0, 2, 30), 2) == 18
+
+
+def test_attack_window_ends_at_the_newest_complete_minute():
+    detector = AttackDetector()
+    detector.apply([("2024-01-01T11:58:00Z", 20000), ("2024-01-01T11:59:00Z", 20000), ("2024-01-01T12:00:00Z", 0)])
+    now = datetime(2024, 1, 1, 12, 0, 5)
+    assert detector.window_requests(now, 1) == 20000
+    assert detector.window_requests(now, 2) == 40000
+
+
+def test_attack_window_follows_lagging_analytics():
+    detector = AttackDetector()
+    # 11:59 has not been reported yet
+    detector.apply([("2024-01-01T11:57:00Z", 5), ("2024-01-01T11:58:00Z", 20000)])
+    assert detector.window_requests(datetime(2024, 1, 1, 12, 0, 5), 1) == 20000
+
+
+def test_attack_window_ignores_minutes_older_than_the_ring():
+    detector = AttackDetector(size=5)
+    detector.apply([("2024-01-01T11:00:00Z", 20000)])
+    assert detector.window_requests(datetime(2024, 1, 1, 12, 0, 5), 1) == 0